@@ -0,0 +1,86 @@
+"""
+IgnorePatterns の判定を、従来のパターン逐次評価と CompiledIgnorePatterns で比較するベンチマーク
+
+実行例:
+    python -m benchmarks.bench_ignore_patterns --patterns 300 --paths 20000
+"""
+import argparse
+from pathlib import PurePosixPath
+import random
+import time
+
+from generate_project_summary.ignore_patterns import CompiledIgnorePatterns, IgnorePatterns
+
+
+def build_patterns(count, rnd):
+    """.gitignore によくある形のパターンを count 個作る。"""
+    patterns = []
+    for index in range(count):
+        kind = index % 6
+        if kind == 0:
+            patterns.append(f"*.ext{index}")
+        elif kind == 1:
+            patterns.append(f"generated_{index}")
+        elif kind == 2:
+            patterns.append(f"build_{index}/")
+        elif kind == 3:
+            patterns.append(f"/vendor_{index}/lib/*.js")
+        elif kind == 4:
+            patterns.append(f"docs/*/draft_{index}?.md")
+        else:
+            patterns.append(f"tmp[0-9]_{rnd.randint(0, count)}*")
+    return patterns
+
+
+def build_paths(count, rnd):
+    directories = ["src", "src/pkg", "docs/api", "vendor_3/lib", "tests", "build_2"]
+    names = ["main.py", "index.js", "README.md", "data.ext6", "generated_1", "tmp1_x", "draft_40a.md"]
+    return [
+        (f"{rnd.choice(directories)}/{rnd.choice(names)}", rnd.random() < 0.2)
+        for _ in range(count)
+    ]
+
+
+def reference_matches(patterns, path, is_dir):
+    """CompiledIgnorePatterns 導入前の IgnorePatterns.matches と同じ処理。"""
+    normalized_path = PurePosixPath(str(path).replace("\\", "/"))
+    for pattern in patterns:
+        if IgnorePatterns._matches_pattern(pattern, normalized_path, is_dir):
+            return True
+    return False
+
+
+def run(pattern_count, path_count, seed=0):
+    rnd = random.Random(seed)
+    patterns = IgnorePatterns(patterns=build_patterns(pattern_count, rnd)).patterns
+    paths = build_paths(path_count, rnd)
+
+    started = time.perf_counter()
+    expected = [reference_matches(patterns, path, is_dir) for path, is_dir in paths]
+    reference_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = CompiledIgnorePatterns(patterns)
+    actual = [compiled.matches(path, is_dir=is_dir) for path, is_dir in paths]
+    compiled_seconds = time.perf_counter() - started
+
+    if actual != expected:
+        raise AssertionError("compiled matcher disagrees with the reference implementation")
+    return reference_seconds, compiled_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ignore pattern matching.")
+    parser.add_argument("--patterns", type=int, default=300)
+    parser.add_argument("--paths", type=int, default=20000)
+    args = parser.parse_args()
+
+    reference_seconds, compiled_seconds = run(args.patterns, args.paths)
+    print(f"patterns: {args.patterns}, paths: {args.paths}")
+    print(f"reference: {reference_seconds:.3f}s")
+    print(f"compiled:  {compiled_seconds:.3f}s")
+    print(f"speedup:   {reference_seconds / max(compiled_seconds, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
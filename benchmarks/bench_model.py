@@ -0,0 +1,95 @@
+"""
+要約の中間モデル（model.py の __slots__ ノード）が 1 ノードあたりに使うメモリを、同じ属性を
+__dict__ に持つクラスと比べて測るベンチマーク。ファイル内容を含めないよう name_type_only で走査する。
+
+実行例:
+    python -m benchmarks.bench_model --scale 4
+"""
+import argparse
+from pathlib import Path
+import sys
+import tempfile
+import tracemalloc
+
+from generate_project_summary.model import DirectoryNode, FileNode, SkippedNode
+from generate_project_summary.summarizer import ProjectSummarizer
+
+from .synthetic_tree import generate_tree
+
+
+def build_nodes(project_dir):
+    """project_dir のすべてのエントリのノードを作ってリストで返す。"""
+    summarizer = ProjectSummarizer(project_dir, name_type_only=True)
+    entries = summarizer._scan_project()
+    return list(summarizer._iter_nodes(entries))
+
+
+def as_dict_node(node):
+    """node と同じ属性を __dict__ に持つオブジェクトを作る。"""
+    plain = _PlainNode()
+    for name in type(node).__slots__:
+        setattr(plain, name, getattr(node, name))
+    return plain
+
+
+class _PlainNode:
+    pass
+
+
+def measure(factory):
+    """factory() が返すオブジェクトが確保したまま残るメモリ（バイト）と、そのオブジェクトを返す。"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = factory()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def run(project_dir):
+    slots_bytes, nodes = measure(lambda: build_nodes(project_dir))
+    # 走査と名前の文字列の分は両方に共通するため、ノードのオブジェクトだけを比べる
+    object_bytes, _ = measure(lambda: [type(node).__new__(type(node)) for node in nodes])
+    dict_bytes, _ = measure(lambda: [as_dict_node(node) for node in nodes])
+    counts = {
+        kind.__name__: sum(1 for node in nodes if type(node) is kind)
+        for kind in (DirectoryNode, FileNode, SkippedNode)
+    }
+    return {
+        "nodes": len(nodes),
+        "counts": counts,
+        "total_bytes": slots_bytes,
+        "slots_object_bytes": object_bytes,
+        "dict_object_bytes": dict_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory footprint of summary model nodes.")
+    parser.add_argument("--project", help="Measure an existing directory instead of a synthetic tree.")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        if args.project:
+            project_dir = Path(args.project)
+        else:
+            project_dir = Path(temporary_dir) / "synthetic_project"
+            stats = generate_tree(project_dir, scale=args.scale, seed=args.seed)
+            print(f"synthetic tree: {stats['files']} files, {stats['bytes'] / 1e6:.1f} MB")
+        report = run(project_dir)
+
+    nodes = max(report["nodes"], 1)
+    counts = ", ".join(f"{name}: {count}" for name, count in report["counts"].items())
+    print(f"nodes: {report['nodes']} ({counts})")
+    print(f"scan + nodes: {report['total_bytes'] / nodes:.0f} bytes/node")
+    print(f"__slots__ objects: {report['slots_object_bytes'] / nodes:.0f} bytes/node")
+    print(f"__dict__ objects: {report['dict_object_bytes'] / nodes:.0f} bytes/node")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+ProjectSummarizer の処理を段階ごとに計測するベンチマーク
+
+合成プロジェクト（benchmarks.synthetic_tree）に対して、ディレクトリの列挙、無視パターンの判定、
+ファイルの判定・読み込み、出力の書き込みの時間を別々に計測し、ファイル数/秒、MB/秒、
+最大 RSS を表示する。--baseline で保存済みの結果と比較し、許容範囲を超えて遅くなった段階が
+あれば終了コード 1 を返す。
+
+実行例:
+    python -m benchmarks.bench_summarizer
+    python -m benchmarks.bench_summarizer --scale 4 --jobs 4 --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+from generate_project_summary.summarizer import ProjectSummarizer
+
+from .synthetic_tree import generate_tree
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+PHASES = ("enumerate", "ignore", "read", "write")
+
+
+def measure(project_dir, output_file, jobs=1, walk_jobs=1):
+    """
+    各段階を 1 回ずつ計測し、段階ごとの {"seconds", "files", "bytes"} を返す。
+
+    無視パターンの判定は走査中の _is_ignored の呼び出しごとに時間を積算し、
+    列挙の時間は走査全体の時間からそれを引いたものとする（walk_jobs が 2 以上の場合、
+    判定の時間は各スレッドの合計になる）。
+    """
+    summarizer = ProjectSummarizer(project_dir, jobs=jobs, walk_jobs=walk_jobs)
+    ignore_durations = []
+    original_is_ignored = summarizer._is_ignored
+
+    def timed_is_ignored(relative_path, is_dir, ignore_layers=()):
+        started = time.perf_counter()
+        try:
+            return original_is_ignored(relative_path, is_dir, ignore_layers)
+        finally:
+            ignore_durations.append(time.perf_counter() - started)
+
+    summarizer._is_ignored = timed_is_ignored
+    started = time.perf_counter()
+    entries = summarizer._scan_project()
+    scan_seconds = time.perf_counter() - started
+    summarizer._is_ignored = original_is_ignored
+    ignore_seconds = sum(ignore_durations)
+
+    file_entries = [
+        (relative_path, payload) for kind, _, _, relative_path, payload in entries if kind == "file"
+    ]
+    input_bytes = sum(entry.stat().st_size for _, entry in file_entries)
+    started = time.perf_counter()
+    results = list(summarizer._iter_file_results(file_entries))
+    read_seconds = time.perf_counter() - started
+
+    # 読み込み済みの結果を使い、出力の組み立てと書き込みだけを計測する
+    summarizer._scan_project = lambda: entries
+    summarizer._iter_file_results = lambda _: (result for result in results)
+    started = time.perf_counter()
+    summarizer.generate_project_summary(output_file=output_file)
+    write_seconds = time.perf_counter() - started
+
+    return {
+        "enumerate": {
+            "seconds": max(scan_seconds - ignore_seconds, 0.0),
+            "files": len(entries),
+            "bytes": 0,
+        },
+        "ignore": {"seconds": ignore_seconds, "files": len(ignore_durations), "bytes": 0},
+        "read": {"seconds": read_seconds, "files": len(file_entries), "bytes": input_bytes},
+        "write": {
+            "seconds": write_seconds,
+            "files": len(file_entries),
+            "bytes": Path(output_file).stat().st_size,
+        },
+    }
+
+
+def run(project_dir, repeat=3, jobs=1, walk_jobs=1):
+    """measure を repeat 回実行し、段階ごとに最も速かった結果と最大 RSS を返す。"""
+    best = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = Path(output_dir) / "summary.txt"
+        for _ in range(repeat):
+            for phase, result in measure(project_dir, output_file, jobs, walk_jobs).items():
+                if phase not in best or result["seconds"] < best[phase]["seconds"]:
+                    best[phase] = result
+    return {"phases": best, "peak_rss_bytes": peak_rss_bytes()}
+
+
+def peak_rss_bytes():
+    """プロセスの最大 RSS（バイト）。取得できない環境では None を返す。"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KiB、macOS はバイト単位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_report(report):
+    lines = [f"{'phase':<10} {'seconds':>9} {'items/s':>12} {'MB/s':>9}"]
+    for phase in PHASES:
+        result = report["phases"][phase]
+        seconds = max(result["seconds"], 1e-9)
+        megabytes_per_second = f"{result['bytes'] / seconds / 1e6:9.1f}" if result["bytes"] else f"{'-':>9}"
+        lines.append(
+            f"{phase:<10} {result['seconds']:9.4f} {result['files'] / seconds:12.0f} {megabytes_per_second}"
+        )
+    if report["peak_rss_bytes"] is not None:
+        lines.append(f"peak RSS: {report['peak_rss_bytes'] / 1e6:.1f} MB")
+    return "\n".join(lines)
+
+
+def compare(report, baseline, tolerance):
+    """
+    baseline と比べて (tolerance の割合を超えて) 遅くなった段階の一覧と、比較結果の行を返す。
+    """
+    regressions = []
+    lines = []
+    for phase in PHASES:
+        previous = baseline["phases"].get(phase)
+        if previous is None:
+            continue
+        ratio = report["phases"][phase]["seconds"] / max(previous["seconds"], 1e-9)
+        marker = ""
+        if ratio > 1 + tolerance:
+            regressions.append(phase)
+            marker = "  <-- slower"
+        lines.append(f"{phase:<10} {ratio:6.2f}x baseline{marker}")
+    return regressions, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ProjectSummarizer phase by phase.")
+    parser.add_argument("--project", help="Benchmark an existing directory instead of a synthetic tree.")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--walk-jobs", type=int, default=1)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        if args.project:
+            project_dir = Path(args.project)
+        else:
+            project_dir = Path(temporary_dir) / "synthetic_project"
+            stats = generate_tree(project_dir, scale=args.scale, seed=args.seed)
+            print(f"synthetic tree: {stats['files']} files, {stats['bytes'] / 1e6:.1f} MB")
+        report = run(project_dir, repeat=args.repeat, jobs=args.jobs, walk_jobs=args.walk_jobs)
+
+    report["settings"] = {
+        "project": args.project,
+        "scale": args.scale,
+        "seed": args.seed,
+        "jobs": args.jobs,
+        "walk_jobs": args.walk_jobs,
+    }
+    print(format_report(report))
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline saved: {args.save_baseline}")
+        return 0
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.is_file():
+        return 0
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("settings") != report["settings"]:
+        print(f"baseline {baseline_path} was recorded with different settings; not compared")
+        return 0
+
+    regressions, lines = compare(report, baseline, args.tolerance)
+    print(f"compared with {baseline_path}:")
+    print("\n".join(lines))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+ベンチマーク用の合成プロジェクトを作る。同じ scale と seed からは常に同じツリーができる。
+
+実行例:
+    python -m benchmarks.synthetic_tree /tmp/synthetic_project --scale 2
+"""
+import argparse
+from pathlib import Path
+import random
+
+
+WORDS = (
+    "alpha", "beta", "gamma", "delta", "value", "index", "result", "config", "handler",
+    "request", "response", "buffer", "stream", "token", "parser", "render", "summary",
+)
+JAPANESE_LINES = (
+    "これは合成されたテキストです。",
+    "設定ファイルを読み込みます。",
+    "処理が完了しました。",
+    "ファイルの一覧を作成します。",
+)
+
+
+def generate_tree(root, scale=1, seed=0):
+    """
+    root 以下に合成プロジェクトを作る。
+
+    Args:
+        root (str or Path): 作成先のディレクトリ（存在しない場合は作成する）
+        scale (int, optional): ファイル数とサイズの倍率
+        seed (int, optional): 乱数のシード
+
+    Returns:
+        dict: 作成したファイル数 "files" と合計バイト数 "bytes"
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    rnd = random.Random(seed)
+    stats = {"files": 0, "bytes": 0}
+
+    def write(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        stats["files"] += 1
+        stats["bytes"] += len(data)
+
+    write(root / ".gitignore", _gitignore(200 * scale, rnd))
+
+    # 幅の広いツリー: 多数のパッケージにそれぞれ小さなソースファイル
+    for package in range(40 * scale):
+        package_dir = root / "src" / f"package_{package:03d}"
+        for module in range(12):
+            write(package_dir / f"module_{module:02d}.py", _python_source(rnd, 20 + rnd.randint(0, 60)))
+        write(package_dir / "README.md", _text_lines(rnd, 10).encode("utf-8"))
+        if package % 5 == 0:
+            write(package_dir / ".gitignore", b"*.generated\nbuild/\n!keep.generated\n")
+            write(package_dir / "output.generated", b"ignored")
+            write(package_dir / "keep.generated", b"kept\n")
+            write(package_dir / "build" / "artifact.txt", b"ignored")
+
+    # 深いツリー
+    deep_dir = root / "deep"
+    for depth in range(30):
+        deep_dir = deep_dir / f"level_{depth:02d}"
+        write(deep_dir / "note.txt", _text_lines(rnd, 3).encode("utf-8"))
+
+    # 大きなテキストファイル（mmap で出力される大きさと、サイズ上限を超える大きさ）
+    for index in range(2 * scale):
+        write(root / "data" / f"large_{index}.txt", _text_lines(rnd, 8000).encode("utf-8"))
+    write(root / "data" / "huge.log.txt", _text_lines(rnd, 40000).encode("utf-8"))
+
+    # バイナリと Shift-JIS のファイル
+    for index in range(20 * scale):
+        write(root / "assets" / f"image_{index:03d}.bin", rnd.getrandbits(4096 * 8).to_bytes(4096, "little"))
+    for index in range(10 * scale):
+        text = "\r\n".join(rnd.choice(JAPANESE_LINES) for _ in range(50))
+        write(root / "docs" / f"sjis_{index:02d}.txt", text.encode("shift_jis"))
+
+    # .gitignore で除外されるディレクトリ
+    for index in range(100 * scale):
+        write(root / "node_modules" / f"dep_{index:03d}" / "index.js", b"module.exports = {};\n")
+    return stats
+
+
+def _gitignore(count, rnd):
+    patterns = ["node_modules/", "*.log", "__pycache__/", "/dist/", "*.tmp"]
+    for index in range(count):
+        kind = index % 4
+        if kind == 0:
+            patterns.append(f"*.ext{index}")
+        elif kind == 1:
+            patterns.append(f"generated_{index}/")
+        elif kind == 2:
+            patterns.append(f"src/*/cache_{index}.py")
+        else:
+            patterns.append(f"tmp[0-9]_{rnd.randint(0, count)}*")
+    return ("\n".join(patterns) + "\n").encode("utf-8")
+
+
+def _python_source(rnd, lines):
+    body = []
+    for index in range(lines):
+        name = rnd.choice(WORDS)
+        body.append(f"def {name}_{index}(value):\n    return value + {rnd.randint(0, 1000)}\n")
+    return "\n".join(body).encode("utf-8")
+
+
+def _text_lines(rnd, lines):
+    return "\n".join(
+        " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 12))) for _ in range(lines)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic project for benchmarks.")
+    parser.add_argument("root")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats = generate_tree(args.root, scale=args.scale, seed=args.seed)
+    print(f"files: {stats['files']}, bytes: {stats['bytes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import os
+import time
+
+from .cache import default_cache_path
+from .ignore_patterns import CompiledPatternCache
+from .summarizer import ProjectSummarizer
+
+
+# ワーカープロセスごとに、処理するすべてのプロジェクトで共有するコンパイル済み無視パターン
+_shared_pattern_cache = CompiledPatternCache()
+
+
+class BatchResult:
+    """
+    summarize_projects で処理した 1 プロジェクトの結果。失敗した場合は error に理由が入る。
+    時間・バイト数の予算を使い切って途中で打ち切った場合は partial_reason にその説明が入る。
+    """
+
+    __slots__ = ("project_dir", "output_file", "error", "total_files", "seconds", "partial_reason")
+
+    def __init__(self, project_dir, output_file, error=None, total_files=0, seconds=0.0, partial_reason=None):
+        self.project_dir = project_dir
+        self.output_file = output_file
+        self.error = error
+        self.total_files = total_files
+        self.seconds = seconds
+        self.partial_reason = partial_reason
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def read_batch_manifest(manifest_path):
+    """
+    バッチのマニフェストを読み込み、(プロジェクトのパス, 出力ファイルのパスまたは None) のリストを返す。
+
+    1 行に 1 プロジェクトを書き、出力先を指定する場合はタブで区切って続ける。空行と "#" で始まる行は無視する。
+    相対パスはマニフェストのあるディレクトリからのパスとみなす。
+    """
+    manifest_path = Path(manifest_path)
+    base_dir = manifest_path.resolve().parent
+    projects = []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            project_dir, _, output_file = line.partition("\t")
+            project_dir = base_dir / project_dir.strip()
+            output_file = base_dir / output_file.strip() if output_file.strip() else None
+            projects.append((project_dir, output_file))
+    return projects
+
+
+def summarize_projects(projects, output_dir=None, workers=None, use_default_cache=False, on_result=None, **options):
+    """
+    複数のプロジェクトの要約を 1 つのプロセスプールで作成する。
+
+    プロジェクトごとにワーカープロセスを起動するのではなく、workers 個のプロセスがプロジェクトを順に処理する。
+    同じワーカーで処理するプロジェクトは、コンパイル済みの無視パターンを共有する。
+    1 つのプロジェクトの失敗は、他のプロジェクトの処理に影響しない。
+
+    Args:
+        projects (iterable): (プロジェクトのパス, 出力ファイルのパスまたは None) のペア
+        output_dir (str or Path, optional): 出力先を指定していないプロジェクトの要約を書き出すディレクトリ。
+            ファイル名は <project_name>_project_summary.txt（output_format が "jsonl" の場合は .jsonl）で、
+            同じ名前のプロジェクトには番号を付ける
+        workers (int, optional): ワーカープロセスの数。指定しない場合は CPU 数。1 の場合は呼び出し元のプロセスで処理する
+        use_default_cache (bool, optional): True の場合、プロジェクトごとの既定の場所の永続キャッシュを使う
+        on_result (callable, optional): 各プロジェクトの処理が終わるたびに（完了順に）BatchResult を渡して呼ぶ
+        **options: ProjectSummarizer に渡す引数
+
+    Returns:
+        list: 入力順に並んだ BatchResult のリスト
+    """
+    output_dir = Path(output_dir) if output_dir is not None else Path.cwd()
+    tasks = []
+    used_names = {}
+    extension = "jsonl" if options.get("output_format") == "jsonl" else "txt"
+    for project_dir, output_file in projects:
+        project_dir = Path(project_dir).resolve()
+        if output_file is None:
+            count = used_names.get(project_dir.name, 0)
+            used_names[project_dir.name] = count + 1
+            suffix = f"-{count + 1}" if count else ""
+            output_file = output_dir / f"{project_dir.name}{suffix}_project_summary.{extension}"
+        tasks.append((project_dir, Path(output_file).resolve(), use_default_cache, options))
+
+    workers = workers or os.cpu_count() or 1
+    results = [None] * len(tasks)
+    if workers <= 1 or len(tasks) <= 1:
+        for index, task in enumerate(tasks):
+            results[index] = _summarize_project(*task)
+            if on_result is not None:
+                on_result(results[index])
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        futures = {executor.submit(_summarize_project, *task): index for index, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                # ワーカープロセスの異常終了など、_summarize_project の外で起きた失敗
+                project_dir, output_file = tasks[index][:2]
+                result = BatchResult(project_dir, output_file, error=_describe_error(exc))
+            results[index] = result
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def _summarize_project(project_dir, output_file, use_default_cache, options):
+    """1 プロジェクトの要約を作成する。ワーカープロセスで実行され、例外は BatchResult の error にする。"""
+    started = time.perf_counter()
+    try:
+        if not project_dir.is_dir():
+            raise NotADirectoryError(f"Path is not a directory: {project_dir}")
+        summarizer = ProjectSummarizer(
+            project_dir,
+            cache_path=default_cache_path(project_dir) if use_default_cache else None,
+            compiled_pattern_cache=_shared_pattern_cache,
+            **options,
+        )
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        summarizer.generate_project_summary(output_file=output_file)
+    except Exception as exc:
+        return BatchResult(project_dir, output_file, error=_describe_error(exc), seconds=time.perf_counter() - started)
+    finally:
+        # 判定結果のキャッシュはプロジェクトのパスごとに増えるため、次のプロジェクトには持ち越さない
+        _shared_pattern_cache.clear_caches()
+    return BatchResult(
+        project_dir,
+        output_file,
+        total_files=summarizer.total_files,
+        seconds=time.perf_counter() - started,
+        partial_reason=summarizer.partial_reason,
+    )
+
+
+def _describe_error(exc):
+    return f"{type(exc).__name__}: {exc}"
@@ -0,0 +1,154 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+def default_cache_path(project_dir):
+    """
+    プロジェクトごとのキャッシュファイルの既定の保存先を返す。
+
+    Args:
+        project_dir (Path): プロジェクトのディレクトリパス
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    base_dir = Path(base) if base else Path.home() / ".cache"
+    digest = hashlib.sha1(str(project_dir).encode("utf-8")).hexdigest()[:16]
+    return base_dir / "generate-project-summary" / f"{project_dir.name}-{digest}.sqlite"
+
+
+class FragmentCache:
+    """
+    ファイルごとの判定結果と内容を SQLite に保存する永続キャッシュ
+
+    キーは (相対パス, サイズ, mtime_ns, inode) で、いずれかが変わったファイルはキャッシュを使わない。
+    判定に影響する設定（文字コードの候補やサイズ上限）が前回と異なる場合は全件を破棄する。
+    保存した内容の合計が max_bytes を超えた場合は、最後に使われた実行が古いものから削除する。
+    """
+
+    FORMAT_VERSION = 3
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    # mtime がこの時間内のファイルは、同じ mtime のまま書き換えられる可能性があるため保存しない
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, path, settings, max_bytes=None):
+        """
+        Args:
+            path (str or Path): キャッシュファイルのパス
+            settings (list): 判定に影響する設定。JSON に変換できる値
+            max_bytes (int, optional): 保存する内容の合計サイズの上限
+        """
+        self.path = Path(path)
+        self.max_bytes = self.DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._started_ns = time.time_ns()
+        self._used_paths = []
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+        # 形式が変わった場合に備え、設定が異なる場合はテーブルごと作り直す
+        signature = json.dumps([self.FORMAT_VERSION, settings])
+        if self._get_meta("settings") != signature:
+            self._connection.execute("DROP TABLE IF EXISTS fragments")
+            self._set_meta("settings", signature)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fragments (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                content BLOB,
+                length INTEGER NOT NULL,
+                last_used INTEGER NOT NULL,
+                digest TEXT,
+                encoding TEXT
+            );
+            CREATE INDEX IF NOT EXISTS fragments_last_used ON fragments (last_used);
+            """
+        )
+        self._generation = int(self._get_meta("generation") or 0) + 1
+        self._set_meta("generation", str(self._generation))
+
+    def lookup(self, relative_path, file_stat, with_details=False):
+        """
+        キャッシュされた (種別, 内容のバイト列) を返す。見つからない場合は None を返す。
+        with_details が True の場合は (種別, 内容のバイト列, ダイジェスト, 文字コード) を返す
+        （ダイジェストと文字コードは None の場合がある）。
+        """
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, inode, kind, content, digest, encoding FROM fragments WHERE path = ?",
+            (relative_path,),
+        ).fetchone()
+        if row is None or tuple(row[:3]) != self._stat_key(file_stat):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._used_paths.append((self._generation, relative_path))
+        if with_details:
+            return row[3], row[4], row[5], row[6]
+        return row[3], row[4]
+
+    def store(self, relative_path, file_stat, kind, content=None, digest=None, encoding=None):
+        """判定結果を保存する。更新直後のファイルは保存しない。"""
+        if file_stat.st_mtime_ns >= self._started_ns - self.RACY_WINDOW_NS:
+            return
+        self._connection.execute(
+            "INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                relative_path,
+                *self._stat_key(file_stat),
+                kind,
+                content,
+                len(content) if content else 0,
+                self._generation,
+                digest,
+                encoding,
+            ),
+        )
+
+    def close(self):
+        """利用履歴を反映し、上限を超えた分を削除してから保存する。"""
+        try:
+            self._connection.executemany(
+                "UPDATE fragments SET last_used = ? WHERE path = ?", self._used_paths
+            )
+            self._evict()
+            self._connection.commit()
+        finally:
+            self._connection.close()
+
+    def _evict(self):
+        total = self._connection.execute("SELECT COALESCE(SUM(length), 0) FROM fragments").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for path, length in self._connection.execute(
+            "SELECT path, length FROM fragments ORDER BY last_used, length DESC"
+        ):
+            if total <= self.max_bytes:
+                break
+            evicted.append((path,))
+            total -= length
+        self._connection.executemany("DELETE FROM fragments WHERE path = ?", evicted)
+
+    @staticmethod
+    def _stat_key(file_stat):
+        return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+    def _get_meta(self, key):
+        row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
@@ -0,0 +1,150 @@
+import codecs
+import hashlib
+from pathlib import PurePath
+
+
+# 拡張子（小文字）からテキストと判定するファイル
+TEXT_EXTENSIONS = frozenset({
+    ".adoc", ".asm", ".bash", ".bat", ".bib", ".c", ".cc", ".cfg", ".cjs", ".clj", ".cljs", ".cmake",
+    ".cmd", ".conf", ".cpp", ".cs", ".csproj", ".css", ".csv", ".cxx", ".dart", ".diff", ".elm", ".erl",
+    ".ex", ".exs", ".fish", ".fs", ".fsx", ".go", ".gradle", ".graphql", ".h", ".hh", ".hpp", ".hrl",
+    ".hs", ".htm", ".html", ".ini", ".ipynb", ".java", ".jl", ".js", ".json", ".jsx", ".kt", ".kts",
+    ".less", ".lua", ".m", ".md", ".mjs", ".mk", ".mm", ".nim", ".org", ".patch", ".php", ".pl", ".pm",
+    ".properties", ".proto", ".ps1", ".py", ".pyi", ".r", ".rb", ".rs", ".rst", ".s", ".sass", ".scala",
+    ".scss", ".sh", ".sln", ".sql", ".svelte", ".svg", ".swift", ".tex", ".toml", ".ts", ".tsv", ".tsx",
+    ".txt", ".vb", ".vcxproj", ".vue", ".xml", ".yaml", ".yml", ".zig", ".zsh",
+})
+# 拡張子（小文字）からバイナリと判定するファイル
+BINARY_EXTENSIONS = frozenset({
+    ".7z", ".a", ".aac", ".avi", ".avif", ".bin", ".bmp", ".bz2", ".ckpt", ".class", ".db", ".dll",
+    ".doc", ".docx", ".dylib", ".egg", ".eot", ".exe", ".flac", ".gif", ".gz", ".h5", ".hdf5", ".heic",
+    ".ico", ".jar", ".jpeg", ".jpg", ".lib", ".m4a", ".mkv", ".mov", ".mp3", ".mp4", ".npy", ".npz",
+    ".o", ".obj", ".odp", ".ods", ".odt", ".ogg", ".onnx", ".otf", ".parquet", ".pdf", ".pickle",
+    ".pkl", ".png", ".ppt", ".pptx", ".psd", ".pt", ".pth", ".pyc", ".pyd", ".pyo", ".rar",
+    ".safetensors", ".so", ".sqlite", ".sqlite3", ".tar", ".tgz", ".tif", ".tiff", ".ttf", ".war",
+    ".wasm", ".wav", ".webm", ".webp", ".whl", ".woff", ".woff2", ".xls", ".xlsx", ".xz", ".zip", ".zst",
+})
+# 拡張子の無い（またはドットで始まる）よく知られたテキストファイルの名前（小文字）
+TEXT_FILE_NAMES = frozenset({
+    ".dockerignore", ".editorconfig", ".env", ".eslintrc", ".gitattributes", ".gitignore",
+    ".gitmodules", ".npmrc", ".prettierrc", ".summaryignore", "authors", "changelog", "codeowners",
+    "copying", "dockerfile", "gemfile", "jenkinsfile", "license", "makefile", "notice", "procfile",
+    "rakefile", "readme", "vagrantfile",
+})
+BINARY_FILE_NAMES = frozenset({".ds_store"})
+# 先頭のバイト列からバイナリと判定する形式（NUL を含まないため NUL の有無では判定できないもの）
+BINARY_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"%PDF-",
+    b"PK\x03\x04",  # ZIP / JAR / Office
+    b"PK\x05\x06",
+    b"\x1f\x8b",  # gzip
+    b"\xfd7zXZ",  # xz
+    b"7z\xbc\xaf\x27\x1c",
+    b"Rar!\x1a\x07",
+    b"\x28\xb5\x2f\xfd",  # zstd
+    b"\x7fELF",
+    b"\xca\xfe\xba\xbe",  # Mach-O (fat) / Java class
+    b"\xcf\xfa\xed\xfe",  # Mach-O
+    b"\xfe\xed\xfa\xcf",
+    b"OggS",
+    b"fLaC",
+    b"ID3",  # MP3
+    b"8BPS",  # Photoshop
+    b"wOFF",
+    b"wOF2",
+)
+# 印字可能な ASCII だけでできたマジックナンバー（"ID3" や "%PDF-" など）は普通のテキストの先頭にも現れるため、
+# 先頭のブロックがテキストとして読めない場合にだけバイナリと判定する
+_TEXT_LIKE_SIGNATURES = tuple(
+    signature for signature in BINARY_SIGNATURES if all(0x20 <= byte < 0x7F for byte in signature)
+)
+_TRUSTED_SIGNATURES = tuple(
+    signature for signature in BINARY_SIGNATURES if signature not in _TEXT_LIKE_SIGNATURES
+)
+# テキストにも現れる制御文字（タブ、改行、改ページ、エスケープ）
+_TEXT_CONTROL_BYTES = frozenset(b"\t\n\r\f\x1b")
+# 先頭のブロックがテキストかどうかを確かめる文字コード（ProjectSummarizer.TEXT_ENCODINGS と同じもの）
+_SNIFF_ENCODINGS = ("utf-8", "shift_jis")
+
+
+class ExtensionClassifier:
+    """
+    ファイルを開かずに、名前（拡張子）からテキストかバイナリかを判定するクラス
+
+    既定の表に含まれない拡張子は判定できず（None）、呼び出し側がファイルの先頭を読んで判定する。
+    その場合に使うマジックナンバーの判定も提供する。
+    """
+
+    def __init__(self, text_extensions=(), binary_extensions=()):
+        """
+        Args:
+            text_extensions (iterable, optional): 既定の表に加えてテキストとみなす拡張子（例：['.tmpl']）
+            binary_extensions (iterable, optional): 既定の表に加えてバイナリとみなす拡張子。
+                テキストの表と重なる場合はこちらを優先する
+        """
+        binary = {extension.lower() for extension in binary_extensions}
+        self.binary_extensions = BINARY_EXTENSIONS | binary
+        self.text_extensions = (TEXT_EXTENSIONS | {extension.lower() for extension in text_extensions}) - binary
+
+    def classify(self, name):
+        """
+        ファイル名から "text" / "binary" を返す。判定できない場合は None を返す。
+        """
+        lower_name = name.lower()
+        if lower_name in TEXT_FILE_NAMES:
+            return "text"
+        if lower_name in BINARY_FILE_NAMES:
+            return "binary"
+        suffix = PurePath(lower_name).suffix
+        if suffix in self.binary_extensions:
+            return "binary"
+        if suffix in self.text_extensions:
+            return "text"
+        return None
+
+    def fingerprint(self):
+        """
+        判定表とマジックナンバーの一覧のダイジェスト。判定結果を保存するキャッシュの設定に含め、
+        表が変わった場合に以前の結果を使わないようにする。
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for table in (
+            self.text_extensions, self.binary_extensions, TEXT_FILE_NAMES, BINARY_FILE_NAMES, BINARY_SIGNATURES,
+        ):
+            for item in sorted(table):
+                digest.update(item if isinstance(item, bytes) else item.encode("utf-8"))
+                digest.update(b"\0")
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    @staticmethod
+    def has_binary_signature(data):
+        """
+        先頭のバイト列が既知のバイナリ形式のマジックナンバーで始まるかどうか。
+
+        印字可能な ASCII だけのマジックナンバーは、data（ファイルの先頭のブロック）に制御文字が含まれるか、
+        どの文字コードでもデコードできない場合にだけ一致とみなす。
+        """
+        if data.startswith(_TRUSTED_SIGNATURES):
+            return True
+        # MP4 / MOV などの ISO BMFF は 4 バイト目から "ftyp" が続く
+        if data.startswith(_TEXT_LIKE_SIGNATURES) or data[4:8] == b"ftyp":
+            return not _looks_like_text(data)
+        return False
+
+
+def _looks_like_text(data):
+    if any(byte < 0x20 and byte not in _TEXT_CONTROL_BYTES for byte in data):
+        return False
+    for encoding in _SNIFF_ENCODINGS:
+        try:
+            # ブロックの末尾で切れた文字は、続きがあるものとして扱う
+            codecs.getincrementaldecoder(encoding)().decode(data, final=False)
+        except UnicodeDecodeError:
+            continue
+        return True
+    return False
@@ -0,0 +1,468 @@
+from collections import OrderedDict
+from pathlib import Path
+import hmac
+import json
+import os
+import secrets
+import shutil
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+
+from .ignore_patterns import CompiledPatternCache
+from .summarizer import ProjectSummarizer
+from .watch import ChangeSet, InotifyWatcher, SummaryWatcher
+
+
+PROTOCOL_VERSION = 1
+# AF_UNIX が使えない環境（古い Windows など）で待ち受ける localhost のポート
+DEFAULT_TCP_PORT = 47800
+DEFAULT_MAX_PROJECTS = 16
+# 保持する要約の合計サイズの上限。超えた場合は最後に使われたのが古いプロジェクトから破棄する
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# クライアントが指定できる ProjectSummarizer の引数（監視による差分更新と両立するもの）
+DAEMON_OPTIONS = frozenset({
+    "additional_ignore_patterns",
+    "file_types",
+    "name_type_only",
+    "fast_classify",
+    "max_file_bytes",
+    "excerpt_bytes",
+    "jobs",
+})
+_MAX_REQUEST_BYTES = 1024 * 1024
+
+
+class DaemonError(RuntimeError):
+    """デーモンに接続できない、またはデーモンが要求を処理できなかった場合の例外"""
+
+
+def runtime_dir():
+    """
+    既定のソケットファイルと TCP の認証用トークンを置く、ユーザーごとのディレクトリのパスを返す。
+    $XDG_RUNTIME_DIR（無ければ一時ディレクトリ）の下の generate-project-summary-<ユーザー>。
+    """
+    base_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return Path(base_dir) / f"generate-project-summary-{user}"
+
+
+def default_address():
+    """
+    既定の待ち受けアドレスを返す。AF_UNIX が使える場合は runtime_dir() の中のソケットファイルのパス、
+    使えない場合は "tcp:<ポート>"。
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return f"tcp:{DEFAULT_TCP_PORT}"
+    return str(runtime_dir() / "daemon.sock")
+
+
+def _parse_address(address):
+    """アドレスを (ソケットの種類, socket に渡すアドレス) にする。"tcp:<ポート>" は localhost だけで待ち受ける。"""
+    address = address or default_address()
+    if address.startswith("tcp:"):
+        return socket.AF_INET, ("127.0.0.1", int(address[4:]))
+    return socket.AF_UNIX, address
+
+
+def _token_path(port):
+    """"tcp:<ポート>" で待ち受けるデーモンの認証用トークンのパス"""
+    return runtime_dir() / f"tcp-{port}.token"
+
+
+def _prepare_directory(directory, create=False):
+    """
+    ソケットファイルやトークンを置くディレクトリが、現在のユーザーのもの（シンボリックリンクではない）で
+    他のユーザーが書き込めないことを確かめる。runtime_dir() は読み取りもできないこと（0700）を求め、
+    create が真なら無い場合に 0700 で作る。満たさない場合は DaemonError。
+    所有者を持たないファイルシステム（Windows）では確かめない。
+    """
+    directory = Path(directory)
+    private = directory == runtime_dir()
+    if create and private:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        except OSError as exc:
+            raise DaemonError(f"cannot create {directory}: {exc}") from exc
+    if not hasattr(os, "getuid"):
+        return
+    try:
+        directory_stat = os.lstat(directory)
+    except OSError as exc:
+        raise DaemonError(f"cannot use {directory} for the summary daemon: {exc}") from exc
+    if not stat.S_ISDIR(directory_stat.st_mode) or directory_stat.st_uid != os.getuid():
+        raise DaemonError(f"{directory} is not a directory owned by the current user")
+    if directory_stat.st_mode & (0o077 if private else 0o022):
+        raise DaemonError(f"{directory} is accessible by other users")
+
+
+def _write_token(path):
+    """新しいトークンを所有者だけが読めるファイルに書き出して返す。"""
+    token = secrets.token_hex(32)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(token)
+    return token
+
+
+def _read_token(port):
+    path = _token_path(port)
+    _prepare_directory(path.parent)
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            return f.read().strip()
+    except OSError as exc:
+        raise DaemonError(f"no summary daemon is listening on tcp:{port}") from exc
+
+
+class _WarmProject:
+    """
+    デーモンが保持する 1 プロジェクト分の状態
+
+    SummaryWatcher がディレクトリごとの一覧とファイルごとの出力（内容は出力ファイル内の位置）を保持し、
+    要求のたびに inotify のイベント（使えない場合は stat による再走査）で変わった分だけを読み直す。
+    """
+
+    def __init__(self, summarizer, output_file, use_inotify):
+        self.lock = threading.Lock()
+        self.watcher = SummaryWatcher(summarizer, output_file=output_file, use_inotify=False)
+        self.use_inotify = use_inotify
+        self._changes = None
+        self._built = False
+
+    @property
+    def output_size(self):
+        try:
+            return self.watcher.output_file.stat().st_size
+        except OSError:
+            return 0
+
+    def refresh(self):
+        """
+        要約を最新にし、読み直したファイル数を返す（出力を書き換えなかった場合は None）。
+        呼び出し元は lock を保持していること。
+        """
+        if not self._built:
+            inspected = self.watcher.build()
+            self._built = True
+            if self.use_inotify:
+                self._changes = self._open_inotify()
+                if self._changes is not None:
+                    # 監視を始める前の変更を取りこぼさないよう、一覧だけをもう一度確かめる
+                    inspected = self.watcher.update(ChangeSet(full=True)) or inspected
+            return inspected
+
+        if self._changes is None:
+            changes = ChangeSet(full=True)
+        else:
+            changes = self._changes.wait(0)
+        inspected = self.watcher.update(changes) if changes else None
+        if self._changes is not None:
+            try:
+                self.watcher.sync_watcher(self._changes)
+            except OSError:
+                # 監視できるディレクトリ数の上限などで失敗した場合は、以降は再走査で検出する
+                self._changes.close()
+                self._changes = None
+        return inspected
+
+    def close(self):
+        if self._changes is not None:
+            self._changes.close()
+            self._changes = None
+        self.watcher.remove_output()
+        # 共有しているコンパイル済みの無視パターンに残る、このプロジェクトのパスの判定結果を手放す
+        self.watcher.summarizer.release_ignore_caches()
+
+    def _open_inotify(self):
+        try:
+            watcher = InotifyWatcher(self.watcher.summarizer.project_dir, debounce_seconds=0)
+        except (OSError, AttributeError):
+            return None
+        try:
+            self.watcher.sync_watcher(watcher)
+        except OSError:
+            watcher.close()
+            return None
+        return watcher
+
+
+class SummaryDaemon:
+    """
+    要約の要求を Unix ドメインソケット（使えない環境では localhost の TCP）で受け付けるデーモン
+
+    プロジェクトと設定の組ごとに _WarmProject を保持し、変わっていないツリーへの要求には
+    前回の出力をそのまま返す。保持するプロジェクト数と要約の合計サイズは上限を超えないよう、
+    最後に使われたのが古いものから破棄する。コンパイル済みの無視パターンはすべてのプロジェクトで共有し、
+    件数は CompiledPatternCache の上限までとする。
+
+    ソケットファイルは他のユーザーが書き込めないディレクトリ（既定では 0700 の runtime_dir()）に置き、
+    所有者だけが接続できるようにする。TCP では接続元のユーザーを確かめられないため、runtime_dir() に
+    所有者だけが読めるトークンを書き出し、同じトークンを送った要求だけを受け付ける。
+
+    プロトコル: クライアントは 1 行の JSON（{"project_dir": ..., "options": {...}}、TCP では "token" も）を送る。
+    デーモンは 1 行の JSON のヘッダ（{"ok": true, "size": <バイト数>, "inspected": ...} または
+    {"ok": false, "error": ...}）を返し、成功した場合はその後に要約のバイト列を続ける。
+    """
+
+    def __init__(
+        self,
+        address=None,
+        max_projects=DEFAULT_MAX_PROJECTS,
+        max_bytes=DEFAULT_MAX_BYTES,
+        use_inotify=True,
+    ):
+        """
+        Args:
+            address (str, optional): ソケットファイルのパスまたは "tcp:<ポート>"。デフォルトは default_address()
+            max_projects (int, optional): 状態を保持するプロジェクト数の上限
+            max_bytes (int, optional): 保持する要約の合計サイズの上限
+            use_inotify (bool, optional): False の場合は要求のたびに stat による再走査で変更を検出する
+        """
+        self.address = address or default_address()
+        self.max_projects = max_projects
+        self.max_bytes = max_bytes
+        self.use_inotify = use_inotify
+        self._projects = OrderedDict()
+        self._projects_lock = threading.Lock()
+        self._compiled_pattern_cache = CompiledPatternCache()
+        self._state_dir = None
+        self._token = None
+        self._server = None
+        self._next_id = 0
+        # 待ち受けを始めたときにセットされる
+        self.ready = threading.Event()
+
+    def serve_forever(self):
+        """shutdown が呼ばれるか、"shutdown" の要求を受けるまで要求を処理する。"""
+        family, address = _parse_address(self.address)
+        if family == socket.AF_UNIX:
+            _prepare_directory(Path(address).parent, create=True)
+            _remove_stale_socket(address)
+            server_class = _ThreadingUnixServer
+        else:
+            token_path = _token_path(address[1])
+            _prepare_directory(token_path.parent, create=True)
+            server_class = _ThreadingTCPServer
+        self._state_dir = Path(tempfile.mkdtemp(prefix="generate-project-summary-"))
+        self._server = server_class(address, _RequestHandler)
+        self._server.summary_daemon = self
+        try:
+            if family == socket.AF_UNIX:
+                os.chmod(address, 0o600)
+            else:
+                # 待ち受けを始めてから書き出し、動いている別のデーモンのトークンを上書きしないようにする
+                self._token = _write_token(token_path)
+            self.ready.set()
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if family == socket.AF_UNIX:
+                _remove_file(address)
+            elif self._token is not None:
+                _remove_file(token_path)
+                self._token = None
+            with self._projects_lock:
+                for project in self._projects.values():
+                    project.close()
+                self._projects.clear()
+            shutil.rmtree(self._state_dir, ignore_errors=True)
+
+    def shutdown(self):
+        if self._server is not None:
+            # serve_forever のスレッド以外から呼ぶ必要がある
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def authenticate(self, request):
+        """TCP で待ち受けている場合に、要求のトークンが一致しなければ DaemonError。"""
+        if self._token is None:
+            return
+        token = request.get("token")
+        if not isinstance(token, str) or not hmac.compare_digest(token.encode("utf-8"), self._token.encode("ascii")):
+            raise DaemonError("authentication failed")
+
+    def summarize(self, project_dir, options=None):
+        """
+        プロジェクトの要約を最新にし、(ヘッダの dict, 要約を読むために開いたファイル) を返す。
+
+        ファイルは要求の処理中に置き換えられても読み続けられるよう、ロックを保持している間に開く。
+        """
+        options = dict(options or {})
+        unknown = set(options) - DAEMON_OPTIONS
+        if unknown:
+            raise DaemonError(f"unsupported options: {', '.join(sorted(unknown))}")
+        project_dir = Path(project_dir).resolve()
+        if not project_dir.is_dir():
+            raise DaemonError(f"Path is not a directory: {project_dir}")
+
+        key = (str(project_dir), json.dumps(options, sort_keys=True))
+        with self._projects_lock:
+            project = self._projects.get(key)
+            if project is None:
+                project = self._create_project(project_dir, options)
+                self._projects[key] = project
+            self._projects.move_to_end(key)
+
+        with project.lock:
+            inspected = project.refresh()
+            f = open(project.watcher.output_file, "rb")
+        size = os.fstat(f.fileno()).st_size
+        self._evict(keep=key)
+        return {"ok": True, "size": size, "inspected": inspected or 0}, f
+
+    def _create_project(self, project_dir, options):
+        self._next_id += 1
+        summarizer = ProjectSummarizer(
+            project_dir, compiled_pattern_cache=self._compiled_pattern_cache, **options
+        )
+        output_file = self._state_dir / f"{self._next_id}.txt"
+        return _WarmProject(summarizer, output_file, self.use_inotify)
+
+    def _evict(self, keep):
+        with self._projects_lock:
+            total = sum(project.output_size for project in self._projects.values())
+            for key in list(self._projects):
+                if len(self._projects) <= self.max_projects and total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                project = self._projects.pop(key)
+                with project.lock:
+                    total -= project.output_size
+                    project.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.summary_daemon
+        f = None
+        try:
+            line = self.rfile.readline(_MAX_REQUEST_BYTES)
+            request = json.loads(line)
+            daemon.authenticate(request)
+            if request.get("command") == "shutdown":
+                header = {"ok": True, "size": 0}
+                daemon.shutdown()
+            else:
+                header, f = daemon.summarize(request["project_dir"], request.get("options"))
+        except Exception as exc:
+            header = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+        try:
+            self.wfile.write(json.dumps(header).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if f is not None:
+                self.connection.sendfile(f)
+        except OSError:
+            # クライアントが先に切断した場合
+            pass
+        finally:
+            if f is not None:
+                f.close()
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+else:
+    _ThreadingUnixServer = None
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _remove_file(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _remove_stale_socket(path):
+    """前回のデーモンが残したソケットファイルを削除する。動いているデーモンがある場合は DaemonError。"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise DaemonError(f"a summary daemon is already listening on {path}")
+
+
+def request_summary(project_dir, out, address=None, timeout=None, **options):
+    """
+    デーモンに要約を要求し、要約のバイト列を out（バイナリの書き込み用ファイル）に書き出す。
+
+    Args:
+        project_dir (str or Path): プロジェクトのディレクトリパス
+        out (file object): 要約を書き出すファイル
+        address (str, optional): デーモンのアドレス。デフォルトは default_address()
+        timeout (float, optional): ソケット操作のタイムアウト（秒）
+        **options: ProjectSummarizer の引数（DAEMON_OPTIONS のもの）
+
+    Returns:
+        dict: デーモンが返したヘッダ
+
+    Raises:
+        DaemonError: 接続できない場合、またはデーモンがエラーを返した場合
+    """
+    request = {"version": PROTOCOL_VERSION, "project_dir": str(Path(project_dir).resolve()), "options": options}
+    return _send_request(request, out, address, timeout)
+
+
+def stop_daemon(address=None, timeout=None):
+    """デーモンに終了を要求する。"""
+    return _send_request({"version": PROTOCOL_VERSION, "command": "shutdown"}, None, address, timeout)
+
+
+def _send_request(request, out, address, timeout):
+    family, socket_address = _parse_address(address)
+    if family == socket.AF_UNIX:
+        directory = Path(socket_address).parent
+        if not directory.is_dir():
+            raise DaemonError(f"no summary daemon is listening on {address or default_address()}")
+        # 他のユーザーが置き換えられるソケットには要求を送らない
+        _prepare_directory(directory)
+    else:
+        request = dict(request, token=_read_token(socket_address[1]))
+    try:
+        connection = socket.socket(family, socket.SOCK_STREAM)
+    except (OSError, AttributeError) as exc:
+        raise DaemonError(f"cannot create a socket for {address or default_address()}: {exc}") from exc
+    with connection:
+        connection.settimeout(timeout)
+        try:
+            connection.connect(socket_address)
+        except OSError as exc:
+            raise DaemonError(f"no summary daemon is listening on {address or default_address()}") from exc
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with connection.makefile("rb") as response:
+            header = json.loads(response.readline() or b"null")
+            if not isinstance(header, dict):
+                raise DaemonError("the summary daemon closed the connection")
+            if not header.get("ok"):
+                raise DaemonError(header.get("error", "unknown error"))
+            remaining = header.get("size", 0)
+            while remaining:
+                chunk = response.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    raise DaemonError("the summary daemon closed the connection")
+                out.write(chunk)
+                remaining -= len(chunk)
+    return header
@@ -0,0 +1,188 @@
+from pathlib import Path
+import os
+import stat
+import struct
+
+
+INDEX_SIGNATURE = b"DIRC"
+# ctime, mtime, dev, ino, mode, uid, gid, size（いずれも 32 ビット）
+_ENTRY_STAT = struct.Struct(">10I")
+_ENTRY_FLAGS = struct.Struct(">H")
+_FLAG_EXTENDED = 0x4000
+_FLAG_NAME_MASK = 0x0FFF
+_EXTENDED_FLAG_SKIP_WORKTREE = 0x4000
+_MODE_GITLINK = 0o160000
+_MODE_SPARSE_DIRECTORY = 0o040000
+
+
+class GitIndexError(ValueError):
+    """.git/index を解釈できない場合の例外"""
+
+
+class GitIndexEntry:
+    """
+    .git/index に記録されたファイル 1 件。os.DirEntry と同じく path / name / stat() を持つ。
+
+    stat() は作業ツリー上のファイルを初回だけ stat し、結果を再利用する。
+    index_size は index に記録されたサイズ（下位 32 ビット）で、作業ツリーのファイルが index の更新後に
+    変更されていれば実際のサイズとは異なる。そのため、並べ替えや見積もりにだけ使う。
+    """
+
+    __slots__ = ("path", "name", "relative_path", "mode", "index_size", "_stat")
+
+    def __init__(self, path, relative_path, mode, index_size):
+        self.path = path
+        self.name = relative_path.rpartition("/")[2]
+        self.relative_path = relative_path
+        self.mode = mode
+        self.index_size = index_size
+        self._stat = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path, follow_symlinks=False)
+        return self._stat
+
+    def is_symlink(self):
+        return stat.S_ISLNK(self.mode)
+
+    def is_gitlink(self):
+        return self.mode == _MODE_GITLINK
+
+
+def find_git_dir(start_dir):
+    """
+    start_dir を含む作業ツリーを探し、(作業ツリーのルート, git ディレクトリ) を返す。
+    見つからない場合は None を返す。".git" がファイルの場合（worktree やサブモジュール）は
+    "gitdir:" の参照先をたどる。
+    """
+    start_dir = Path(start_dir)
+    for candidate in (start_dir, *start_dir.parents):
+        dot_git = candidate / ".git"
+        if dot_git.is_dir():
+            return candidate, dot_git
+        if dot_git.is_file():
+            text = dot_git.read_text(encoding="utf-8", errors="replace").strip()
+            if text.startswith("gitdir:"):
+                git_dir = Path(text[len("gitdir:"):].strip())
+                if not git_dir.is_absolute():
+                    git_dir = candidate / git_dir
+                return candidate, git_dir
+    return None
+
+
+def read_git_index(project_dir):
+    """
+    project_dir 以下の追跡ファイルを .git/index から読み込む。git コマンドは使わない。
+
+    Args:
+        project_dir (Path): プロジェクトのディレクトリパス（作業ツリーのサブディレクトリでもよい）
+
+    Returns:
+        list: project_dir からの相対パス（"/" 区切り）を持つ GitIndexEntry のリスト。
+            マージ中の同じパスのエントリは 1 件にまとめ、skip-worktree のエントリと
+            スパースディレクトリは含まない。
+    """
+    project_dir = Path(project_dir)
+    located = find_git_dir(project_dir)
+    if located is None:
+        raise FileNotFoundError(f"Git repository not found for: {project_dir}")
+    work_tree, git_dir = located
+
+    prefix = project_dir.relative_to(work_tree).as_posix()
+    prefix = "" if prefix == "." else f"{prefix}/"
+
+    with open(git_dir / "index", "rb") as f:
+        data = f.read()
+    return _parse_index(data, _hash_size(git_dir), prefix, str(project_dir))
+
+
+def _hash_size(git_dir):
+    """リポジトリのオブジェクト形式（SHA-1 / SHA-256）からハッシュのバイト数を決める。"""
+    config_paths = [git_dir / "config"]
+    commondir = git_dir / "commondir"
+    if commondir.is_file():
+        common = Path(commondir.read_text(encoding="utf-8").strip())
+        config_paths.append(common if common.is_absolute() else git_dir / common / "config")
+    for config_path in config_paths:
+        try:
+            config = config_path.read_text(encoding="utf-8", errors="replace").lower()
+        except OSError:
+            continue
+        if "objectformat" in config and "sha256" in config:
+            return 32
+    return 20
+
+
+def _parse_index(data, hash_size, prefix, project_dir):
+    if len(data) < 12 or data[:4] != INDEX_SIGNATURE:
+        raise GitIndexError("not a git index file")
+    version, count = struct.unpack_from(">II", data, 4)
+    if version not in (2, 3, 4):
+        raise GitIndexError(f"unsupported git index version: {version}")
+
+    entries = []
+    seen = set()
+    offset = 12
+    previous_name = b""
+    fixed_size = _ENTRY_STAT.size + hash_size + _ENTRY_FLAGS.size
+    prefix_bytes = os.fsencode(prefix)
+
+    for _ in range(count):
+        fields = _ENTRY_STAT.unpack_from(data, offset)
+        mode = fields[6]
+        size = fields[9]
+        (flags,) = _ENTRY_FLAGS.unpack_from(data, offset + _ENTRY_STAT.size + hash_size)
+        name_offset = offset + fixed_size
+        extended_flags = 0
+        if flags & _FLAG_EXTENDED:
+            (extended_flags,) = _ENTRY_FLAGS.unpack_from(data, name_offset)
+            name_offset += _ENTRY_FLAGS.size
+
+        if version == 4:
+            strip_length, name_offset = _read_varint(data, name_offset)
+            name_end = data.index(b"\0", name_offset)
+            name = previous_name[:len(previous_name) - strip_length] + data[name_offset:name_end]
+            offset = name_end + 1
+        else:
+            name_length = flags & _FLAG_NAME_MASK
+            if name_length == _FLAG_NAME_MASK:
+                name_end = data.index(b"\0", name_offset)
+            else:
+                name_end = name_offset + name_length
+            name = data[name_offset:name_end]
+            # エントリは NUL を 1〜8 バイト付けて 8 バイト境界にそろえられている
+            offset += (name_end - offset + 8) // 8 * 8
+        previous_name = name
+
+        if (
+            extended_flags & _EXTENDED_FLAG_SKIP_WORKTREE
+            or mode == _MODE_SPARSE_DIRECTORY
+            or not name.startswith(prefix_bytes)
+            or name in seen
+        ):
+            continue
+        seen.add(name)
+
+        relative_path = os.fsdecode(name[len(prefix_bytes):])
+        entries.append(
+            GitIndexEntry(
+                os.path.join(project_dir, *relative_path.split("/")),
+                relative_path,
+                mode,
+                size,
+            )
+        )
+    return entries
+
+
+def _read_varint(data, offset):
+    """index v4 のパス圧縮で使われる可変長整数を読む。"""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, offset
@@ -1,5 +1,15 @@
-﻿from pathlib import PurePosixPath
+﻿from collections import OrderedDict
+from pathlib import PurePosixPath
 import fnmatch
+import os
+import re
+import threading
+
+
+GLOB_CHARACTERS = frozenset("*?[")
+# PurePosixPath による正規化が必要なパス（"./" や "//"、末尾の "/" を含むもの）
+_NEEDS_NORMALIZATION = re.compile(r"(?:^|/)\.(?:/|$)|//|/$")
+_UNKNOWN = object()
 
 
 class IgnorePatterns:
@@ -9,6 +19,7 @@ class IgnorePatterns:
 
     def __init__(self, file_path=None, patterns=None):
         self.patterns = []
+        self._compiled = None
         if patterns:
             for pattern in patterns:
                 self.add_pattern(pattern)
@@ -17,15 +28,26 @@ class IgnorePatterns:
 
     def add_pattern(self, pattern):
         normalized = pattern.strip().replace("\\", "/")
-        if normalized and normalized not in self.patterns:
-            self.patterns.append(normalized)
+        if not normalized:
+            return
+        if normalized in self.patterns:
+            if normalized == self.patterns[-1]:
+                return
+            # "!" による否定は後勝ちなので、重複したパターンは末尾に移す
+            self.patterns.remove(normalized)
+        self.patterns.append(normalized)
+        self._compiled = None
 
     def matches(self, relative_path, is_dir=False):
-        normalized_path = PurePosixPath(str(relative_path).replace("\\", "/"))
-        for pattern in self.patterns:
-            if self._matches_pattern(pattern, normalized_path, is_dir):
-                return True
-        return False
+        return self.compile().matches(relative_path, is_dir=is_dir)
+
+    def compile(self):
+        """
+        パターンを CompiledIgnorePatterns に変換する。結果はパターンが追加されるまで再利用する。
+        """
+        if self._compiled is None:
+            self._compiled = CompiledIgnorePatterns(self.patterns)
+        return self._compiled
 
     @staticmethod
     def _matches_pattern(pattern, relative_path, is_dir):
@@ -86,3 +108,233 @@ class IgnorePatterns:
 
         for pattern in lines:
             self.add_pattern(pattern)
+
+
+class CompiledIgnorePatterns:
+    """
+    IgnorePatterns のパターン列をまとめて判定するクラス
+
+    "!" で始まるパターンは直前までの判定を打ち消す（.gitignore と同じく後に書かれたものが優先）。
+    否定の有無が変わる位置でパターン列を区切り、区切りごとに _PatternGroup へコンパイルする。
+    ディレクトリの判定結果はパスごとにキャッシュする（MAX_CACHED_DIRECTORIES 件を超えたら破棄する）。
+    """
+
+    MAX_CACHED_DIRECTORIES = 65536
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        groups = []
+        run = []
+        run_negated = False
+        for pattern in self.patterns:
+            negated = pattern.startswith("!")
+            if run and negated != run_negated:
+                groups.append((not run_negated, _PatternGroup(run)))
+                run = []
+            run_negated = negated
+            run.append(pattern[1:] if negated else pattern)
+        if run:
+            groups.append((not run_negated, _PatternGroup(run)))
+
+        # 後ろのグループほど優先されるため、逆順に評価する
+        self._groups = tuple(reversed(groups))
+        self._directory_verdicts = {}
+
+    def matches(self, relative_path, is_dir=False):
+        return self.verdict(relative_path, is_dir=is_dir) is True
+
+    def verdict(self, relative_path, is_dir=False):
+        """
+        パスに対する判定を返す。
+
+        Returns:
+            bool or None: 無視するなら True、"!" パターンで除外されたなら False、
+                どのパターンにも一致しなければ None
+        """
+        path_str = self._normalize(relative_path)
+        if is_dir:
+            verdict = self._directory_verdicts.get(path_str, _UNKNOWN)
+            if verdict is _UNKNOWN:
+                verdict = self._evaluate(path_str, True)
+                if len(self._directory_verdicts) >= self.MAX_CACHED_DIRECTORIES:
+                    self._directory_verdicts.clear()
+                self._directory_verdicts[path_str] = verdict
+            return verdict
+        return self._evaluate(path_str, False)
+
+    def clear_caches(self):
+        """判定結果のキャッシュを破棄する。コンパイル済みのパターンはそのまま使える。"""
+        self._directory_verdicts.clear()
+        for _, group in self._groups:
+            group.clear_caches()
+
+    def _evaluate(self, path_str, is_dir):
+        if not path_str:
+            return None
+        for ignored, group in self._groups:
+            if group.matches(path_str, is_dir):
+                return ignored
+        return None
+
+    @staticmethod
+    def _normalize(relative_path):
+        path_str = str(relative_path).replace("\\", "/")
+        if path_str == ".":
+            return ""
+        if _NEEDS_NORMALIZATION.search(path_str):
+            path_str = PurePosixPath(path_str).as_posix()
+            if path_str == ".":
+                return ""
+        return path_str
+
+
+class CompiledPatternCache:
+    """
+    パターン列ごとの CompiledIgnorePatterns を、複数の ProjectSummarizer で共有するためのキャッシュ
+
+    件数が max_entries を超えたら、最後に使われたのが古いものから捨てる（LRU）。
+    ProjectSummarizer の compiled_pattern_cache には dict の代わりにこれを渡せる。複数のスレッドから使える。
+    """
+
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries=None):
+        self.max_entries = self.DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+    def get(self, patterns, default=None):
+        with self._lock:
+            compiled = self._entries.get(patterns)
+            if compiled is None:
+                return default
+            self._entries.move_to_end(patterns)
+            return compiled
+
+    def __setitem__(self, patterns, compiled):
+        with self._lock:
+            self._entries[patterns] = compiled
+            self._entries.move_to_end(patterns)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear_caches(self):
+        """保持しているすべての CompiledIgnorePatterns の判定結果のキャッシュを破棄する。"""
+        with self._lock:
+            entries = list(self._entries.values())
+        for compiled in entries:
+            compiled.clear_caches()
+
+
+class _PatternGroup:
+    """
+    否定を含まないパターン列を、パターン数に依存しにくい形で判定するクラス
+
+    - ワイルドカードを含まない名前（例: "node_modules"）は basename の集合で判定する
+    - "*.ext" 形式は拡張子の集合で判定する
+    - それ以外のパターンは 1 つの正規表現にまとめる
+    - ファイル名単位の判定結果はキャッシュする
+    """
+
+    MAX_CACHED_NAMES = 65536
+
+    def __init__(self, patterns):
+        self._literal_names = (set(), set())
+        self._extensions = (set(), set())
+        name_globs = ([], [])
+        path_globs = []
+        directory_path_globs = []
+
+        for pattern in patterns:
+            anchored = pattern.startswith("/")
+            if anchored:
+                pattern = pattern.lstrip("/")
+            directory_only = pattern.endswith("/")
+            if directory_only:
+                pattern = pattern.rstrip("/")
+            if not pattern:
+                continue
+
+            if "/" not in pattern:
+                # スラッシュを含まないパターンは先頭の "/" があっても basename に対して判定される
+                bucket = 1 if directory_only else 0
+                if not GLOB_CHARACTERS.intersection(pattern):
+                    self._literal_names[bucket].add(os.path.normcase(pattern))
+                elif pattern.startswith("*.") and not GLOB_CHARACTERS.intersection(pattern[1:]):
+                    self._extensions[bucket].add(os.path.normcase(pattern[1:]))
+                else:
+                    name_globs[bucket].append(pattern)
+                continue
+
+            target = directory_path_globs if directory_only else path_globs
+            if directory_only:
+                pattern = f"{pattern}/"
+            target.append(pattern)
+            if not anchored:
+                target.append(f"*/{pattern}")
+
+        self._name_regexes = tuple(self._combine(globs) for globs in name_globs)
+        self._path_regex = self._combine(path_globs)
+        self._directory_path_regex = self._combine(directory_path_globs)
+        self._has_extensions = any(self._extensions)
+        self._name_verdicts = ({}, {})
+
+    def matches(self, path_str, is_dir):
+        normalized_path = os.path.normcase(path_str)
+        # Windows の normcase は "/" を os.sep に変換するため、区切り文字は os.sep で探す
+        basename = normalized_path[normalized_path.rfind(os.sep) + 1:]
+        buckets = (0, 1) if is_dir else (0,)
+        for bucket in buckets:
+            if self._matches_name(basename, bucket):
+                return True
+            # "*" は "/" にも一致するため、スラッシュを含まないグロブはパス全体にも適用される
+            name_regex = self._name_regexes[bucket]
+            if name_regex is not None and name_regex.match(normalized_path):
+                return True
+
+        if self._path_regex is not None and self._path_regex.match(normalized_path):
+            return True
+        if is_dir and self._directory_path_regex is not None:
+            return bool(self._directory_path_regex.match(os.path.normcase(f"{path_str}/")))
+        return False
+
+    def clear_caches(self):
+        for verdicts in self._name_verdicts:
+            verdicts.clear()
+
+    def _matches_name(self, basename, bucket):
+        verdicts = self._name_verdicts[bucket]
+        verdict = verdicts.get(basename)
+        if verdict is not None:
+            return verdict
+
+        verdict = basename in self._literal_names[bucket]
+        if not verdict and self._has_extensions:
+            extensions = self._extensions[bucket]
+            position = basename.find(".")
+            while position != -1 and not verdict:
+                verdict = basename[position:] in extensions
+                position = basename.find(".", position + 1)
+        if not verdict:
+            name_regex = self._name_regexes[bucket]
+            verdict = name_regex is not None and bool(name_regex.match(basename))
+
+        if len(verdicts) >= self.MAX_CACHED_NAMES:
+            verdicts.clear()
+        verdicts[basename] = verdict
+        return verdict
+
+    @staticmethod
+    def _combine(globs):
+        if not globs:
+            return None
+        return re.compile(
+            "|".join(f"(?:{fnmatch.translate(os.path.normcase(glob))})" for glob in globs)
+        )
@@ -1,8 +1,16 @@
 import argparse
+import json
+import os
+import sys
 from pathlib import Path
 
-from .progress import StderrProgressReporter
+from .batch import read_batch_manifest, summarize_projects
+from .cache import default_cache_path
+from .daemon import DaemonError, SummaryDaemon, default_address, request_summary
+from .output import compressed_opener
+from .progress import JsonLinesProgressReporter, PROGRESS_INTERVAL_SECONDS, StderrProgressReporter
 from .summarizer import ProjectSummarizer
+from .watch import SummaryWatcher
 
 
 def main():
@@ -26,7 +34,10 @@ def main():
         "-o", "--output",
         type=str,
         default=None,
-        help="Specify the output file name (default: <project_name>_project_summary.txt)."
+        help=(
+            "Specify the output file name (default: <project_name>_project_summary.txt). "
+            "Use '-' to write the summary to standard output."
+        ),
     )
     parser.add_argument(
         "-i", "--ignore",
@@ -48,7 +59,353 @@ def main():
             "File contents are not included."
         ),
     )
+    parser.add_argument(
+        "--fast-classify",
+        action="store_true",
+        help=(
+            "Decide text/binary from the file extension when it is a known type and read only the "
+            "first bytes (NUL and magic numbers) of unknown types. With -n no file is opened or "
+            "stat'ed beyond the directory walk unless its extension is unknown."
+        ),
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker threads used to inspect and read files (default: 1).",
+    )
+    parser.add_argument(
+        "--walk-jobs",
+        type=int,
+        default=1,
+        help="Number of worker threads used to list directories (default: 1).",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        nargs="?",
+        const="",
+        default=None,
+        help=(
+            "Reuse per-file results from a persistent cache. "
+            "--cache alone stores the cache in the user cache directory; "
+            "--cache PATH uses the given file."
+        ),
+    )
+    parser.add_argument(
+        "--git-index",
+        action="store_true",
+        help=(
+            "List only files tracked in the Git index (.git/index) instead of walking the directory. "
+            ".gitignore is not evaluated; .summaryignore and -i patterns still apply."
+        ),
+    )
+    parser.add_argument(
+        "--max-file-bytes",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Embed text files up to N bytes (default: "
+            f"{ProjectSummarizer.DEFAULT_MAX_TEXT_FILE_BYTES}). Larger files are listed as omitted."
+        ),
+    )
+    parser.add_argument(
+        "--excerpt-bytes",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Instead of omitting text files larger than --max-file-bytes, embed their first and last "
+            "N bytes, trimmed to whole lines. Only those bytes are read."
+        ),
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help=(
+            "Limit the estimated token count of the output. The directory structure is always kept; "
+            "file contents are included from the smallest file up while they fit, and the rest are "
+            "listed under Skipped Items without being read."
+        ),
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help=(
+            "Stop listing directories and reading files after SECONDS. Files not read by then are listed "
+            "by name only, and the summary is marked as partial under Skipped Items."
+        ),
+    )
+    parser.add_argument(
+        "--max-total-bytes",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Read at most N bytes of file contents in total. Files after the first one that does not fit "
+            "are listed by name only, and the summary is marked as partial under Skipped Items."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help=(
+            "Write a JSON report with time per phase, stat/open/decode counts, ignore-match and cache "
+            "statistics and the slowest files and directories to PATH."
+        ),
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help=(
+            "Embed the contents of identical files only once; later copies are listed as "
+            "'(identical to <path>)'."
+        ),
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Write the BLAKE2b digest of every embedded file to PATH (b2sum -l 128 format).",
+    )
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help=(
+            "Write a snapshot index (path, size, mtime and BLAKE2b digest of every listed file) to PATH "
+            "for a later --since run."
+        ),
+    )
+    parser.add_argument(
+        "--since",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help=(
+            "Summarize only the files added, modified or removed since the snapshot at PATH. "
+            "Only changed files are read."
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=("markdown", "jsonl"),
+        default="markdown",
+        help=(
+            "Output format: 'markdown' (default) or 'jsonl', one JSON object per directory, file and "
+            "skipped entry with its kind, size, encoding and content "
+            "(default output: <project_name>_project_summary.jsonl)."
+        ),
+    )
+    parser.add_argument(
+        "--progress",
+        choices=("auto", "jsonl", "none"),
+        # 指定されたかどうかを --daemon / --serve の検証で区別するため、既定値は検証の後で "auto" にする
+        default=None,
+        help=(
+            "How to report progress on stderr: 'auto' shows a status line for long runs, "
+            "'jsonl' writes one JSON object per event, 'none' disables progress output (default: auto)."
+        ),
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        default=None,
+        metavar="MANIFEST",
+        help=(
+            "Summarize every project listed in MANIFEST (one directory per line, optionally followed by "
+            "a tab and an output file) in one process pool. A failing project does not stop the others."
+        ),
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="With --batch, write summaries without an explicit output file to DIR (default: current directory).",
+    )
+    parser.add_argument(
+        "--batch-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="With --batch, summarize N projects at a time in worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--serve",
+        type=str,
+        nargs="?",
+        const="",
+        default=None,
+        metavar="ADDRESS",
+        help=(
+            "Run a summary daemon that keeps scan results and file contents warm between requests. "
+            "ADDRESS is a Unix socket path or tcp:PORT for localhost (default: "
+            f"{default_address()}). Stop with Ctrl+C."
+        ),
+    )
+    parser.add_argument(
+        "--daemon",
+        type=str,
+        nargs="?",
+        const="",
+        default=None,
+        metavar="ADDRESS",
+        help="Ask a daemon started with --serve for the summary instead of building it in this process.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "Keep running and update the output whenever files in the project change. "
+            "Only changed directories and files are read again. Stop with Ctrl+C."
+        ),
+    )
     args = parser.parse_args()
+    if args.watch and args.git_index:
+        parser.error("--watch cannot be combined with --git-index")
+    if args.max_file_bytes is not None and args.max_file_bytes < 0:
+        parser.error("--max-file-bytes must not be negative")
+    if args.excerpt_bytes is not None and args.excerpt_bytes < 0:
+        parser.error("--excerpt-bytes must not be negative")
+    if args.max_seconds is not None and args.max_seconds < 0:
+        parser.error("--max-seconds must not be negative")
+    if args.max_total_bytes is not None and args.max_total_bytes < 0:
+        parser.error("--max-total-bytes must not be negative")
+    has_budget = args.max_seconds is not None or args.max_total_bytes is not None
+    if has_budget and args.snapshot is not None:
+        parser.error("--max-seconds and --max-total-bytes cannot be combined with --snapshot")
+    if args.watch and has_budget:
+        parser.error("--watch cannot be combined with --max-seconds or --max-total-bytes")
+    if args.watch and args.max_tokens is not None:
+        parser.error("--watch cannot be combined with --max-tokens")
+    if args.watch and args.profile is not None:
+        parser.error("--watch cannot be combined with --profile")
+    if args.watch and (args.snapshot is not None or args.since is not None):
+        parser.error("--watch cannot be combined with --snapshot or --since")
+    if args.watch and (args.dedupe or args.manifest is not None):
+        parser.error("--watch cannot be combined with --dedupe or --manifest")
+    if args.watch and args.format != "markdown":
+        parser.error("--watch supports only --format markdown")
+    if args.watch and args.output == "-":
+        parser.error("--watch cannot write to standard output")
+    if args.watch and args.output is not None and compressed_opener(args.output) is not None:
+        # 監視中は前回の出力から変わっていないファイルの部分を写すため、圧縮した出力には対応しない
+        parser.error("--watch cannot write a compressed output file")
+    if args.batch is None and (args.output_dir is not None or args.batch_workers is not None):
+        parser.error("--output-dir and --batch-workers require --batch")
+    if args.batch is not None:
+        conflicting = [
+            option
+            for option, value in (
+                ("-d", args.directory is not None),
+                ("-o", args.output is not None),
+                ("--cache PATH", bool(args.cache)),
+                ("--profile", args.profile is not None),
+                ("--manifest", args.manifest is not None),
+                ("--snapshot", args.snapshot is not None),
+                ("--since", args.since is not None),
+                ("--watch", args.watch),
+            )
+            if value
+        ]
+        if conflicting:
+            parser.error(f"--batch cannot be combined with {', '.join(conflicting)}")
+
+    if args.serve is not None:
+        # デーモンはクライアントの要求ごとの設定で要約するため、--serve 自体は要約の設定を受け付けない
+        conflicting = [
+            option
+            for option, value in (
+                ("-d", args.directory is not None),
+                ("-o", args.output is not None),
+                ("-i", bool(args.ignore)),
+                ("-t", bool(args.type)),
+                ("-n", args.name_type_only),
+                ("-j", args.jobs != 1),
+                ("--walk-jobs", args.walk_jobs != 1),
+                ("--cache", args.cache is not None),
+                ("--git-index", args.git_index),
+                ("--fast-classify", args.fast_classify),
+                ("--max-file-bytes", args.max_file_bytes is not None),
+                ("--excerpt-bytes", args.excerpt_bytes is not None),
+                ("--max-tokens", args.max_tokens is not None),
+                ("--max-seconds", args.max_seconds is not None),
+                ("--max-total-bytes", args.max_total_bytes is not None),
+                ("--profile", args.profile is not None),
+                ("--dedupe", args.dedupe),
+                ("--manifest", args.manifest is not None),
+                ("--snapshot", args.snapshot is not None),
+                ("--since", args.since is not None),
+                ("--watch", args.watch),
+                ("--batch", args.batch is not None),
+                ("--daemon", args.daemon is not None),
+                ("--format jsonl", args.format != "markdown"),
+                ("--progress", args.progress is not None),
+            )
+            if value
+        ]
+        if conflicting:
+            parser.error(f"--serve cannot be combined with {', '.join(conflicting)}")
+        print(f"Serving summaries on {args.serve or default_address()} (press Ctrl+C to stop)", file=sys.stderr)
+        try:
+            SummaryDaemon(args.serve or None).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.daemon is not None:
+        conflicting = [
+            option
+            for option, value in (
+                ("--cache", args.cache is not None),
+                ("--git-index", args.git_index),
+                ("--max-tokens", args.max_tokens is not None),
+                ("--max-seconds", args.max_seconds is not None),
+                ("--max-total-bytes", args.max_total_bytes is not None),
+                ("--profile", args.profile is not None),
+                ("--dedupe", args.dedupe),
+                ("--manifest", args.manifest is not None),
+                ("--snapshot", args.snapshot is not None),
+                ("--since", args.since is not None),
+                ("--watch", args.watch),
+                ("--batch", args.batch is not None),
+                ("--format jsonl", args.format != "markdown"),
+                ("--walk-jobs", args.walk_jobs != 1),
+                ("--progress", args.progress is not None),
+            )
+            if value
+        ]
+        if conflicting:
+            parser.error(f"--daemon cannot be combined with {', '.join(conflicting)}")
+    if args.progress is None:
+        args.progress = "auto"
+
+    summarizer_options = dict(
+        additional_ignore_patterns=args.ignore,
+        file_types=args.type,
+        name_type_only=args.name_type_only,
+        jobs=args.jobs,
+        walk_jobs=args.walk_jobs,
+        use_git_index=args.git_index,
+        max_tokens=args.max_tokens,
+        deduplicate=args.dedupe,
+        fast_classify=args.fast_classify,
+        max_file_bytes=args.max_file_bytes,
+        excerpt_bytes=args.excerpt_bytes,
+        output_format=args.format,
+        max_seconds=args.max_seconds,
+        max_total_bytes=args.max_total_bytes,
+    )
+    if args.batch is not None:
+        sys.exit(run_batch(args, summarizer_options))
 
     if args.directory is None:
         project_directory = input(
@@ -69,14 +426,157 @@ def main():
                 raise NotADirectoryError(f"Path is not a directory: {project_directory}")
             project_directory = project_directory.resolve()
 
+    if args.daemon is not None:
+        try:
+            write_from_daemon(args, project_directory)
+        except DaemonError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    cache_path = None
+    if args.cache is not None:
+        cache_path = args.cache or default_cache_path(project_directory)
+
+    progress_callback = None
+    if not args.watch:
+        if args.progress == "auto":
+            progress_callback = StderrProgressReporter()
+        elif args.progress == "jsonl":
+            progress_callback = JsonLinesProgressReporter()
+
     summarizer = ProjectSummarizer(
         project_directory,
-        additional_ignore_patterns=args.ignore,
+        progress_callback=progress_callback,
+        cache_path=cache_path,
+        collect_stats=args.profile is not None,
+        progress_interval=PROGRESS_INTERVAL_SECONDS,
+        manifest_path=args.manifest,
+        snapshot_path=args.snapshot,
+        since_snapshot=args.since,
+        **summarizer_options,
+    )
+    if not args.watch:
+        if args.output == "-":
+            write_to_stdout(summarizer)
+        else:
+            summarizer.generate_project_summary(output_file=args.output)
+        if summarizer.partial_reason is not None:
+            print(f"warning: {summarizer.partial_reason}", file=sys.stderr)
+        if args.profile is not None:
+            with open(args.profile, "w", encoding="utf-8") as f:
+                json.dump(summarizer.stats.to_dict(), f, indent=2)
+                f.write("\n")
+        return
+
+    watcher = SummaryWatcher(
+        summarizer,
+        output_file=args.output,
+        on_update=lambda inspected: print(
+            f"Updated {watcher.output_file} ({inspected} files read)", file=sys.stderr
+        ),
+    )
+    print(f"Watching {project_directory} (press Ctrl+C to stop)", file=sys.stderr)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_batch(args, summarizer_options):
+    """
+    --batch のマニフェストに並んだプロジェクトの要約を作成し、結果を 1 行ずつ標準エラー出力に書く。
+    失敗したプロジェクトがあれば 1 を、なければ 0 を返す。
+    """
+    projects = read_batch_manifest(args.batch)
+    show_status = args.progress != "none"
+
+    def report(result):
+        if not show_status:
+            return
+        if result.ok:
+            print(
+                f"ok      {result.project_dir} -> {result.output_file} "
+                f"({result.total_files} files, {result.seconds:.2f}s)",
+                file=sys.stderr,
+            )
+            if result.partial_reason is not None:
+                print(f"        warning: {result.partial_reason}", file=sys.stderr)
+        else:
+            print(f"FAILED  {result.project_dir}: {result.error}", file=sys.stderr)
+
+    results = summarize_projects(
+        projects,
+        output_dir=args.output_dir,
+        workers=args.batch_workers,
+        use_default_cache=args.cache == "",
+        on_result=report,
+        **summarizer_options,
+    )
+    failures = sum(1 for result in results if not result.ok)
+    if show_status:
+        print(f"{len(results) - failures} of {len(results)} projects summarized", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def write_from_daemon(args, project_directory):
+    """
+    --daemon で指定したデーモンから要約を受け取り、-o の出力先に書き出す。
+
+    要約は同じディレクトリの一時ファイルに受け取り、最後まで受け取れた場合だけ出力先に置き換える
+    （デーモンに接続できない場合やエラーの場合は、既存の要約をそのまま残す）。
+    出力先と一時ファイルがプロジェクト内にある場合は、無視パターンとしてデーモンに渡す。
+    """
+    output_file = None
+    temporary_file = None
+    ignore_patterns = list(args.ignore or [])
+    if args.output != "-":
+        output_file = Path(args.output or f"{project_directory.name}_project_summary.txt").resolve()
+        temporary_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+        if project_directory in output_file.parents:
+            relative_dir = output_file.parent.relative_to(project_directory).as_posix()
+            prefix = "/" if relative_dir == "." else f"/{relative_dir}/"
+            ignore_patterns.extend([f"{prefix}{output_file.name}", f"{prefix}.{output_file.name}.*.tmp"])
+
+    options = dict(
+        additional_ignore_patterns=ignore_patterns or None,
         file_types=args.type,
         name_type_only=args.name_type_only,
-        progress_callback=StderrProgressReporter(),
+        fast_classify=args.fast_classify,
+        max_file_bytes=args.max_file_bytes,
+        excerpt_bytes=args.excerpt_bytes,
+        jobs=args.jobs,
     )
-    summarizer.generate_project_summary(output_file=args.output)
+    address = args.daemon or None
+    if args.output == "-":
+        request_summary(project_directory, sys.stdout.buffer, address=address, **options)
+        sys.stdout.buffer.flush()
+        return
+
+    opener = compressed_opener(output_file)
+    try:
+        with (opener(temporary_file) if opener is not None else open(temporary_file, "wb")) as f:
+            request_summary(project_directory, f, address=address, **options)
+        os.replace(temporary_file, output_file)
+    except BaseException:
+        try:
+            os.unlink(temporary_file)
+        except OSError:
+            pass
+        raise
+
+
+def write_to_stdout(summarizer):
+    """要約を iter_summary の断片ごとに標準出力へ書き出す。"""
+    stdout = sys.stdout.buffer
+    try:
+        for chunk in summarizer.iter_summary(output_file="-"):
+            stdout.write(chunk)
+        stdout.flush()
+    except BrokenPipeError:
+        # 受け取り側（head など）が先に終了した場合は、残りを捨てて正常終了する
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+from pathlib import Path
+
+
+class DirectoryNode:
+    """要約に含めるディレクトリ 1 件"""
+
+    __slots__ = ("level", "name", "path")
+
+    def __init__(self, level, name, path):
+        self.level = level
+        self.name = name
+        self.path = path
+
+    def to_record(self):
+        return {"type": "directory", "path": _posix(self.path)}
+
+
+class SkippedNode:
+    """走査の時点で除外したエントリ 1 件（シンボリックリンクなど）"""
+
+    __slots__ = ("level", "name", "path", "reason")
+
+    def __init__(self, level, name, path, reason):
+        self.level = level
+        self.name = name
+        self.path = path
+        self.reason = reason
+
+    def to_record(self):
+        return {"type": "skipped", "path": _posix(self.path), "reason": self.reason}
+
+
+class FileNode:
+    """
+    要約に含めるファイル 1 件
+
+    status は _inspect_file の結果の状態（"content" / "mapped" / "binary" / "too_large" / "excerpt" /
+    "duplicate" / "over_budget" / "undecodable" / "uninspectable" / "unsized" / "text"）、
+    時間・バイト数の予算を使い切ったため読まなかったファイルを表す "cutoff"、
+    またはスナップショットとの比較で削除されたファイルを表す "removed" のいずれか。
+    content は内容の文字列、mmap オブジェクト（"mapped"）、または None。
+    """
+
+    __slots__ = (
+        "level", "name", "path", "status", "size", "encoding", "digest", "skip_reason", "content", "reference",
+    )
+
+    def __init__(
+        self,
+        level,
+        name,
+        path,
+        status,
+        size=None,
+        encoding=None,
+        digest=None,
+        skip_reason=None,
+        content=None,
+        reference=None,
+    ):
+        self.level = level
+        self.name = name
+        self.path = path
+        self.status = status
+        self.size = size
+        self.encoding = encoding
+        self.digest = digest
+        self.skip_reason = skip_reason
+        self.content = content
+        self.reference = reference
+
+    @property
+    def kind(self):
+        """"text" / "binary"、判定できなかった場合は None"""
+        if self.status == "binary":
+            return "binary"
+        if self.status in ("uninspectable", "unsized", "removed", "cutoff"):
+            return None
+        return "text"
+
+    def to_record(self):
+        """JSON に変換できる dict を返す。値が None の項目は含めず、"mapped" は "content" として出力する。"""
+        content = self.content
+        if content is not None and not isinstance(content, str):
+            content = content[:].decode("utf-8")
+        record = {
+            "type": "file",
+            "path": _posix(self.path),
+            "kind": self.kind,
+            "status": "content" if self.status == "mapped" else self.status,
+            "size": self.size,
+            "encoding": self.encoding,
+            "digest": self.digest,
+            "skip_reason": self.skip_reason,
+            "duplicate_of": _posix(self.reference) if self.reference is not None else None,
+            "content": content,
+        }
+        return {key: value for key, value in record.items() if value is not None}
+
+
+def _posix(path):
+    path = str(path)
+    return Path(path).as_posix() if path else "."
@@ -0,0 +1,84 @@
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+
+
+# 出力ファイル名の拡張子ごとの圧縮形式。gzip は gzip コマンドの既定と同じ圧縮レベル 6 を使う
+COMPRESSED_OPENERS = {
+    ".gz": lambda path: gzip.open(path, "wb", compresslevel=6),
+    ".xz": lambda path: lzma.open(path, "wb"),
+    ".bz2": lambda path: bz2.open(path, "wb"),
+}
+# BackgroundWriter が書き込み待ちにしておく断片の最大数
+MAX_PENDING_CHUNKS = 8
+
+
+def compressed_opener(output_file):
+    """
+    出力ファイル名の拡張子に対応する圧縮ファイルを開く関数を返す。圧縮しない場合は None を返す。
+    """
+    name = str(output_file).lower()
+    for suffix, opener in COMPRESSED_OPENERS.items():
+        if name.endswith(suffix):
+            return opener
+    return None
+
+
+class BackgroundWriter:
+    """
+    書き込みを別スレッドで行うクラス
+
+    zlib / lzma / bz2 は圧縮中に GIL を解放するため、圧縮と呼び出し元のファイル読み込みが並行して進む。
+    書き込み待ちの断片は MAX_PENDING_CHUNKS 個までに抑え、それを超えると write は空きを待つ。
+    書き込みスレッドで発生した例外は、次の write または close で送出し直す。
+    """
+
+    _STOP = object()
+
+    def __init__(self, f, max_pending=MAX_PENDING_CHUNKS):
+        """
+        Args:
+            f (file object): バイト列を書き込むファイル
+            max_pending (int, optional): 書き込み待ちにしておく断片の最大数
+        """
+        self.f = f
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, chunk):
+        self._raise_error()
+        self._queue.put(chunk)
+
+    def close(self):
+        """残りの断片を書き終えるまで待つ。"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is self._STOP:
+                return
+            if self._error is not None:
+                # 失敗した後も、呼び出し元が put で止まらないよう断片を読み捨てる
+                continue
+            try:
+                self.f.write(chunk)
+            except BaseException as exc:
+                self._error = exc
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
@@ -1,19 +1,28 @@
+import json
 import sys
 import time
 from pathlib import Path
 
 
+# ファイルごとに発生し、間引いてもよい進捗イベント
+FREQUENT_EVENTS = frozenset({"count_progress", "file_processed"})
+# CLI が ProjectSummarizer に渡す、ファイルごとの進捗イベントの最短間隔（秒）
+PROGRESS_INTERVAL_SECONDS = 0.1
+
+
 class StderrProgressReporter:
     SPINNER_FRAMES = ("|", "/", "-", "\\")
 
-    def __init__(self, stderr=None, clock=None, threshold_seconds=2.0):
+    def __init__(self, stderr=None, clock=None, threshold_seconds=2.0, min_interval_seconds=0.1):
         self.stderr = stderr if stderr is not None else sys.stderr
         self.clock = clock if clock is not None else time.monotonic
         self.threshold_seconds = threshold_seconds
+        self.min_interval_seconds = min_interval_seconds
         self.start_time = None
         self.spinner_index = 0
         self.last_rendered_width = 0
         self.has_rendered = False
+        self.last_frequent_render_time = None
 
     def __call__(self, event):
         event_name = event["event"]
@@ -23,10 +32,22 @@ class StderrProgressReporter:
             self._finish(event)
             return
 
+        if event_name in FREQUENT_EVENTS:
+            # 同じ段階のファイルごとの表示は min_interval_seconds に 1 回までにまとめる
+            now = self.clock()
+            if (
+                self.last_frequent_render_time is not None
+                and now - self.last_frequent_render_time < self.min_interval_seconds
+            ):
+                return
+        else:
+            self.last_frequent_render_time = None
+
         message = self._build_message(event)
         if message is None:
             return
-        self._render(message)
+        if self._render(message) and event_name in FREQUENT_EVENTS:
+            self.last_frequent_render_time = now
 
     def _build_message(self, event):
         event_name = event["event"]
@@ -50,16 +71,18 @@ class StderrProgressReporter:
         return None
 
     def _render(self, message):
+        """表示した場合は True を返す。"""
         if self.start_time is None:
-            return
+            return False
         if (self.clock() - self.start_time) < self.threshold_seconds:
-            return
+            return False
 
         padded_message = message.ljust(self.last_rendered_width)
         self.stderr.write(f"\r{padded_message}")
         self.stderr.flush()
         self.last_rendered_width = len(message)
         self.has_rendered = True
+        return True
 
     def _finish(self, event):
         if not self.has_rendered:
@@ -78,3 +101,45 @@ class StderrProgressReporter:
         frame = self.SPINNER_FRAMES[self.spinner_index]
         self.spinner_index = (self.spinner_index + 1) % len(self.SPINNER_FRAMES)
         return frame
+
+
+class JsonLinesProgressReporter:
+    """
+    進捗イベントを 1 行 1 件の JSON として書き出すレポーター（CI などの機械処理向け）
+
+    各行にはイベントの内容に加えて、count_start からの経過秒数 "elapsed" を含める。
+    ファイルごとのイベントは min_interval_seconds に 1 回までに間引く。
+    """
+
+    def __init__(self, stream=None, clock=None, min_interval_seconds=0.5):
+        self.stream = stream if stream is not None else sys.stderr
+        self.clock = clock if clock is not None else time.monotonic
+        self.min_interval_seconds = min_interval_seconds
+        self.start_time = None
+        self.last_frequent_write_time = None
+
+    def __call__(self, event):
+        now = self.clock()
+        event_name = event["event"]
+        if event_name == "count_start" or self.start_time is None:
+            self.start_time = now
+        if event_name in FREQUENT_EVENTS:
+            if (
+                self.last_frequent_write_time is not None
+                and now - self.last_frequent_write_time < self.min_interval_seconds
+            ):
+                return
+            self.last_frequent_write_time = now
+        else:
+            self.last_frequent_write_time = None
+
+        record = dict(event)
+        record["elapsed"] = round(now - self.start_time, 6)
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=self._to_json) + "\n")
+        self.stream.flush()
+
+    @staticmethod
+    def _to_json(value):
+        if isinstance(value, Path):
+            return value.as_posix()
+        return str(value)
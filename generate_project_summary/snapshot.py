@@ -0,0 +1,113 @@
+import hashlib
+import os
+import struct
+import time
+
+from .cache import FragmentCache
+
+
+SNAPSHOT_SIGNATURE = b"GPSS"
+SNAPSHOT_VERSION = 1
+# ダイジェストは blake2b の 16 バイト（b2sum -l 128 と同じ）
+SNAPSHOT_DIGEST_BYTES = 16
+# 署名, バージョン, 作成時刻 (ns), エントリ数
+_HEADER = struct.Struct("<4sIqI")
+# パスのバイト数, サイズ, mtime_ns, ダイジェスト（この後に UTF-8 のパスが続く）
+_ENTRY = struct.Struct(f"<HQq{SNAPSHOT_DIGEST_BYTES}s")
+_READ_BUFFER_BYTES = 1024 * 1024
+
+
+class SnapshotError(ValueError):
+    """スナップショットのファイルを解釈できない場合の例外"""
+
+
+class SnapshotEntry:
+    """スナップショットに記録されたファイル 1 件"""
+
+    __slots__ = ("size", "mtime_ns", "digest")
+
+    def __init__(self, size, mtime_ns, digest):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+
+
+class Snapshot:
+    """
+    ファイルごとのサイズ、mtime_ns、内容のダイジェストの一覧
+
+    entries のキーは "/" 区切りの相対パス。作成時刻に近い mtime のファイルは、作成後に同じ mtime のまま
+    書き換えられた可能性があるため、サイズと mtime が一致しても内容を比べる必要がある（is_racy）。
+    """
+
+    # タイムスタンプの粒度が粗いファイルシステムにも備え、キャッシュと同じ幅を使う
+    RACY_WINDOW_NS = FragmentCache.RACY_WINDOW_NS
+
+    def __init__(self, entries=None, created_ns=None):
+        self.entries = entries if entries is not None else {}
+        self.created_ns = time.time_ns() if created_ns is None else created_ns
+
+    def is_racy(self, entry):
+        return entry.mtime_ns >= self.created_ns - self.RACY_WINDOW_NS
+
+
+def read_snapshot(path):
+    """
+    write_snapshot で書き出したファイルを読み込む。
+
+    Raises:
+        SnapshotError: 形式が異なる、または途中で切れている場合
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise SnapshotError(f"{path} is not a summary snapshot")
+    signature, version, created_ns, count = _HEADER.unpack_from(data, 0)
+    if signature != SNAPSHOT_SIGNATURE:
+        raise SnapshotError(f"{path} is not a summary snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version} in {path}")
+
+    entries = {}
+    offset = _HEADER.size
+    try:
+        for _ in range(count):
+            path_length, size, mtime_ns, digest = _ENTRY.unpack_from(data, offset)
+            offset += _ENTRY.size
+            relative_path = data[offset:offset + path_length]
+            if len(relative_path) != path_length:
+                raise struct.error("truncated path")
+            offset += path_length
+            entries[relative_path.decode("utf-8", "surrogateescape")] = SnapshotEntry(size, mtime_ns, digest)
+    except struct.error as exc:
+        raise SnapshotError(f"{path} is truncated") from exc
+    return Snapshot(entries, created_ns)
+
+
+def write_snapshot(path, snapshot):
+    """
+    スナップショットを書き出す。一時ファイルに書いてから置き換えるため、途中で失敗しても
+    以前のファイルは壊れない。
+    """
+    parts = [_HEADER.pack(SNAPSHOT_SIGNATURE, SNAPSHOT_VERSION, snapshot.created_ns, len(snapshot.entries))]
+    for relative_path in sorted(snapshot.entries):
+        entry = snapshot.entries[relative_path]
+        encoded_path = relative_path.encode("utf-8", "surrogateescape")
+        parts.append(_ENTRY.pack(len(encoded_path), entry.size, entry.mtime_ns, entry.digest))
+        parts.append(encoded_path)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(b"".join(parts))
+    os.replace(temporary_path, path)
+
+
+def file_digest(path):
+    """ファイルの内容の blake2b ダイジェスト（バイト列）を、一定のメモリで求める。"""
+    digest = hashlib.blake2b(digest_size=SNAPSHOT_DIGEST_BYTES)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_READ_BUFFER_BYTES)
+            if not chunk:
+                return digest.digest()
+            digest.update(chunk)
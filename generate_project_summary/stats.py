@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from pathlib import Path
+import heapq
+import threading
+import time
+
+
+class RunStats:
+    """
+    1 回の要約作成で集計するカウンタと所要時間
+
+    ワーカースレッドからも更新されるため、更新はロックで保護する。
+    ファイルとディレクトリは、所要時間の長いものを top_n 件だけヒープで保持する。
+    """
+
+    COUNTERS = (
+        "scandir_calls",
+        "stat_calls",
+        "open_calls",
+        "bytes_read",
+        "files_inspected",
+        "classified_by_name",
+        "ignore_evaluations",
+        "cache_hits",
+        "cache_misses",
+    )
+    TIMINGS = ("ignore_matching", "decoding")
+
+    def __init__(self, top_n=10):
+        """
+        Args:
+            top_n (int, optional): 所要時間の長いファイル・ディレクトリを記録する件数
+        """
+        self.top_n = top_n
+        self.phases = {}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.timings = dict.fromkeys(self.TIMINGS, 0.0)
+        self.decode_attempts = {}
+        self._slowest_files = []
+        self._slowest_directories = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """with ブロックの実行時間を段階 name の時間として記録する。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.timings[name] += seconds
+
+    def count_decode_attempt(self, encoding):
+        with self._lock:
+            self.decode_attempts[encoding] = self.decode_attempts.get(encoding, 0) + 1
+
+    def record_file(self, relative_path, seconds):
+        with self._lock:
+            self._push(self._slowest_files, seconds, relative_path)
+
+    def record_directory(self, relative_path, seconds):
+        with self._lock:
+            self._push(self._slowest_directories, seconds, relative_path)
+
+    def to_dict(self):
+        """JSON に変換できる形で集計結果を返す。パスは "/" 区切りの相対パスになる。"""
+        with self._lock:
+            return {
+                "phases": dict(self.phases),
+                "counters": dict(self.counters),
+                "timings": dict(self.timings),
+                "decode_attempts": dict(self.decode_attempts),
+                "slowest_files": self._sorted(self._slowest_files),
+                "slowest_directories": self._sorted(self._slowest_directories),
+            }
+
+    def _push(self, heap, seconds, relative_path):
+        item = (seconds, relative_path)
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    @staticmethod
+    def _sorted(heap):
+        return [
+            {"path": Path(relative_path).as_posix() if relative_path else ".", "seconds": seconds}
+            for seconds, relative_path in sorted(heap, reverse=True)
+        ]
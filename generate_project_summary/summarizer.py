@@ -1,11 +1,82 @@
-from pathlib import Path
+from collections import deque
+import codecs
+import hashlib
+import io
+import json
+import mmap
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path, PurePath
+import os
 import stat
+import tempfile
+import time
 
-from .ignore_patterns import IgnorePatterns
+from .cache import FragmentCache
+from .classifier import ExtensionClassifier
+from .git_index import GitIndexEntry, read_git_index
+from .ignore_patterns import CompiledIgnorePatterns, IgnorePatterns
+from .model import DirectoryNode, FileNode, SkippedNode
+from .output import BackgroundWriter, compressed_opener
+from .snapshot import (
+    SNAPSHOT_DIGEST_BYTES,
+    Snapshot,
+    SnapshotEntry,
+    SnapshotError,
+    file_digest,
+    read_snapshot,
+    write_snapshot,
+)
+from .stats import RunStats
+from .tokens import estimate_tokens, minimum_tokens_for_size
+from .walker import WorkStealingWalker
+
+
+REPARSE_POINT = getattr(stat, "FILE_ATTRIBUTE_REPARSE_POINT", 0)
+# サブディレクトリごとに読み込む無視ファイル（後ろのものほど優先される）
+NESTED_IGNORE_FILES = (".gitignore", ".summaryignore")
+SPOOL_COPY_BUFFER_BYTES = 1024 * 1024
+# iter_summary がディレクトリ構造を返すときの 1 回あたりの文字数の目安
+STRUCTURE_CHUNK_CHARS = 64 * 1024
+# ASCII のバイト列をそのまま ASCII としてデコードできる文字コード（codecs.lookup の名前）
+ASCII_COMPATIBLE_ENCODINGS = frozenset({"ascii", "utf-8", "utf-8-sig"})
+# バイナリ判定で NUL を探す先頭のバイト数
+BINARY_CHECK_BYTES = 1024
+# mmap したファイルを UTF-8 として検証するときの 1 回あたりのバイト数
+UTF8_VALIDATION_CHUNK_BYTES = 1024 * 1024
+# 文字の途中から始まってもデコード結果がずれない（途中のバイトを単独の文字と取り違えない）文字コード
+SELF_SYNCHRONIZING_ENCODINGS = frozenset({"utf-8", "utf-8-sig"})
+# 1 文字の最大のバイト数（UTF-8 と、EUC-JP の補助漢字）
+MAX_CHARACTER_BYTES = 4
+# jobs 1 つあたりに先読みしておくファイル数
+FILE_RESULTS_PER_JOB = 4
+TOKEN_BUDGET_SKIP_REASON = "file contents omitted to fit the token budget"
+# 結果の状態ごとの Skipped Items に書く理由（uninspectable / unsized は例外の内容を続ける）
+SKIP_REASONS = {
+    "uninspectable": "file could not be inspected",
+    "unsized": "file size could not be read",
+    "too_large": "file contents omitted because the file is too large",
+    "excerpt": "file is too large; only the first and last lines are included",
+    "over_budget": TOKEN_BUDGET_SKIP_REASON,
+    "undecodable": "file could not be decoded with supported encodings",
+}
+OUTPUT_FORMATS = ("markdown", "jsonl")
+# 重複判定とマニフェストに使う blake2b のダイジェストのバイト数。スナップショットのダイジェストと
+# 兼用するため同じ長さにする（b2sum -l 128 と同じ）
+CONTENT_DIGEST_BYTES = SNAPSHOT_DIGEST_BYTES
+
+
+def _encode_output(text):
+    """出力する文字列を、テキストモードで書き込んだ場合と同じバイト列にする。"""
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
 
 
 class ProjectSummarizer:
     DEFAULT_MAX_TEXT_FILE_BYTES = 1_000_000
+    DEFAULT_MMAP_MIN_BYTES = 256 * 1024
     TEXT_ENCODINGS = ("utf-8", "utf-8-sig", "shift_jis")
 
     def __init__(
@@ -15,6 +86,25 @@ class ProjectSummarizer:
         file_types=None,
         name_type_only=False,
         progress_callback=None,
+        jobs=1,
+        walk_jobs=1,
+        cache_path=None,
+        cache_max_bytes=None,
+        use_git_index=False,
+        max_tokens=None,
+        collect_stats=False,
+        progress_interval=0.0,
+        deduplicate=False,
+        manifest_path=None,
+        fast_classify=False,
+        max_file_bytes=None,
+        excerpt_bytes=None,
+        snapshot_path=None,
+        since_snapshot=None,
+        compiled_pattern_cache=None,
+        output_format="markdown",
+        max_seconds=None,
+        max_total_bytes=None,
     ):
         """
         Args:
@@ -22,17 +112,74 @@ class ProjectSummarizer:
             additional_ignore_patterns (list, optional): 追加の無視パターンリスト
             file_types (list, optional): 含めるファイル拡張子（例：['.py', '.md']）
             name_type_only (bool, optional): True の場合、ディレクトリ/ファイル名とテキスト・バイナリ種別のみ出力
+            jobs (int, optional): ファイルの判定・読み込みを並列に行うスレッド数。1 の場合は逐次処理
+            walk_jobs (int, optional): ディレクトリの一覧取得を並列に行うスレッド数。1 の場合は逐次処理
+            cache_path (str or Path, optional): ファイルごとの結果を保存する永続キャッシュのパス。
+                指定しない場合はキャッシュを使わない
+            cache_max_bytes (int, optional): キャッシュに保存する内容の合計サイズの上限
+            use_git_index (bool, optional): True の場合、ファイルシステムを走査せず .git/index の
+                追跡ファイルだけを対象にする
+            max_tokens (int, optional): 出力全体の見積もりトークン数の上限。指定した場合、
+                ディレクトリ構造はすべて出力し、ファイル内容は小さいファイルから上限に収まる分だけ含める
+            collect_stats (bool, optional): True の場合、段階ごとの時間や stat/open の回数などを集計し、
+                stats 属性と progress_callback の "stats" イベントで参照できるようにする
+            progress_interval (float, optional): ファイルごとの進捗イベントを通知する最短の間隔（秒）。
+                0 の場合はすべてのファイルについて通知する
+            deduplicate (bool, optional): True の場合、内容が同じファイルは最初の 1 件だけ内容を出力し、
+                以降は "(identical to <path>)" とだけ出力する
+            manifest_path (str or Path, optional): 内容を出力したファイルの blake2b ダイジェストを
+                b2sum -l 128 と同じ形式で書き出すファイルのパス
+            fast_classify (bool, optional): True の場合、既知の拡張子のファイルは開かずに名前から
+                テキスト・バイナリを判定する（既知のバイナリは内容も読まない）。未知の拡張子は先頭を読み、
+                NUL に加えて既知のマジックナンバーでもバイナリと判定する。判定表は classifier 属性で差し替えられる
+            max_file_bytes (int, optional): 内容を出力するテキストファイルのサイズの上限（バイト）。
+                指定しない場合は DEFAULT_MAX_TEXT_FILE_BYTES
+            excerpt_bytes (int, optional): 指定した場合、上限を超えるテキストファイルは省略せず、
+                先頭と末尾のそれぞれ最大 excerpt_bytes バイトを行単位に切りそろえて出力する
+            snapshot_path (str or Path, optional): 対象のファイルごとのサイズ、mtime_ns、内容のダイジェストを
+                記録したスナップショットを書き出すパス。既にある場合は、変わっていないファイルのダイジェストを再利用する
+            since_snapshot (str or Path, optional): 指定した場合、このスナップショットと比べて追加・変更・削除された
+                ファイルだけを出力する。内容を読むのは変わったファイルだけになる
+            compiled_pattern_cache (dict or CompiledPatternCache, optional): コンパイル済みの無視パターンのキャッシュ。
+                複数の ProjectSummarizer に同じものを渡すと、同じパターン列（共通の .gitignore など）のコンパイル結果を
+                共有する。件数を制限する場合は CompiledPatternCache を渡す
+            output_format (str, optional): "markdown"（既定）または "jsonl"。"jsonl" の場合は Markdown の代わりに、
+                先頭のプロジェクトの情報に続けてディレクトリ・ファイル・除外したエントリを 1 行に 1 件ずつ
+                JSON で出力する（model.py の to_record の形式）
+            max_seconds (float, optional): 要約の作成にかける時間の上限（秒）。使い切った時点でディレクトリの
+                一覧取得とファイルの読み込みをやめ、読んでいないファイルは名前だけを出力する
+            max_total_bytes (int, optional): 内容を読むファイルの合計サイズの上限（バイト）。収まらないファイルに
+                達した時点で、それ以降のファイルは名前だけを出力する。どちらかの予算を使い切った場合は、
+                Skipped Items の先頭と partial_reason 属性に、途中で打ち切った要約であることを記録する
         """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"unsupported output format: {output_format}")
+        if (max_seconds is not None or max_total_bytes is not None) and snapshot_path is not None:
+            # 打ち切った走査の結果をスナップショットにすると、次の比較で未走査のファイルが追加扱いになる
+            raise ValueError("max_seconds and max_total_bytes cannot be combined with snapshot_path")
         self.project_dir = Path(project_dir).resolve()
         self.project_name = self.project_dir.name
         self.gitignore = IgnorePatterns(self.project_dir / ".gitignore")
         self.summaryignore = IgnorePatterns(self.project_dir / ".summaryignore")
 
+        self.output_format = output_format
         internal_patterns = [
             ".summaryignore",
             f"{self.project_name}_project_summary.txt",
             ".git/",
         ]
+        if output_format == "jsonl":
+            internal_patterns.append(self.default_output_file())
+        self.cache_path = Path(cache_path).resolve() if cache_path else None
+        self.cache_max_bytes = cache_max_bytes
+        if self.cache_path is not None and self.project_dir in self.cache_path.parents:
+            cache_relative_path = self.cache_path.relative_to(self.project_dir).as_posix()
+            internal_patterns.extend([f"/{cache_relative_path}", f"/{cache_relative_path}-journal"])
+        self.snapshot_path = Path(snapshot_path).resolve() if snapshot_path else None
+        self.since_snapshot = Path(since_snapshot).resolve() if since_snapshot else None
+        for path in (self.snapshot_path, self.since_snapshot):
+            if path is not None and self.project_dir in path.parents:
+                internal_patterns.append(f"/{path.relative_to(self.project_dir).as_posix()}")
         if additional_ignore_patterns:
             internal_patterns.extend(additional_ignore_patterns)
         self.additional_ignore = IgnorePatterns(patterns=internal_patterns)
@@ -40,197 +187,1582 @@ class ProjectSummarizer:
         self.file_types = file_types or []
         self.name_type_only = name_type_only
         self.progress_callback = progress_callback
-        self.summary_content = ""
-        self.file_contents_section = "\n## File Contents\n\n"
+        self.progress_interval = progress_interval
+        self.deduplicate = deduplicate
+        self.manifest_path = manifest_path
+        self.classifier = ExtensionClassifier() if fast_classify else None
+        self._hash_contents = deduplicate or manifest_path is not None
+        self._first_paths_by_digest = {}
+        self._manifest_lines = []
+        self._next_progress_time = 0.0
+        self.jobs = max(1, jobs or 1)
+        self.walk_jobs = max(1, walk_jobs or 1)
+        self.use_git_index = use_git_index
+        self.max_tokens = max_tokens
+        self.collect_stats = collect_stats
+        self.stats = None
         self.skipped_items = []
-        self.max_text_file_bytes = self.DEFAULT_MAX_TEXT_FILE_BYTES
+        self.max_text_file_bytes = (
+            self.DEFAULT_MAX_TEXT_FILE_BYTES if max_file_bytes is None else max_file_bytes
+        )
+        self.excerpt_bytes = excerpt_bytes
+        self.max_seconds = max_seconds
+        self.max_total_bytes = max_total_bytes
+        self.partial_reason = None
+        self.mmap_min_bytes = self.DEFAULT_MMAP_MIN_BYTES
         self.total_files = 0
         self.processed_files = 0
+        self._override_matcher = None
+        self._compiled_ignore_cache = {} if compiled_pattern_cache is None else compiled_pattern_cache
+        self._used_ignore_patterns = {}
+        self._structure_output = None
+        self._contents_output = None
+        self._cache = None
+        self._previous_snapshot = None
+        self._current_snapshot = None
+        self._pending_snapshot_entries = {}
+        self._deadline = None
+        self._remaining_bytes = None
+        self._cutoff = None
+        self._unlisted_directories = 0
+        self._cut_files = 0
 
     def generate_project_summary(self, output_file=None):
         """
         プロジェクトの要約を生成してファイルに書き出す
 
+        ファイル名が .gz / .xz / .bz2 で終わる場合は圧縮して書き出す。圧縮は別スレッドで行い、
+        ファイルの読み込みと並行して進める。
+
         Args:
-            output_file (str, optional): 出力ファイル名。デフォルトは <project_name>_project_summary.txt
+            output_file (str, optional): 出力ファイル名。デフォルトは default_output_file()
+        """
+        output_file = output_file or self.default_output_file()
+        opener = compressed_opener(output_file)
+        chunks = self.iter_summary(output_file=output_file)
+        try:
+            # 出力ファイルが走査の対象に入らないよう、最初の断片（走査後に作られる）を受け取ってから開く
+            first_chunk = next(chunks)
+            if opener is None:
+                with open(output_file, "wb") as f:
+                    f.write(first_chunk)
+                    for chunk in chunks:
+                        f.write(chunk)
+            else:
+                with opener(output_file) as f, BackgroundWriter(f) as writer:
+                    writer.write(first_chunk)
+                    for chunk in chunks:
+                        writer.write(chunk)
+        finally:
+            chunks.close()
+
+    def default_output_file(self):
+        """出力ファイル名の既定値（<project_name>_project_summary.txt、jsonl の場合は .jsonl）"""
+        extension = "jsonl" if self.output_format == "jsonl" else "txt"
+        return f"{self.project_name}_project_summary.{extension}"
+
+    def iter_summary(self, output_file=None):
+        """
+        要約を UTF-8 のバイト列の断片として順に返すジェネレータ。断片をつなげると
+        generate_project_summary が書き出すファイルと同じ内容になる。
+
+        ディレクトリ構造は走査結果を処理しながら STRUCTURE_CHUNK_CHARS 文字ごとに返す。
+        ファイル内容は構造の後に出力するため一時ファイルに溜め、SPOOL_COPY_BUFFER_BYTES ずつ返す。
+        そのため、プロジェクトの大きさに関係なくメモリ使用量は一定に抑えられる。
+        since_snapshot が指定されている場合、ディレクトリ構造の代わりに変わったファイルの一覧を返す。
+        output_format が "jsonl" の場合は、JSON の行をノードごとに処理しながら返す（一時ファイルは使わない）。
+
+        Args:
+            output_file (str, optional): 進捗イベントで通知する出力先の名前
         """
-        self.summary_content = f"# {self.project_name}\n\n## Directory Structure\n\n"
-        self.file_contents_section = "\n## File Contents\n\n"
         self.skipped_items = []
         self.total_files = 0
         self.processed_files = 0
+        self.stats = RunStats() if self.collect_stats else None
+        self._first_paths_by_digest = {}
+        self._manifest_lines = []
+        self._next_progress_time = 0.0
+        self._start_budget()
+        self._current_snapshot = Snapshot()
+        self._pending_snapshot_entries = {}
+        self._previous_snapshot = self._load_previous_snapshot()
         self._notify_progress("count_start")
-        self._count_target_files(self.project_dir)
+        with self._phase("scan"):
+            entries = self._scan_project()
+        if self.snapshot_path is not None or self.since_snapshot is not None:
+            with self._phase("snapshot"):
+                entries = self._compare_snapshot(entries)
         self._notify_progress("process_start", total_files=self.total_files)
-        self._traverse_directory(self.project_dir, 0)
-        output_file = output_file or f"{self.project_name}_project_summary.txt"
-
-        skipped_section = ""
-        if self.skipped_items:
-            skipped_lines = "\n".join(f"- {item}" for item in self.skipped_items)
-            skipped_section = f"\n## Skipped Items\n\n{skipped_lines}\n"
+        self._next_progress_time = 0.0
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            self._notify_progress("write_start", output_file=output_file)
-            content_sections = [self.summary_content]
-            if not self.name_type_only:
-                content_sections.append(self.file_contents_section)
-            content_sections.append(skipped_section)
-            f.write("".join(content_sections))
+        if self.output_format == "jsonl":
+            yield from self._iter_jsonl(entries)
+        else:
+            yield from self._iter_markdown(entries, output_file)
+        if self.manifest_path is not None:
+            with open(self.manifest_path, "w", encoding="utf-8", newline="\n") as manifest:
+                manifest.writelines(self._manifest_lines)
+        if self.snapshot_path is not None:
+            self._complete_pending_snapshot_entries()
+            write_snapshot(self.snapshot_path, self._current_snapshot)
         self._notify_progress(
             "done",
             output_file=output_file,
             total_files=self.total_files,
             processed_files=self.processed_files,
         )
+        if self.stats is not None:
+            self._notify_progress("stats", **self.stats.to_dict())
 
-    def _count_target_files(self, root: Path):
-        relative_path = root.relative_to(self.project_dir)
-        if self._is_ignored(relative_path, is_dir=True):
-            return
+    def _iter_markdown(self, entries, output_file):
+        """走査済みのエントリ一覧から Markdown の要約を返す。"""
+        # ディレクトリ構造は処理しながら返し、ファイル内容は一時ファイルに溜めて後から返す
+        contents_spool = (
+            nullcontext()
+            if self.name_type_only
+            else tempfile.TemporaryFile("w+", encoding="utf-8")
+        )
+        with contents_spool as spool:
+            self._structure_output = io.StringIO()
+            self._contents_output = spool
+            self._cache = self._open_cache()
+            try:
+                # 段階の時間には、返した断片を呼び出し元が処理する時間も含まれる
+                with self._phase("process"):
+                    self._structure_output.write(self._markdown_header(entries))
+                    yield from self._emit_entries(entries)
+            finally:
+                self._structure_output = None
+                self._contents_output = None
+                self._close_cache()
+
+            self._notify_progress("write_start", output_file=output_file)
+            with self._phase("write"):
+                if spool is not None:
+                    yield _encode_output("\n## File Contents\n\n")
+                    yield from self._iter_spool(spool)
+                if self.skipped_items:
+                    skipped_lines = "\n".join(f"- {item}" for item in self.skipped_items)
+                    yield _encode_output(f"\n## Skipped Items\n\n{skipped_lines}\n")
+
+    def _markdown_header(self, entries):
+        """Markdown の要約の先頭（プロジェクト名と、ディレクトリ構造または変更一覧の見出し）"""
+        if self.since_snapshot is None:
+            return f"# {self.project_name}\n\n## Directory Structure\n\n"
+        header = f"# {self.project_name}\n\n## Changes Since {self.since_snapshot.name}\n\n"
+        return header if entries else header + "(no changes)\n"
+
+    def _iter_jsonl(self, entries):
+        """
+        走査済みのエントリ一覧から JSON Lines の要約を返す。改行は OS に関係なく LF で、
+        ファイル名に含まれるデコードできないバイトは \\udcXX のエスケープとして出力する。
+        """
+        self._cache = self._open_cache()
+        try:
+            with self._phase("process"):
+                lines = [json.dumps(self._project_record(), ensure_ascii=False)]
+                buffered_chars = len(lines[0])
+                for node in self._iter_nodes(entries):
+                    try:
+                        line = json.dumps(node.to_record(), ensure_ascii=False)
+                    finally:
+                        if isinstance(node, FileNode) and node.status == "mapped":
+                            node.content.close()
+                    if isinstance(node, SkippedNode):
+                        self._record_skip(node.path, node.reason)
+                    elif isinstance(node, FileNode) and node.skip_reason is not None:
+                        self._record_skip(node.path, node.skip_reason)
+                    lines.append(line)
+                    buffered_chars += len(line)
+                    if buffered_chars >= STRUCTURE_CHUNK_CHARS:
+                        yield self._encode_jsonl(lines)
+                        lines = []
+                        buffered_chars = 0
+                if self.partial_reason is not None:
+                    lines.append(json.dumps({"type": "partial", "reason": self.partial_reason}, ensure_ascii=False))
+                if lines:
+                    yield self._encode_jsonl(lines)
+        finally:
+            self._close_cache()
+
+    def _project_record(self):
+        """JSON Lines の要約の先頭の行（プロジェクトの情報）"""
+        project_record = {"type": "project", "name": self.project_name}
+        if self.since_snapshot is not None:
+            project_record["since"] = self.since_snapshot.name
+        return project_record
+
+    @staticmethod
+    def _encode_jsonl(lines):
+        return ("\n".join(lines) + "\n").encode("utf-8", "backslashreplace")
+
+    def _load_previous_snapshot(self):
+        """
+        比較に使うスナップショットを読み込む。since_snapshot は読めなければ例外とし、
+        書き出し先の既存のスナップショットは、読めなければ使わない（全ファイルのダイジェストを求める）。
+        """
+        if self.since_snapshot is not None:
+            return read_snapshot(self.since_snapshot)
+        if self.snapshot_path is not None:
+            try:
+                return read_snapshot(self.snapshot_path)
+            except (OSError, SnapshotError):
+                return None
+        return None
+
+    def _compare_snapshot(self, entries):
+        """
+        走査したファイルを前回のスナップショットと比べ、書き出すスナップショットを _current_snapshot に作る。
+
+        since_snapshot が指定されている場合は、追加・変更されたファイルの "file" エントリと、
+        削除されたファイルの "removed" エントリだけをパス順に並べた一覧を返す。名前は "added: <パス>" のように
+        変更の種類を含み、階層はすべて 0 になる。それ以外の場合は entries をそのまま返す。
+        """
+        file_entries = [
+            (relative_path, payload)
+            for kind, _, _, relative_path, payload in entries
+            if kind == "file"
+        ]
+        if self.jobs > 1:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                outcomes = list(executor.map(lambda item: self._compare_file(*item), file_entries))
+        else:
+            outcomes = [self._compare_file(*item) for item in file_entries]
+
+        changes = []
+        seen_paths = set()
+        for (relative_path, entry), (change, snapshot_entry) in zip(file_entries, outcomes):
+            posix_path = Path(relative_path).as_posix()
+            seen_paths.add(posix_path)
+            if snapshot_entry is None:
+                pass
+            elif snapshot_entry.digest is None:
+                # ダイジェストは出力のために内容を読むときに求める（_complete_snapshot_entry）
+                self._pending_snapshot_entries[posix_path] = (snapshot_entry, entry)
+            else:
+                self._current_snapshot.entries[posix_path] = snapshot_entry
+            if change is not None:
+                changes.append((posix_path, change, relative_path, entry))
+        if self.since_snapshot is None:
+            return entries
+
+        for posix_path in self._previous_snapshot.entries.keys() - seen_paths:
+            changes.append((posix_path, "removed", str(PurePath(posix_path)), None))
+        changes.sort(key=lambda change: (change[0].lower(), change[0]))
+        self.total_files = sum(1 for change in changes if change[1] != "removed")
+        return [
+            (
+                "removed" if change == "removed" else "file",
+                0,
+                f"{change}: {posix_path}",
+                relative_path,
+                entry,
+            )
+            for posix_path, change, relative_path, entry in changes
+        ]
+
+    def _compare_file(self, relative_path, entry):
+        """
+        1 ファイルを前回のスナップショットと比べ、(変更の種類, 書き出すスナップショットのエントリ) を返す。
 
+        サイズと mtime_ns が前回と同じなら内容は読まない（作成直後に更新された可能性がある場合を除く）。
+        サイズが同じで mtime_ns だけが変わっていた場合はダイジェストを求めて比べ、内容が同じなら変更なし（None）とする。
+        それ以外の追加・変更は内容を読まずに判定し、書き出すスナップショットのエントリはダイジェストを
+        None のまま返す（出力のために内容を読むときに求める）。
+        ワーカースレッドからも呼ばれるため、状態は変更しない。
+        """
+        previous = self._previous_snapshot
+        old = previous.entries.get(Path(relative_path).as_posix()) if previous is not None else None
+        if self.stats is not None:
+            self.stats.count("stat_calls")
         try:
-            items = sorted(root.iterdir(), key=lambda item: item.name.lower())
+            file_stat = entry.stat()
         except OSError:
-            return
+            return ("added" if old is None else "modified"), None
 
-        for item_path in items:
-            item_relative_path = item_path.relative_to(self.project_dir)
+        if (
+            old is not None
+            and old.size == file_stat.st_size
+            and old.mtime_ns == file_stat.st_mtime_ns
+            and not previous.is_racy(old)
+        ):
+            return None, old
 
-            if self._is_linklike(item_path):
-                continue
+        snapshot_entry = None
+        if self.snapshot_path is not None:
+            snapshot_entry = SnapshotEntry(file_stat.st_size, file_stat.st_mtime_ns, None)
+        if old is None:
+            return "added", snapshot_entry
+        if old.size != file_stat.st_size:
+            return "modified", snapshot_entry
 
+        try:
+            digest = file_digest(entry.path)
+        except OSError:
+            return "modified", None
+        if snapshot_entry is not None:
+            snapshot_entry.digest = digest
+        return (None if digest == old.digest else "modified"), snapshot_entry
+
+    def _complete_snapshot_entry(self, relative_path, result):
+        """
+        ダイジェストが未定のスナップショットのエントリを、出力のために読んだ内容のダイジェストで埋める。
+        内容をすべて読んでいない結果（バイナリ、サイズ超過、抜粋、キャッシュなど）の場合はファイルを読み直す。
+        """
+        posix_path = Path(relative_path).as_posix()
+        pending = self._pending_snapshot_entries.pop(posix_path, None)
+        if pending is None:
+            return
+        snapshot_entry, entry = pending
+        if result[0] in ("content", "mapped") and len(result) > 2 and result[2] is not None:
+            # 内容のダイジェストはスナップショットと同じ blake2b の 16 バイトを 16 進数にしたもの
+            snapshot_entry.digest = bytes.fromhex(result[2])
+        else:
             try:
-                is_dir = item_path.is_dir()
+                snapshot_entry.digest = file_digest(entry.path)
             except OSError:
-                continue
+                return
+        self._current_snapshot.entries[posix_path] = snapshot_entry
+
+    def _complete_pending_snapshot_entries(self):
+        """出力されなかったファイルのスナップショットのエントリを、内容を読んで埋める。"""
+        for posix_path in list(self._pending_snapshot_entries):
+            self._complete_snapshot_entry(posix_path, ("unread", None))
+
+    def _scan_project(self):
+        """
+        os.scandir でプロジェクトを一度だけ走査し、出力順に並んだエントリ一覧を作る。
+
+        Returns:
+            list: (種別, 階層, 名前, 相対パス, 付加情報) のタプルのリスト。
+                種別は "dir" / "file" / "skip" で、付加情報は "file" なら DirEntry、
+                "skip" ならスキップ理由となる。
+        """
+        entries = []
+        root_task = self.prepare_scan()
+        if root_task is None:
+            return entries
 
-            if self._is_ignored(item_relative_path, is_dir=is_dir):
+        if self.use_git_index:
+            self._scan_git_index(entries)
+            return entries
+
+        if self.walk_jobs > 1:
+            self._scan_parallel(root_task, entries)
+        else:
+            self._scan_directory(root_task, entries)
+        return entries
+
+    def reload_ignore_files(self):
+        """ルートディレクトリの .gitignore と .summaryignore を読み込み直す。"""
+        self.gitignore = IgnorePatterns(self.project_dir / ".gitignore")
+        self.summaryignore = IgnorePatterns(self.project_dir / ".summaryignore")
+
+    def prepare_scan(self):
+        """
+        無視パターンをコンパイルし、ルートディレクトリの list_directory 用タスクを返す。
+        ルート自体が無視される場合は None を返す。
+
+        prepare_scan / list_directory / render_files は、変わったディレクトリとファイルだけを処理し直す
+        呼び出し元（SummaryWatcher など）のための API で、iter_summary もこれらを使って走査する。
+        """
+        self._override_matcher = self.additional_ignore.compile()
+        root_layers = (
+            ("", self._compile_ignore_patterns(self.gitignore.patterns + self.summaryignore.patterns)),
+        )
+        if self._is_ignored("", True, root_layers):
+            return None
+        return (str(self.project_dir), "", self.project_name, 0, root_layers)
+
+    def _scan_directory(self, task, entries):
+        """ディレクトリを再帰的に走査し、エントリ一覧とファイル総数を更新する。"""
+        listing, _ = self.list_directory(task)
+        for entry in listing:
+            if entry[0] == "subdir":
+                if self._out_of_time():
+                    self._add_unlisted_directory(entry, entries)
+                else:
+                    self._scan_directory(entry[4], entries)
                 continue
+            entries.append(entry)
+            if entry[0] == "file":
+                self._count_file()
 
-            if is_dir:
-                self._count_target_files(item_path)
+    def _scan_parallel(self, root_task, entries):
+        """
+        WorkStealingWalker でディレクトリの一覧取得を並行に行い、
+        _scan_directory と同じ順序のエントリ一覧に組み立てる。
+        """
+        listings = {}
+        walker = WorkStealingWalker(self.list_directory, self.walk_jobs)
+        walk = walker.walk(root_task)
+        try:
+            for task, listing in walk:
+                listings[task[1]] = listing
+                for entry in listing:
+                    if entry[0] == "file":
+                        self._count_file()
+                if self._out_of_time():
+                    break
+        finally:
+            walk.close()
+
+        pending = [iter(listings.pop(""))]
+        while pending:
+            entry = next(pending[-1], None)
+            if entry is None:
+                pending.pop()
+            elif entry[0] == "subdir":
+                listing = listings.pop(entry[3], None)
+                if listing is None:
+                    self._add_unlisted_directory(entry, entries)
+                else:
+                    pending.append(iter(listing))
+            else:
+                entries.append(entry)
+
+    def _scan_git_index(self, entries):
+        """
+        ファイルシステムを走査する代わりに .git/index の追跡ファイルからエントリ一覧を作る。
+        .gitignore は評価せず、.summaryignore と追加パターンだけを適用する。
+        """
+        tree = {}
+        for index_entry in read_git_index(self.project_dir):
+            node = tree
+            *parents, name = index_entry.relative_path.split("/")
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[name] = index_entry
+
+        ignore_layers = (("", self._compile_ignore_patterns(self.summaryignore.patterns)),)
+        self._scan_index_directory(tree, "", self.project_name, 0, entries, ignore_layers)
+
+    def _scan_index_directory(self, node, relative_path, name, level, entries, ignore_layers):
+        """_scan_git_index で組み立てたディレクトリを、list_directory と同じ順序で並べる。"""
+        entries.append(("dir", level, name, relative_path, None))
+        for child_name in sorted(node, key=str.lower):
+            child = node[child_name]
+            child_relative_path = (
+                f"{relative_path}{os.sep}{child_name}" if relative_path else child_name
+            )
+            is_dir = isinstance(child, dict) or child.is_gitlink()
+
+            if not is_dir and child.is_symlink():
+                entries.append(
+                    (
+                        "skip",
+                        level + 1,
+                        child_name,
+                        child_relative_path,
+                        "symbolic links and junctions are skipped",
+                    )
+                )
                 continue
 
-            if self.file_types and item_path.suffix not in self.file_types:
+            if self._is_ignored(child_relative_path, is_dir, ignore_layers):
                 continue
 
-            self.total_files += 1
+            if isinstance(child, dict):
+                self._scan_index_directory(
+                    child, child_relative_path, child_name, level + 1, entries, ignore_layers
+                )
+            elif is_dir:
+                entries.append(("dir", level + 1, child_name, child_relative_path, None))
+                entries.append(
+                    (
+                        "skip",
+                        level + 1,
+                        child_name,
+                        child_relative_path,
+                        "git submodule contents are not listed",
+                    )
+                )
+            elif not self.file_types or PurePath(child_name).suffix in self.file_types:
+                entries.append(("file", level + 1, child_name, child_relative_path, child))
+                self._count_file()
+
+    def _add_unlisted_directory(self, entry, entries):
+        """時間の予算を使い切ったため一覧を取得しないディレクトリを、名前だけエントリ一覧に加える。"""
+        _, level, name, relative_path, _ = entry
+        entries.append(("dir", level, name, relative_path, None))
+        self._unlisted_directories += 1
+
+    def _count_file(self):
+        self.total_files += 1
+        if self._progress_due():
             self._notify_progress("count_progress", counted_files=self.total_files)
 
-    def _traverse_directory(self, root: Path, level: int):
-        """ディレクトリを再帰的に走査し、構造の要約を作成する。"""
-        indent = "  " * level
-        relative_path = root.relative_to(self.project_dir)
-        if self._is_ignored(relative_path, is_dir=True):
-            return
+    def list_directory(self, task):
+        """
+        1 つのディレクトリの一覧を取得する。ワーカースレッドからも呼ばれるため、状態は変更しない。
+        引数と戻り値は _read_directory と同じで、集計が有効な場合は所要時間を記録する。
+        子ディレクトリのタスクは、一覧の ("subdir", 階層, 名前, 相対パス, タスク) の最後の要素にある。
+        """
+        if self.stats is None:
+            return self._read_directory(task)
+        started = time.perf_counter()
+        self.stats.count("scandir_calls")
+        try:
+            return self._read_directory(task)
+        finally:
+            self.stats.record_directory(task[1], time.perf_counter() - started)
 
-        self.summary_content += f"{indent}- {root.name}/\n"
+    def _read_directory(self, task):
+        """
+        1 つのディレクトリの一覧を os.scandir で取得する。
+
+        Args:
+            task (tuple): (絶対パス, 相対パス, 名前, 階層, ignore_layers)。
+                ignore_layers は (基準ディレクトリの相対パス, CompiledIgnorePatterns) のタプルで、
+                深いディレクトリの無視ファイルほど先頭に並ぶ。
+
+        Returns:
+            tuple: (エントリ一覧, 子ディレクトリのタスク一覧)。エントリ一覧のうち
+                子ディレクトリは ("subdir", 階層, 名前, 相対パス, タスク) として並ぶ。
+        """
+        dir_path, relative_path, name, level, ignore_layers = task
+        listing = [("dir", level, name, relative_path, None)]
+        subdirectories = []
 
         try:
-            items = sorted(root.iterdir(), key=lambda item: item.name.lower())
+            with os.scandir(dir_path) as iterator:
+                items = sorted(iterator, key=lambda item: item.name.lower())
         except OSError as exc:
-            self._record_skip(relative_path, f"directory could not be read: {exc}")
-            return
+            listing.append(
+                ("skip", level, name, relative_path, f"directory could not be read: {exc}")
+            )
+            return listing, subdirectories
 
-        for item_path in items:
-            item_relative_path = item_path.relative_to(self.project_dir)
+        if relative_path:
+            ignore_layers = self._push_nested_ignore_layer(
+                items, relative_path, level, listing, ignore_layers
+            )
+
+        for item in items:
+            item_relative_path = (
+                f"{relative_path}{os.sep}{item.name}" if relative_path else item.name
+            )
 
-            if self._is_linklike(item_path):
-                self._record_skip(item_relative_path, "symbolic links and junctions are skipped")
+            if self._is_linklike(item):
+                listing.append(
+                    (
+                        "skip",
+                        level + 1,
+                        item.name,
+                        item_relative_path,
+                        "symbolic links and junctions are skipped",
+                    )
+                )
                 continue
 
             try:
-                is_dir = item_path.is_dir()
+                is_dir = item.is_dir()
             except OSError as exc:
-                self._record_skip(item_relative_path, f"path type could not be determined: {exc}")
+                listing.append(
+                    (
+                        "skip",
+                        level + 1,
+                        item.name,
+                        item_relative_path,
+                        f"path type could not be determined: {exc}",
+                    )
+                )
                 continue
 
-            if self._is_ignored(item_relative_path, is_dir=is_dir):
+            if self._is_ignored(item_relative_path, is_dir, ignore_layers):
                 continue
 
             if is_dir:
-                self._traverse_directory(item_path, level + 1)
-            else:
-                self._handle_file(item_path, level + 1)
+                subdirectory = (item.path, item_relative_path, item.name, level + 1, ignore_layers)
+                subdirectories.append(subdirectory)
+                listing.append(("subdir", level + 1, item.name, item_relative_path, subdirectory))
+                continue
 
-    def _handle_file(self, file_path: Path, level: int):
-        """個々のファイルを処理し、要約に追加する。"""
-        if self.file_types and file_path.suffix not in self.file_types:
-            return
+            if self.file_types and PurePath(item.name).suffix not in self.file_types:
+                continue
 
-        indent = "  " * level
-        rel_path = file_path.relative_to(self.project_dir)
-        self.processed_files += 1
-        self._notify_progress(
-            "file_processed",
-            path=rel_path,
-            processed_files=self.processed_files,
-            total_files=self.total_files,
-        )
+            listing.append(("file", level + 1, item.name, item_relative_path, item))
+
+        return listing, subdirectories
+
+    def _push_nested_ignore_layer(self, items, relative_path, level, entries, ignore_layers):
+        """サブディレクトリに無視ファイルがあれば、そのパターンを ignore_layers の先頭に積む。"""
+        ignore_files = {
+            item.name: item for item in items if item.name in NESTED_IGNORE_FILES
+        }
+        if not ignore_files:
+            return ignore_layers
+
+        patterns = []
+        for file_name in NESTED_IGNORE_FILES:
+            item = ignore_files.get(file_name)
+            try:
+                if item is None or not item.is_file():
+                    continue
+                patterns.extend(IgnorePatterns(Path(item.path)).patterns)
+            except OSError as exc:
+                entries.append(
+                    (
+                        "skip",
+                        level + 1,
+                        file_name,
+                        f"{relative_path}{os.sep}{file_name}",
+                        f"ignore file could not be read: {exc}",
+                    )
+                )
+
+        if not patterns:
+            return ignore_layers
+        return ((relative_path, self._compile_ignore_patterns(patterns)),) + ignore_layers
+
+    def _emit_entries(self, entries):
+        """
+        走査済みのエントリ一覧から構造の要約とファイル内容を作成する。
+        構造の要約は STRUCTURE_CHUNK_CHARS 文字たまるごとにバイト列にして返すジェネレータ。
+        """
+        for node in self._iter_nodes(entries):
+            self._write_markdown_node(node)
+            if self._structure_output.tell() >= STRUCTURE_CHUNK_CHARS:
+                yield self._take_structure_output()
+        yield self._take_structure_output()
 
+    def _iter_nodes(self, entries):
+        """
+        走査済みのエントリ一覧を、出力順に DirectoryNode / FileNode / SkippedNode にして返すジェネレータ。
+        ファイルの読み込みは、そのファイルのノードを返すときに（jobs が 2 以上なら先読みして）行う。
+        """
+        file_entries = [
+            (relative_path, payload)
+            for kind, _, _, relative_path, payload in entries
+            if kind == "file"
+        ]
+        if self.max_tokens is not None and not self.name_type_only:
+            file_results = self._iter_packed_results(entries, file_entries)
+        else:
+            file_results = self._iter_file_results(file_entries)
         try:
-            is_binary = self._is_binary(file_path)
-        except OSError as exc:
-            self.summary_content += f"{indent}- {file_path.name} (unreadable)\n"
-            self._record_skip(rel_path, f"file could not be inspected: {exc}")
+            for kind, level, name, relative_path, payload in entries:
+                if kind == "dir":
+                    yield DirectoryNode(level, name, relative_path)
+                elif kind == "removed":
+                    yield FileNode(level, name, relative_path, "removed")
+                elif kind == "skip":
+                    yield SkippedNode(level, name, relative_path, payload)
+                else:
+                    yield self._file_node(name, relative_path, level, payload, next(file_results))
+        finally:
+            file_results.close()
+        self.partial_reason = self._partial_message()
+        if self.partial_reason is not None:
+            # 途中で打ち切った要約であることが目立つよう、Skipped Items の先頭に記録する
+            self.skipped_items.insert(0, f".: {self.partial_reason}")
+
+    def _take_structure_output(self):
+        """構造の要約のうち、まだ返していない部分をバイト列にして取り出す。"""
+        text = self._structure_output.getvalue()
+        self._structure_output.seek(0)
+        self._structure_output.truncate()
+        return _encode_output(text)
+
+    def _iter_file_results(self, file_entries):
+        """
+        各ファイルの _inspect_file の結果を、走査順のまま返すジェネレータ。
+
+        jobs が 2 以上の場合はスレッドプールで先読みし、完了順に関係なく投入順で受け取る
+        （先読みする件数は jobs の数倍までに抑える）。キャッシュにある結果はそのまま使う。
+
+        Args:
+            file_entries (iterable): (相対パス, DirEntry) のペア
+        """
+        if self.jobs <= 1:
+            for relative_path, entry in file_entries:
+                result = self._known_result(relative_path, entry)
+                if result is None:
+                    result = self._store_result(relative_path, entry, self._inspect_file(entry))
+                yield result
             return
 
-        if is_binary:
-            self.summary_content += f"{indent}- {file_path.name} (binary file)\n"
+        def finish(item):
+            relative_path, entry, future = item
+            result = future.result()
+            return result if future in cached_futures else self._store_result(relative_path, entry, result)
+
+        pending = deque()
+        cached_futures = set()
+        window = self.jobs * FILE_RESULTS_PER_JOB
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            try:
+                for relative_path, entry in file_entries:
+                    result = self._known_result(relative_path, entry)
+                    if result is None:
+                        future = executor.submit(self._inspect_file, entry)
+                    else:
+                        future = Future()
+                        future.set_result(result)
+                        cached_futures.add(future)
+                    pending.append((relative_path, entry, future))
+                    if len(pending) >= window:
+                        yield finish(pending.popleft())
+                while pending:
+                    yield finish(pending.popleft())
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+
+    def _iter_packed_results(self, entries, file_entries):
+        """
+        max_tokens に収まるファイルだけを読み込み、_iter_file_results と同じく走査順に結果を返す。
+
+        ディレクトリ構造と、すべてのファイルを除外した場合の Skipped Items の行を先に見積もり、
+        残りの予算にサイズの小さいファイルから順に詰める。サイズから見た最小のトークン数が
+        残りの予算を超えた時点で打ち切るため、それ以降のファイルは開かない。
+        読み込んだファイルも、デコード前のバイト列の見積もりが予算を超える場合はデコードしない。
+        収まらなかったファイルの結果は ("over_budget", None) となる。
+        output_format が "jsonl" の場合は、Markdown ではなく書き出す JSON の行で見積もる。
+        """
+        if self.output_format == "jsonl":
+            yield from self._iter_packed_jsonl_results(entries, file_entries)
             return
 
+        structure_text = [self._markdown_header(entries)]
+        for kind, level, name, relative_path, payload in entries:
+            if kind == "dir":
+                structure_text.append(f"{'  ' * level}- {name}/\n")
+            elif kind == "removed":
+                structure_text.append(f"{'  ' * level}- {name}\n")
+            elif kind == "skip":
+                structure_text.append(f"- {Path(relative_path).as_posix()}: {payload}\n")
+            else:
+                structure_text.append(f"{'  ' * level}- {name} (omitted: token budget)\n")
+                structure_text.append(f"- {Path(relative_path).as_posix()}: {TOKEN_BUDGET_SKIP_REASON}\n")
+        structure_text.append("\n## File Contents\n\n\n## Skipped Items\n\n")
+        # 予算を使い切った場合に Skipped Items の先頭に加わる説明の分も確保しておく
+        for cutoff, budget in (("time", self.max_seconds), ("bytes", self.max_total_bytes)):
+            if budget is not None:
+                partial_message = self._describe_partial(cutoff, self._unlisted_directories, len(file_entries))
+                structure_text.append(f"- .: {partial_message}\n")
+        remaining = self.max_tokens - estimate_tokens("".join(structure_text))
+
+        results = [("over_budget", None)] * len(file_entries)
+        for file_size, index, relative_path, entry in self._packing_candidates(file_entries):
+            # 含めた場合は、予約しておいた注記と Skipped Items の行の分が不要になる
+            available = remaining + estimate_tokens(
+                f" (omitted: token budget)- {Path(relative_path).as_posix()}: {TOKEN_BUDGET_SKIP_REASON}\n"
+            )
+            section_tokens = estimate_tokens(f"### {relative_path}\n\n```\n\n```\n\n")
+            if section_tokens + minimum_tokens_for_size(file_size) > available:
+                break
+
+            result = self._known_result(relative_path, entry)
+            if result is None:
+                result = self._inspect_file(entry, token_limit=available - section_tokens)
+                if result[0] == "over_budget":
+                    continue
+                result = self._store_result(relative_path, entry, result)
+
+            _, contents_parts, _ = self._render_file(entry.name, relative_path, 0, result)
+            tokens = sum(estimate_tokens(part) for part in contents_parts)
+            if tokens > available:
+                if result[0] == "mapped":
+                    result[1].close()
+                continue
+            remaining = available - tokens
+            results[index] = result
+
+        yield from results
+
+    def _iter_packed_jsonl_results(self, entries, file_entries):
+        """
+        _iter_packed_results の JSON Lines 版。すべてのファイルを over_budget とした場合の出力を先に見積もり、
+        ファイルごとにその行を内容を含む行に置き換えた分を、残りの予算から差し引く。
+        """
+        lines = [json.dumps(self._project_record(), ensure_ascii=False)]
+        file_positions = []
+        for kind, level, name, relative_path, payload in entries:
+            if kind == "dir":
+                node = DirectoryNode(level, name, relative_path)
+            elif kind == "removed":
+                node = FileNode(level, name, relative_path, "removed")
+            elif kind == "skip":
+                node = SkippedNode(level, name, relative_path, payload)
+            else:
+                file_positions.append((level, name))
+                node = self._build_file_node(name, Path(relative_path), level, ("over_budget", None))
+            lines.append(json.dumps(node.to_record(), ensure_ascii=False))
+        for cutoff, budget in (("time", self.max_seconds), ("bytes", self.max_total_bytes)):
+            if budget is not None:
+                partial_message = self._describe_partial(cutoff, self._unlisted_directories, len(file_entries))
+                lines.append(json.dumps({"type": "partial", "reason": partial_message}, ensure_ascii=False))
+        # 行ごとに切り上げた見積もりの合計にそろえ、行を置き換えたときの差し引きで予算を超えないようにする
+        remaining = self.max_tokens - sum(estimate_tokens(self._encode_jsonl([line])) for line in lines)
+
+        results = [("over_budget", None)] * len(file_entries)
+        for file_size, index, relative_path, entry in self._packing_candidates(file_entries):
+            level, name = file_positions[index]
+            rel_path = Path(relative_path)
+            omitted_node = self._build_file_node(name, rel_path, level, ("over_budget", None))
+            available = remaining + self._estimate_jsonl_tokens(omitted_node)
+            try:
+                size = self._size_hint(entry)
+            except OSError:
+                size = None
+            # 内容が空の場合の行。内容は JSON のエスケープで長くなることはあっても短くはならない
+            empty_node = self._build_file_node(name, rel_path, level, ("content", ""), size)
+            line_tokens = self._estimate_jsonl_tokens(empty_node)
+            if line_tokens + minimum_tokens_for_size(file_size) > available:
+                break
+
+            result = self._known_result(relative_path, entry)
+            if result is None:
+                result = self._inspect_file(entry, token_limit=available - line_tokens)
+                if result[0] == "over_budget":
+                    continue
+                result = self._store_result(relative_path, entry, result)
+
+            tokens = self._estimate_jsonl_tokens(self._build_file_node(name, rel_path, level, result, size))
+            if tokens > available:
+                if result[0] == "mapped":
+                    result[1].close()
+                continue
+            remaining = available - tokens
+            results[index] = result
+
+        yield from results
+
+    def _estimate_jsonl_tokens(self, node):
+        """ノードを JSON Lines の 1 行として書き出した場合の見積もりトークン数"""
+        return estimate_tokens(self._encode_jsonl([json.dumps(node.to_record(), ensure_ascii=False)]))
+
+    def _packing_candidates(self, file_entries):
+        """
+        max_tokens に詰める順（サイズの小さい順、同じなら走査順）に並べた
+        (見積もりに使うサイズ, 走査順の番号, 相対パス, DirEntry) のリストを返す。
+        """
+        candidates = []
+        for index, (relative_path, entry) in enumerate(file_entries):
+            try:
+                file_size = self._size_hint(entry)
+            except OSError:
+                file_size = 0
+            if file_size > self.max_text_file_bytes:
+                # 内容は出力しないか抜粋だけのため、サイズからは見積もらない
+                file_size = 0
+            candidates.append((file_size, index, relative_path, entry))
+        candidates.sort(key=lambda candidate: candidate[:2])
+        return candidates
+
+    def _start_budget(self):
+        self._deadline = None if self.max_seconds is None else time.monotonic() + self.max_seconds
+        self._remaining_bytes = self.max_total_bytes
+        self._cutoff = None
+        self._unlisted_directories = 0
+        self._cut_files = 0
+        self.partial_reason = None
+
+    def _out_of_time(self):
+        """時間の予算を使い切ったかどうか。一度使い切った後は常に True を返す。"""
+        if self._cutoff is None and self._deadline is not None and time.monotonic() >= self._deadline:
+            self._cutoff = "time"
+        return self._cutoff == "time"
+
+    def _within_budget(self, entry: os.DirEntry):
+        """
+        ファイルの内容を読める予算が残っているかどうか。残っていれば読み込む分のバイト数を差し引く。
+        どちらかの予算を使い切った後は、以降のファイルについて常に False を返す。
+        """
+        if self._cutoff is not None or self._out_of_time():
+            return False
+        if self._remaining_bytes is None:
+            return True
+        cost = self._read_cost(entry)
+        if cost > self._remaining_bytes:
+            self._cutoff = "bytes"
+            return False
+        self._remaining_bytes -= cost
+        return True
+
+    def _read_cost(self, entry: os.DirEntry):
+        """_read_file がファイルから読み込むバイト数の見積もり"""
         if self.name_type_only:
-            self.summary_content += f"{indent}- {file_path.name} (text file)\n"
-            return
+            return BINARY_CHECK_BYTES
+        try:
+            file_size = entry.stat().st_size
+        except OSError:
+            return 0
+        if file_size <= self.max_text_file_bytes:
+            return file_size
+        if self.excerpt_bytes is not None:
+            return min(file_size, max(BINARY_CHECK_BYTES, 2 * self.excerpt_bytes))
+        return min(file_size, BINARY_CHECK_BYTES)
+
+    def _partial_message(self):
+        """予算を使い切った場合に Skipped Items に記録する説明。使い切っていない場合は None を返す。"""
+        if self._cutoff is None:
+            return None
+        return self._describe_partial(self._cutoff, self._unlisted_directories, self._cut_files)
 
+    def _describe_partial(self, cutoff, unlisted_directories, cut_files):
+        if cutoff == "time":
+            budget = f"time budget of {self.max_seconds:g} seconds"
+        else:
+            budget = f"byte budget of {self.max_total_bytes} bytes"
+        details = []
+        if unlisted_directories:
+            verb = "directory was" if unlisted_directories == 1 else "directories were"
+            details.append(f"{unlisted_directories} {verb} not listed")
+        if cut_files:
+            verb = "file is" if cut_files == 1 else "files are"
+            details.append(f"{cut_files} {verb} listed without contents")
+        message = f"summary is partial: the {budget} ran out"
+        return f"{message}; {', '.join(details)}" if details else message
+
+    @staticmethod
+    def _size_hint(entry):
+        """
+        予算に詰める順番と見積もりに使うファイルサイズ。git の index から作ったエントリは stat せず、
+        index に記録されたサイズを使う（予算に収まらないファイルは一度も stat しない）。
+        """
+        if isinstance(entry, GitIndexEntry):
+            return entry.index_size
+        return entry.stat().st_size
+
+    def _known_result(self, relative_path, entry: os.DirEntry):
+        """
+        ファイルを読まずに得られる _inspect_file と同じ形式の結果を返す。無い場合は None を返す。
+        名前からの判定はキャッシュの参照（stat が必要）より先に行う。キャッシュにある結果はファイルを
+        読まないためバイト数の予算を消費しない（時間の予算を使い切った後は参照しない）。
+        読む必要があるファイルは予算を差し引き、使い切った後は ("cutoff", None) として開かない。
+        """
+        result = self._classified_result(entry)
+        if result is None and not self._out_of_time():
+            result = self._cached_result(relative_path, entry)
+        if result is None and not self._within_budget(entry):
+            result = ("cutoff", None)
+        return result
+
+    def _classified_result(self, entry: os.DirEntry):
+        """classifier が名前だけで判定できる場合に、その結果を返す。"""
+        if self.classifier is None:
+            return None
+        kind = self.classifier.classify(entry.name)
+        if kind == "binary" or (kind == "text" and self.name_type_only):
+            if self.stats is not None:
+                self.stats.count("classified_by_name")
+            return (kind, None)
+        return None
+
+    def _cached_result(self, relative_path, entry: os.DirEntry):
+        """キャッシュから _inspect_file と同じ形式の結果を取り出す。使えない場合は None を返す。"""
+        if self._cache is None:
+            return None
+        if self.stats is not None:
+            self.stats.count("stat_calls")
         try:
-            file_size = file_path.stat().st_size
+            cached = self._cache.lookup(relative_path, entry.stat(), with_details=True)
+        except OSError:
+            return None
+        if cached is None:
+            return None
+
+        kind, content, digest, encoding = cached
+        if kind == "binary":
+            return ("binary", None)
+        if self.name_type_only:
+            return ("text", None)
+        if kind == "text":
+            # 名前と種別のみのモードで保存された結果には内容が無い
+            return None
+        if kind == "content":
+            if self._hash_contents and digest is None:
+                # ダイジェストを求めずに保存された結果は使わず、読み直す
+                return None
+            return ("content", content.decode("utf-8"), digest, encoding)
+        if kind == "excerpt":
+            return ("excerpt", content.decode("utf-8"), None, encoding)
+        return (kind, None)
+
+    def _store_result(self, relative_path, entry: os.DirEntry, result):
+        """_inspect_file の結果をキャッシュに保存し、結果をそのまま返す。"""
+        status, value = result[:2]
+        if self._cache is None or status in ("uninspectable", "unsized"):
+            return result
+
+        content = None
+        if status in ("content", "excerpt"):
+            content = value.encode("utf-8")
+        elif status == "mapped":
+            status = "content"
+            content = value[:]
+        digest = result[2] if len(result) > 2 else None
+        encoding = result[3] if len(result) > 3 else self.TEXT_ENCODINGS[0] if status == "content" else None
+        try:
+            self._cache.store(relative_path, entry.stat(), status, content, digest, encoding)
+        except OSError:
+            pass
+        return result
+
+    def _inspect_file(self, entry: os.DirEntry, token_limit=None):
+        """
+        ファイルの種別判定と読み込みを行う。ワーカースレッドからも呼ばれるため、状態は変更しない。
+        引数と戻り値は _read_file と同じで、集計が有効な場合は所要時間を記録する。
+        """
+        if self.stats is None:
+            return self._read_file(entry, token_limit)
+        started = time.perf_counter()
+        self.stats.count("files_inspected")
+        self.stats.count("open_calls")
+        if not self.name_type_only:
+            self.stats.count("stat_calls")
+        try:
+            return self._read_file(entry, token_limit)
+        finally:
+            relative_path = os.path.relpath(entry.path, self.project_dir)
+            self.stats.record_file(relative_path, time.perf_counter() - started)
+
+    def _read_file(self, entry: os.DirEntry, token_limit=None):
+        """
+        ファイルを開いて種別判定と読み込みを行う。
+
+        ファイルは一度だけ開き、サイズは走査時の DirEntry から取得する。内容は一度だけ読み込み、
+        先頭 BINARY_CHECK_BYTES バイトの NUL 判定とデコードはメモリ上のバイト列に対して行う。
+        excerpt_bytes が有効な場合、上限を超えるテキストファイルは先頭と末尾だけを読む。
+
+        Args:
+            token_limit (int, optional): 指定した場合、読み込んだバイト列の見積もりトークン数が
+                これを超えるテキストはデコードせずに ("over_budget", None) を返す
+
+        Returns:
+            tuple: (状態, 値)。状態は "uninspectable" / "binary" / "text" / "unsized" /
+                "too_large" / "undecodable" / "content" / "mapped" / "over_budget" / "excerpt" のいずれかで、
+                値は例外、内容（"excerpt" の場合は先頭と末尾の抜粋）の文字列、
+                または内容をそのまま出力できる mmap オブジェクト。
+                "content" と "mapped" の場合は 3 番目の要素に内容のダイジェスト
+                （重複判定とマニフェストが無効な場合は None）を持つ。"content" と "excerpt" の場合は
+                4 番目の要素にデコードに使った文字コードを持つ（"mapped" は常に TEXT_ENCODINGS[0]）
+        """
+        try:
+            f = open(entry.path, "rb")
         except OSError as exc:
-            self.summary_content += f"{indent}- {file_path.name} (unreadable)\n"
-            self._record_skip(rel_path, f"file size could not be read: {exc}")
-            return
+            return ("uninspectable", exc)
+
+        with f:
+            size_error = None
+            if self.name_type_only:
+                file_size = None
+            else:
+                try:
+                    file_size = entry.stat().st_size
+                except OSError as exc:
+                    file_size = None
+                    size_error = exc
+
+            try:
+                if file_size is None or file_size > self.max_text_file_bytes:
+                    data = f.read(BINARY_CHECK_BYTES)
+                    if self.stats is not None:
+                        self.stats.count("bytes_read", len(data))
+                    if (
+                        file_size is not None
+                        and self.excerpt_bytes is not None
+                        and not self._looks_binary(data)
+                    ):
+                        return self._read_excerpt(f, file_size, token_limit)
+                elif self._should_map(file_size):
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    if self.stats is not None:
+                        self.stats.count("bytes_read", len(mapped))
+                    if (
+                        token_limit is not None
+                        and mapped.find(b"\0", 0, BINARY_CHECK_BYTES) == -1
+                        and estimate_tokens(mapped) > token_limit
+                    ):
+                        mapped.close()
+                        return ("over_budget", None)
+                    if self._looks_binary(mapped):
+                        mapped.close()
+                        return ("binary", None)
+                    if self._is_plain_utf8_text(mapped):
+                        return ("mapped", mapped, self._content_digest(mapped))
+                    with mapped:
+                        data = mapped[:]
+                else:
+                    data = f.read()
+                    if self.stats is not None:
+                        self.stats.count("bytes_read", len(data))
+            except (OSError, ValueError) as exc:
+                return ("uninspectable", exc)
+
+        if self._looks_binary(data):
+            return ("binary", None)
+
+        if self.name_type_only:
+            return ("text", None)
+
+        if size_error is not None:
+            return ("unsized", size_error)
 
         if file_size > self.max_text_file_bytes:
-            self.summary_content += (
-                f"{indent}- {file_path.name} (text file omitted: exceeds {self.max_text_file_bytes} bytes)\n"
-            )
-            self.file_contents_section += (
-                f"### {rel_path}\n\n"
-                f"(omitted: file is larger than {self.max_text_file_bytes} bytes)\n\n"
-            )
-            self._record_skip(rel_path, "file contents omitted because the file is too large")
-            return
+            return ("too_large", None)
+
+        if token_limit is not None and estimate_tokens(data) > token_limit:
+            return ("over_budget", None)
 
-        content = self._read_file_contents(file_path)
+        content, encoding = self._decode_text(data)
         if content is None:
-            self.summary_content += f"{indent}- {file_path.name} (unreadable text file)\n"
-            self._record_skip(rel_path, "file could not be decoded with supported encodings")
+            return ("undecodable", None)
+        return ("content", content, self._content_digest(data), encoding)
+
+    def _read_excerpt(self, f, file_size, token_limit=None):
+        """
+        開いているファイル f の先頭と末尾をそれぞれ最大 excerpt_bytes バイト読み、
+        ("excerpt", 文字列, None, 文字コード) を返す。
+
+        読み込む量はファイルの大きさに関係なく一定になる。先頭は最後の改行まで、末尾は最初の改行の後から
+        使うため、途中で切れた行や、複数バイト文字の途中から始まる断片は出力しない
+        （UTF-8 と Shift-JIS では改行のバイトが複数バイト文字の一部になることはない）。
+        改行が無い場合は、デコードできるまで切れ目側の端を最大 3 バイト削る。ただし Shift-JIS などの
+        UTF-8 以外の複数バイトの文字コードでは、2 バイト目だけでも別の文字としてデコードできてしまうため、
+        末尾の切れ目はファイルの先頭から読み直して求める（_partial_character_bytes）。
+        """
+        f.seek(0)
+        head = f.read(self.excerpt_bytes) if self.excerpt_bytes else b""
+        tail_start = max(file_size - self.excerpt_bytes, len(head))
+        f.seek(tail_start)
+        tail = f.read(file_size - tail_start)
+        if self.stats is not None:
+            self.stats.count("bytes_read", len(head) + len(tail))
+
+        tail_offset = None
+        if tail_start > len(head):
+            newline = head.rfind(b"\n")
+            if newline != -1:
+                head = head[:newline + 1]
+            newline = tail.find(b"\n")
+            if newline != -1:
+                tail = tail[newline + 1:]
+            else:
+                tail_offset = tail_start
+        elif tail:
+            tail_offset = tail_start
+        omitted_bytes = file_size - len(head) - len(tail)
+
+        if token_limit is not None and estimate_tokens(head) + estimate_tokens(tail) > token_limit:
+            return ("over_budget", None)
+
+        tail_skip = None if tail_offset is None else partial(self._partial_character_bytes, f, tail_offset)
+        decoded = self._decode_excerpt(head, tail, tail_skip)
+        if decoded is None:
+            return ("undecodable", None)
+        head_text, tail_text, trimmed_bytes, encoding = decoded
+        omitted_bytes += trimmed_bytes
+        if not omitted_bytes:
+            return ("excerpt", head_text + tail_text, None, encoding)
+        if head_text and not head_text.endswith("\n"):
+            head_text += "\n"
+        return ("excerpt", f"{head_text}... ({omitted_bytes} bytes omitted) ...\n{tail_text}", None, encoding)
+
+    def _decode_excerpt(self, head, tail, tail_skip=None):
+        """
+        先頭と末尾の抜粋を、TEXT_ENCODINGS のうち両方をデコードできる最初の文字コードでデコードする。
+        途中で切れた複数バイト文字を除くため、文字コードごとに切れ目側の端を最大 3 バイトまで削って試す。
+        tail_skip を指定した場合、UTF-8 以外の文字コードでは、末尾の先頭で削るバイト数を
+        tail_skip(文字コード) で求める（None ならその文字コードではデコードできないものとする）。
+
+        Returns:
+            tuple: (先頭の文字列, 末尾の文字列, 削ったバイト数, 文字コード)。デコードできない場合は None
+        """
+        for enc in self.TEXT_ENCODINGS:
+            if self.stats is not None:
+                self.stats.count_decode_attempt(enc)
+            head_decoded = self._decode_trimmed(head, enc, trim_end=True)
+            if head_decoded is None:
+                continue
+            if tail_skip is None or codecs.lookup(enc).name in SELF_SYNCHRONIZING_ENCODINGS:
+                tail_decoded = self._decode_trimmed(tail, enc, trim_end=False)
+            else:
+                tail_decoded = self._decode_skipped(tail, enc, tail_skip(enc))
+            if tail_decoded is not None:
+                return (
+                    self._normalize_newlines(head_decoded[0]),
+                    self._normalize_newlines(tail_decoded[0]),
+                    head_decoded[1] + tail_decoded[1],
+                    enc,
+                )
+        return None
+
+    @staticmethod
+    def _decode_skipped(data, encoding, skipped):
+        if skipped is None:
+            return None
+        try:
+            return data[skipped:].decode(encoding), skipped
+        except UnicodeDecodeError:
+            return None
+
+    def _partial_character_bytes(self, f, offset, encoding):
+        """
+        開いているファイル f を先頭から offset バイトまで encoding の増分デコーダーでデコードし、
+        offset の直後に続く、途中で切れた文字の残りのバイト数を返す。途中でデコードできない場合は None を返す。
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        f.seek(0)
+        remaining = offset
+        try:
+            while remaining:
+                chunk = f.read(min(remaining, UTF8_VALIDATION_CHUNK_BYTES))
+                if not chunk:
+                    return None
+                if self.stats is not None:
+                    self.stats.count("bytes_read", len(chunk))
+                remaining -= len(chunk)
+                decoder.decode(chunk)
+            pending = decoder.getstate()[0]
+            if not pending:
+                return 0
+            # 切れた文字の先頭のバイトに続けて 1 バイトずつ与え、文字が完成するまでのバイト数を求める
+            f.seek(offset)
+            following = f.read(MAX_CHARACTER_BYTES)
+            for length in range(1, len(following) + 1):
+                probe = codecs.getincrementaldecoder(encoding)()
+                if probe.decode(pending + following[:length]):
+                    return length
+        except (OSError, UnicodeDecodeError):
+            return None
+        return None
+
+    @staticmethod
+    def _decode_trimmed(data, encoding, trim_end):
+        for trimmed in range(min(4, len(data) + 1)):
+            part = data[:len(data) - trimmed] if trim_end else data[trimmed:]
+            try:
+                return part.decode(encoding), trimmed
+            except UnicodeDecodeError:
+                continue
+        return None
+
+    def _looks_binary(self, data):
+        """
+        先頭 BINARY_CHECK_BYTES バイトに NUL があるか、classifier が有効で既知のバイナリ形式の
+        マジックナンバーで始まる場合にバイナリとみなす。
+        """
+        if data.find(b"\0", 0, BINARY_CHECK_BYTES) != -1:
+            return True
+        return self.classifier is not None and self.classifier.has_binary_signature(data[:BINARY_CHECK_BYTES])
+
+    def _content_digest(self, data):
+        """
+        重複判定、マニフェスト、スナップショットのいずれかが有効な場合に、読み込んだバイト列の
+        blake2b ダイジェストを返す。
+        """
+        if not self._hash_contents and self.snapshot_path is None:
+            return None
+        return hashlib.blake2b(data, digest_size=CONTENT_DIGEST_BYTES).hexdigest()
+
+    def _should_map(self, file_size):
+        """
+        mmap した内容をそのまま出力できる条件か。テキストモードで書き込むと結果が変わる
+        （改行コードが変換される、最初の文字コードが UTF-8 ではない）場合は対象外とする。
+        """
+        return (
+            file_size >= self.mmap_min_bytes
+            and os.linesep == "\n"
+            and codecs.lookup(self.TEXT_ENCODINGS[0]).name == "utf-8"
+        )
+
+    @staticmethod
+    def _is_plain_utf8_text(mapped):
+        """
+        mmap した内容が、デコードして書き戻しても同じバイト列になるテキストかどうかを判定する。
+        str 全体は作らず、UTF8_VALIDATION_CHUNK_BYTES ずつ検証する。
+        """
+        if mapped.find(b"\0", 0, BINARY_CHECK_BYTES) != -1 or mapped.find(b"\r") != -1:
+            return False
+
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        has_content = False
+        try:
+            for offset in range(0, len(mapped), UTF8_VALIDATION_CHUNK_BYTES):
+                text = decoder.decode(mapped[offset:offset + UTF8_VALIDATION_CHUNK_BYTES])
+                if not has_content and text and not text.isspace():
+                    has_content = True
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+        # 空白だけのファイルは内容を出力しないため、通常の経路に任せる
+        return has_content
+
+    def _file_node(self, name, relative_path, level, entry, result):
+        """_inspect_file の結果から FileNode を作る。進捗の通知と重複判定もここで行う。"""
+        rel_path = Path(relative_path)
+        self.processed_files += 1
+        # 最後のファイルの進捗は、間引きの間隔に関係なく必ず通知する
+        if self.processed_files == self.total_files or self._progress_due():
+            self._notify_progress(
+                "file_processed",
+                path=rel_path,
+                processed_files=self.processed_files,
+                total_files=self.total_files,
+            )
+
+        if self._pending_snapshot_entries:
+            self._complete_snapshot_entry(rel_path, result)
+        if self._hash_contents and result[0] in ("content", "mapped"):
+            result = self._deduplicate(rel_path, result)
+        elif result[0] == "cutoff":
+            self._cut_files += 1
+
+        size = None
+        # 予算のために読まなかったファイルは、サイズを求めるためだけに stat しない
+        if not self.name_type_only and result[0] not in ("uninspectable", "unsized", "over_budget", "cutoff"):
+            try:
+                # DirEntry は判定時の stat の結果を保持しているため、通常は再び stat しない
+                size = entry.stat().st_size
+            except OSError:
+                pass
+        return self._build_file_node(name, rel_path, level, result, size)
+
+    def _build_file_node(self, name, rel_path, level, result, size=None):
+        status, value = result[:2]
+        node = FileNode(level, name, rel_path, status, size=size)
+        if status in ("content", "mapped", "excerpt"):
+            node.content = value
+            node.encoding = result[3] if len(result) > 3 else self.TEXT_ENCODINGS[0]
+            # スナップショットのためだけに求めたダイジェストは出力しない
+            node.digest = result[2] if self._hash_contents and len(result) > 2 else None
+        elif status == "duplicate":
+            node.reference = value
+        if status in ("uninspectable", "unsized"):
+            node.skip_reason = f"{SKIP_REASONS[status]}: {value}"
+        else:
+            node.skip_reason = SKIP_REASONS.get(status)
+        return node
+
+    def _write_markdown_node(self, node):
+        """ノードを Markdown にして、構造の要約とファイル内容の一時ファイルに書き込む。"""
+        if isinstance(node, DirectoryNode):
+            self._structure_output.write(f"{'  ' * node.level}- {node.name}/\n")
             return
+        if isinstance(node, SkippedNode):
+            self._record_skip(node.path, node.reason)
+            return
+
+        structure_line, contents_parts, skip_reasons = self._render_node(node)
+        self._structure_output.write(structure_line)
+        for part in contents_parts:
+            if isinstance(part, str):
+                self._contents_output.write(part)
+            else:
+                self._contents_output.flush()
+                self._contents_output.buffer.write(part)
+        if node.status == "mapped":
+            node.content.close()
+        for reason in skip_reasons:
+            self._record_skip(node.path, reason)
+
+    def _deduplicate(self, rel_path, result):
+        """
+        内容のダイジェストをマニフェストに記録し、同じ内容を出力済みのファイルであれば
+        ("duplicate", 最初のファイルのパス) に置き換える。
+        """
+        status, value, digest = result[:3]
+        if self.manifest_path is not None:
+            self._manifest_lines.append(f"{digest}  {Path(rel_path).as_posix()}\n")
+        # 空白だけのファイルは内容を出力しないため、重複の参照先にも参照元にもしない
+        if not self.deduplicate or (status == "content" and (not value or value.isspace())):
+            return result
+
+        first_path = self._first_paths_by_digest.setdefault(digest, rel_path)
+        if first_path is rel_path:
+            return result
+        if status == "mapped":
+            value.close()
+        return ("duplicate", first_path)
 
-        self.summary_content += f"{indent}- {file_path.name}\n"
-        if content.strip():
-            self.file_contents_section += f"### {rel_path}\n\n```\n{content}\n```\n\n"
+    def render_files(self, files):
+        """
+        ファイルを読み込み（キャッシュがあれば使い）、1 件ごとに
+        (ディレクトリ構造の行, ファイル内容の断片のリスト, スキップ理由のリスト) を入力順に返すジェネレータ。
+        断片の形式は _render_node と同じで、mmap オブジェクトは呼び出し元が閉じる。
 
-    def _is_ignored(self, path: Path, is_dir: bool) -> bool:
-        """無視パターンに基づいてパスを無視すべきかどうかをチェックする。"""
+        Args:
+            files (iterable): (階層, 名前, 相対パス, DirEntry) のタプル。相対パスは list_directory の一覧と同じ形式
+        """
+        files = list(files)
+        self._cache = self._open_cache()
         try:
-            relative_path = path.relative_to(self.project_dir)
-        except ValueError:
-            relative_path = path
-
-        return any(
-            ignore_patterns.matches(relative_path, is_dir=is_dir)
-            for ignore_patterns in (
-                self.gitignore,
-                self.summaryignore,
-                self.additional_ignore,
+            results = self._iter_file_results((relative_path, entry) for _, _, relative_path, entry in files)
+            try:
+                for (level, name, relative_path, _), result in zip(files, results):
+                    yield self._render_file(name, Path(relative_path), level, result)
+            finally:
+                results.close()
+        finally:
+            self._close_cache()
+
+    def _render_file(self, name: str, rel_path, level: int, result):
+        """_inspect_file の結果を _render_node と同じ形式の文字列に変換する。"""
+        return self._render_node(self._build_file_node(name, rel_path, level, result))
+
+    def _render_node(self, node):
+        """
+        FileNode を出力する文字列に変換する。
+
+        Returns:
+            tuple: (ディレクトリ構造の行, ファイル内容の断片のリスト, スキップ理由のリスト)。
+                断片は str か、そのまま出力するバイト列（mmap オブジェクト）で、大きなファイルの
+                内容を f-string で複製しないよう見出しと本文を分けて返す。
+        """
+        indent = "  " * node.level
+        name = node.name
+        rel_path = node.path
+        status = node.status
+        skip_reasons = [node.skip_reason] if node.skip_reason is not None else []
+        if status in ("uninspectable", "unsized"):
+            return f"{indent}- {name} (unreadable)\n", [], skip_reasons
+        if status == "binary":
+            return f"{indent}- {name} (binary file)\n", [], []
+        if status == "text":
+            return f"{indent}- {name} (text file)\n", [], []
+        if status == "too_large":
+            return (
+                f"{indent}- {name} (text file omitted: exceeds {self.max_text_file_bytes} bytes)\n",
+                [
+                    f"### {rel_path}\n\n"
+                    f"(omitted: file is larger than {self.max_text_file_bytes} bytes)\n\n"
+                ],
+                skip_reasons,
             )
-        )
+        if status == "excerpt":
+            return (
+                f"{indent}- {name} (text file excerpt: exceeds {self.max_text_file_bytes} bytes)\n",
+                [f"### {rel_path}\n\n```\n", node.content, "\n```\n\n"],
+                skip_reasons,
+            )
+        if status == "duplicate":
+            return f"{indent}- {name}\n", [f"### {rel_path}\n\n(identical to {node.reference})\n\n"], []
+        if status == "over_budget":
+            return f"{indent}- {name} (omitted: token budget)\n", [], skip_reasons
+        if status == "cutoff":
+            return f"{indent}- {name} (not read: budget exhausted)\n", [], []
+        if status == "undecodable":
+            return f"{indent}- {name} (unreadable text file)\n", [], skip_reasons
+        value = node.content
+        if status == "mapped" or (value and not value.isspace()):
+            return f"{indent}- {name}\n", [f"### {rel_path}\n\n```\n", value, "\n```\n\n"], []
+        return f"{indent}- {name}\n", [], []
+
+    def _phase(self, name):
+        """集計が有効な場合に段階 name の時間を記録するコンテキストマネージャを返す。"""
+        return nullcontext() if self.stats is None else self.stats.phase(name)
+
+    def _close_cache(self):
+        if self._cache is None:
+            return
+        if self.stats is not None:
+            self.stats.count("cache_hits", self._cache.hits)
+            self.stats.count("cache_misses", self._cache.misses)
+        self._cache.close()
+        self._cache = None
+
+    def _open_cache(self):
+        if self.cache_path is None:
+            return None
+        settings = [list(self.TEXT_ENCODINGS), self.max_text_file_bytes, BINARY_CHECK_BYTES]
+        if self.excerpt_bytes is not None:
+            settings.append(self.excerpt_bytes)
+        # マジックナンバーでバイナリと判定した結果は、classifier の有無と判定表によって変わる
+        classifier_fingerprint = self.classifier.fingerprint() if self.classifier is not None else None
+        settings.append({"fast_classify": self.classifier is not None, "classifier": classifier_fingerprint})
+        return FragmentCache(self.cache_path, settings, max_bytes=self.cache_max_bytes)
+
+    @staticmethod
+    def _iter_spool(spool):
+        """一時ファイルに溜めたファイル内容を、バイト列のまま SPOOL_COPY_BUFFER_BYTES ずつ返す。"""
+        spool.flush()
+        spool.buffer.seek(0)
+        while True:
+            chunk = spool.buffer.read(SPOOL_COPY_BUFFER_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+    def _is_ignored(self, relative_path, is_dir: bool, ignore_layers=()) -> bool:
+        """
+        無視パターンに基づいてパス（プロジェクトからの相対パス）を無視すべきかどうかをチェックする。
+        判定は _match_ignore_layers で行い、集計が有効な場合は回数と所要時間を記録する。
+        """
+        if self.stats is None:
+            return self._match_ignore_layers(relative_path, is_dir, ignore_layers)
+        started = time.perf_counter()
+        try:
+            return self._match_ignore_layers(relative_path, is_dir, ignore_layers)
+        finally:
+            self.stats.count("ignore_evaluations")
+            self.stats.add_time("ignore_matching", time.perf_counter() - started)
+
+    def _match_ignore_layers(self, relative_path, is_dir: bool, ignore_layers) -> bool:
+        """
+        追加パターンと ignore_layers を順に評価する。
+
+        追加パターン（-i と内部パターン）を最優先し、次に深いディレクトリの無視ファイルから順に
+        判定する。最初に一致した層の結果（"!" による除外を含む）を採用する。
+        """
+        verdict = self._override_matcher.verdict(relative_path, is_dir=is_dir)
+        if verdict is not None:
+            return verdict
+
+        for base, matcher in ignore_layers:
+            layer_path = relative_path[len(base) + 1:] if base else relative_path
+            verdict = matcher.verdict(layer_path, is_dir=is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def _compile_ignore_patterns(self, patterns):
+        """同じパターン列は同じ CompiledIgnorePatterns を使い回す。"""
+        key = tuple(patterns)
+        compiled = self._compiled_ignore_cache.get(key)
+        if compiled is None:
+            compiled = CompiledIgnorePatterns(key)
+            self._compiled_ignore_cache[key] = compiled
+        self._used_ignore_patterns[key] = compiled
+        return compiled
+
+    def release_ignore_caches(self):
+        """
+        このインスタンスが使った無視パターンの判定結果のキャッシュを破棄する。
+        compiled_pattern_cache を共有する長寿命のプロセスで、このプロジェクトを使い終えたときに呼ぶ。
+        """
+        for compiled in self._used_ignore_patterns.values():
+            compiled.clear_caches()
+        self._used_ignore_patterns = {}
+        if self._override_matcher is not None:
+            self._override_matcher.clear_caches()
 
     def _record_skip(self, path: Path, reason: str):
+        self.skipped_items.append(self.format_skip(path, reason))
+
+    @staticmethod
+    def format_skip(path, reason):
+        """Skipped Items の 1 行（先頭の "- " を除く）を作る。"""
         path_text = Path(path).as_posix() if str(path) else "."
-        self.skipped_items.append(f"{path_text}: {reason}")
+        return f"{path_text}: {reason}"
+
+    def _progress_due(self):
+        """
+        ファイルごとの進捗（count_progress / file_processed）を通知するかどうか。
+        progress_interval が 0 より大きい場合は、その間隔に 1 回までに間引く。
+        間引いた回はイベントの dict も作らない。
+        """
+        if self.progress_callback is None:
+            return False
+        if self.progress_interval <= 0:
+            return True
+        now = time.monotonic()
+        if now < self._next_progress_time:
+            return False
+        self._next_progress_time = now + self.progress_interval
+        return True
 
     def _notify_progress(self, event_name: str, **payload):
         if self.progress_callback is None:
@@ -241,30 +1773,55 @@ class ProjectSummarizer:
         self.progress_callback(event)
 
     @staticmethod
-    def _is_linklike(path: Path) -> bool:
+    def _is_linklike(entry: os.DirEntry) -> bool:
         try:
-            if path.is_symlink():
+            if entry.is_symlink():
                 return True
-            path_stat = path.stat(follow_symlinks=False)
+            # st_file_attributes は Windows にしか無いため、他の OS では stat を省略する
+            if not REPARSE_POINT:
+                return False
+            entry_stat = entry.stat(follow_symlinks=False)
         except OSError:
             return False
 
-        file_attributes = getattr(path_stat, "st_file_attributes", 0)
-        reparse_point = getattr(stat, "FILE_ATTRIBUTE_REPARSE_POINT", 0)
-        return bool(file_attributes & reparse_point)
+        file_attributes = getattr(entry_stat, "st_file_attributes", 0)
+        return bool(file_attributes & REPARSE_POINT)
 
-    @staticmethod
-    def _is_binary(file_path: Path) -> bool:
-        """1024バイトで始まるかどうかでバイナリファイルかどうかをチェックする。"""
-        with open(file_path, "rb") as f:
-            return b"\0" in f.read(1024)
+    def _decode_text(self, data: bytes):
+        """
+        バイト列を TEXT_ENCODINGS の順にデコードし、(内容, 文字コード) を返す。
+        デコードできない場合は (None, None) を返す。
+        テキストモードで読み込んだ場合と同じく、改行コードは "\\n" にそろえる。
+        """
+        started = time.perf_counter() if self.stats is not None else None
+        content = None
+        encoding = None
+        if data.isascii() and codecs.lookup(self.TEXT_ENCODINGS[0]).name in ASCII_COMPATIBLE_ENCODINGS:
+            # ASCII のみなら、最初の候補の文字コードでデコードした結果と同じになる
+            content = data.decode("ascii")
+            encoding = self.TEXT_ENCODINGS[0]
+            if started is not None:
+                self.stats.count_decode_attempt("ascii")
+        else:
+            for enc in self.TEXT_ENCODINGS:
+                if started is not None:
+                    self.stats.count_decode_attempt(enc)
+                try:
+                    content = data.decode(enc)
+                    encoding = enc
+                    break
+                except UnicodeDecodeError:
+                    continue
 
-    def _read_file_contents(self, file_path: Path):
-        """文字コードに応じてファイルの内容を読み取る。デコードできない場合は None を返す。"""
-        for enc in self.TEXT_ENCODINGS:
-            try:
-                with open(file_path, "r", encoding=enc) as f:
-                    return f.read()
-            except (OSError, UnicodeDecodeError):
-                continue
-        return None
+        if started is not None:
+            self.stats.add_time("decoding", time.perf_counter() - started)
+        if content is None:
+            return None, None
+        return self._normalize_newlines(content), encoding
+
+    @staticmethod
+    def _normalize_newlines(content):
+        """テキストモードで読み込んだ場合と同じく、改行コードを "\\n" にそろえる。"""
+        if "\r" in content:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        return content
@@ -0,0 +1,39 @@
+import math
+
+
+# ASCII の文字はおおよそ 4 バイトで 1 トークン、それ以外（日本語など）は 2 バイトで 1 トークンと見積もる
+ASCII_BYTES_PER_TOKEN = 4
+NON_ASCII_BYTES_PER_TOKEN = 2
+_ASCII_BYTES = bytes(range(128))
+_ESTIMATE_CHUNK_BYTES = 1024 * 1024
+
+
+def estimate_tokens(data):
+    """
+    テキストのトークン数を、バイト数と文字種（ASCII かどうか）から見積もる。
+
+    トークナイザーは使わず、bytes.translate で ASCII 以外のバイト数を数えるだけなので、
+    ファイル内容をデコードせずに見積もれる。
+
+    Args:
+        data (str or bytes-like): 見積もる内容。str は UTF-8 で出力した場合のバイト列で見積もる
+    """
+    if isinstance(data, str):
+        if data.isascii():
+            return math.ceil(len(data) / ASCII_BYTES_PER_TOKEN)
+        data = data.encode("utf-8")
+
+    non_ascii_bytes = 0
+    for offset in range(0, len(data), _ESTIMATE_CHUNK_BYTES):
+        chunk = data[offset:offset + _ESTIMATE_CHUNK_BYTES]
+        non_ascii_bytes += len(bytes(chunk).translate(None, _ASCII_BYTES))
+    ascii_bytes = len(data) - non_ascii_bytes
+    return (
+        math.ceil(ascii_bytes / ASCII_BYTES_PER_TOKEN)
+        + math.ceil(non_ascii_bytes / NON_ASCII_BYTES_PER_TOKEN)
+    )
+
+
+def minimum_tokens_for_size(size):
+    """size バイトの内容について estimate_tokens が返しうる最小値（すべて ASCII の場合）"""
+    return math.ceil(size / ASCII_BYTES_PER_TOKEN)
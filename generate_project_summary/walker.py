@@ -0,0 +1,87 @@
+from collections import deque
+import queue
+import threading
+
+
+class WorkStealingWalker:
+    """
+    ディレクトリの一覧取得を複数スレッドで並行に行うクラス
+
+    各ワーカーは自分の deque の末尾からタスクを取り出し（深さ優先）、自分の deque が空になったら
+    他のワーカーの deque の先頭からタスクを盗む。一覧取得の結果は完了順に呼び出し元スレッドへ返す。
+    """
+
+    def __init__(self, list_directory, workers):
+        """
+        Args:
+            list_directory (callable): タスクを受け取り (結果, 子タスクのリスト) を返す関数
+            workers (int): ワーカースレッド数
+        """
+        self.list_directory = list_directory
+        self.workers = max(1, workers)
+
+    def walk(self, root_task):
+        """
+        root_task から辿れるすべてのタスクを処理し、(タスク, 結果) を完了順に返すジェネレータ。
+        list_directory が送出した例外は呼び出し元スレッドで送出し直す。
+        """
+        deques = [deque() for _ in range(self.workers)]
+        available = threading.Semaphore(0)
+        results = queue.SimpleQueue()
+        stopping = threading.Event()
+
+        def push(index, task):
+            deques[index].append(task)
+            available.release()
+
+        def take(index):
+            # セマフォを獲得できた時点で、どこかの deque にタスクが 1 つ以上残っている
+            while True:
+                try:
+                    return deques[index].pop()
+                except IndexError:
+                    pass
+                for offset in range(1, self.workers):
+                    try:
+                        return deques[(index + offset) % self.workers].popleft()
+                    except IndexError:
+                        continue
+
+        def work(index):
+            while True:
+                available.acquire()
+                if stopping.is_set():
+                    return
+                task = take(index)
+                try:
+                    result, children = self.list_directory(task)
+                except Exception as exc:
+                    results.put((task, None, 0, exc))
+                    continue
+                # 子タスクの結果が親より先に届かないよう、親の結果を先に送る
+                results.put((task, result, len(children), None))
+                for child in children:
+                    push(index, child)
+
+        threads = [
+            threading.Thread(target=work, args=(index,), daemon=True)
+            for index in range(self.workers)
+        ]
+        push(0, root_task)
+        for thread in threads:
+            thread.start()
+
+        outstanding = 1
+        try:
+            while outstanding:
+                task, result, child_count, error = results.get()
+                if error is not None:
+                    raise error
+                outstanding += child_count - 1
+                yield task, result
+        finally:
+            stopping.set()
+            for _ in threads:
+                available.release()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,430 @@
+from pathlib import Path
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+from .summarizer import _encode_output
+
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+)
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class ChangeSet:
+    """
+    監視で検出した変更。full が True の場合はすべてのディレクトリを一覧し直す。
+
+    Attributes:
+        directories (set): 一覧し直すディレクトリの相対パス
+        files (set): 内容を読み直すファイルの相対パス
+    """
+
+    def __init__(self, full=False):
+        self.full = full
+        self.directories = set()
+        self.files = set()
+
+    def __bool__(self):
+        return self.full or bool(self.directories)
+
+    def merge(self, other):
+        self.full = self.full or other.full
+        self.directories |= other.directories
+        self.files |= other.files
+
+
+class PollingWatcher:
+    """一定間隔ごとにすべてのディレクトリを一覧し直させる監視方法（inotify が使えない環境用）"""
+
+    def __init__(self, interval_seconds=1.0):
+        self.interval_seconds = interval_seconds
+
+    def sync(self, directories):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval_seconds))
+        return ChangeSet(full=True)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    inotify でディレクトリの変更を待つ監視方法（Linux のみ）
+
+    変更を検出した後も debounce_seconds の間イベントが続く限り読み続け、
+    保存時に連続して発生するイベントを 1 つの ChangeSet にまとめる（最長 max_delay_seconds）。
+    """
+
+    def __init__(self, root_dir, debounce_seconds=0.1, max_delay_seconds=1.0):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc is not available")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self.root_dir = Path(root_dir)
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories_by_wd = {}
+        self._wd_by_directory = {}
+
+    def sync(self, directories):
+        """監視対象を directories（相対パスの集合）に合わせる。"""
+        for relative_path in set(self._wd_by_directory) - set(directories):
+            self._libc.inotify_rm_watch(self._fd, self._wd_by_directory.pop(relative_path))
+        for relative_path in directories:
+            if relative_path in self._wd_by_directory:
+                continue
+            path = self.root_dir / relative_path if relative_path else self.root_dir
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno), str(path))
+            self._directories_by_wd[wd] = relative_path
+            self._wd_by_directory[relative_path] = wd
+
+    def wait(self, timeout):
+        changes = self._read(timeout)
+        if not changes:
+            return changes
+        deadline = time.monotonic() + self.max_delay_seconds
+        while time.monotonic() < deadline:
+            more = self._read(self.debounce_seconds)
+            if not more:
+                break
+            changes.merge(more)
+        return changes
+
+    def close(self):
+        os.close(self._fd)
+
+    def _read(self, timeout):
+        changes = ChangeSet()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changes
+
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+                offset += name_length
+                self._record(changes, wd, mask, name)
+        return changes
+
+    def _record(self, changes, wd, mask, name):
+        if mask & _IN_Q_OVERFLOW:
+            changes.full = True
+            return
+        relative_path = self._directories_by_wd.get(wd)
+        if mask & _IN_IGNORED:
+            if relative_path is not None:
+                self._directories_by_wd.pop(wd, None)
+                self._wd_by_directory.pop(relative_path, None)
+            return
+        if relative_path is None:
+            return
+        changes.directories.add(relative_path)
+        if name:
+            changes.files.add(f"{relative_path}{os.sep}{name}" if relative_path else name)
+
+
+class _RenderedFile:
+    """1 ファイル分の出力。contents_range は現在の出力ファイル内のファイル内容の位置"""
+
+    __slots__ = ("stat_key", "structure_line", "skip_reasons", "contents_parts", "contents_range")
+
+    def __init__(self, stat_key, structure_line, contents_parts, skip_reasons):
+        self.stat_key = stat_key
+        self.structure_line = structure_line
+        self.contents_parts = contents_parts
+        self.skip_reasons = skip_reasons
+        self.contents_range = None
+
+
+class SummaryWatcher:
+    """
+    プロジェクトを監視し、変更があったディレクトリとファイルの分だけ要約を作り直すクラス
+
+    ディレクトリごとの一覧とファイルごとの出力を保持し、変更のあったディレクトリだけを
+    一覧し直し、変更のあったファイルだけを読み直す。変更の無いファイルの内容は前回の出力ファイルから
+    バイト列のままコピーし、一時ファイルに書いてから os.replace で置き換える。
+    """
+
+    def __init__(self, summarizer, output_file=None, use_inotify=True, poll_interval_seconds=1.0, on_update=None):
+        """
+        Args:
+            summarizer (ProjectSummarizer): 設定済みの ProjectSummarizer
+            output_file (str or Path, optional): 出力ファイル名。デフォルトは <project_name>_project_summary.txt
+            use_inotify (bool, optional): False の場合は常に一定間隔の再走査で変更を検出する
+            poll_interval_seconds (float, optional): 再走査で変更を検出する場合の間隔
+            on_update (callable, optional): 出力を書き換えるたびに、読み直したファイル数を渡して呼ぶ関数
+        """
+        self.summarizer = summarizer
+        self.output_file = Path(output_file or f"{summarizer.project_name}_project_summary.txt").resolve()
+        self.use_inotify = use_inotify
+        self.poll_interval_seconds = poll_interval_seconds
+        self.on_update = on_update
+        self._temporary_file = self.output_file.with_name(f".{self.output_file.name}.tmp")
+        self._listings = {}
+        self._files = {}
+        self._written_size = None
+
+        for path in (self.output_file, self._temporary_file):
+            if summarizer.project_dir in path.parents:
+                summarizer.additional_ignore.add_pattern(f"/{path.relative_to(summarizer.project_dir).as_posix()}")
+
+    def build(self):
+        """すべてを読み込んで出力ファイルを作る。"""
+        self._listings = {}
+        self._files = {}
+        return self.update(ChangeSet(full=True))
+
+    def update(self, changes):
+        """
+        変更を反映して出力ファイルを書き換える。
+
+        Returns:
+            int or None: 読み直したファイル数。出力に変化が無く書き換えなかった場合は None
+        """
+        if not self._output_is_current():
+            # 前回の出力から内容をコピーできないため、すべて読み直す
+            changes = ChangeSet(full=True)
+            self._files = {}
+
+        if changes.full or "" in changes.directories:
+            self.summarizer.reload_ignore_files()
+        relisted, structure_changed = self._refresh_listings(changes)
+        entries = self._assemble_entries()
+        inspected = self._refresh_files(entries, relisted, changes)
+        if not structure_changed and not inspected:
+            return None
+
+        self._write_output(entries)
+        if self.on_update is not None:
+            self.on_update(inspected)
+        return inspected
+
+    def run(self, stop_event=None):
+        """出力ファイルを作った後、stop_event がセットされるまで変更を監視して反映し続ける。"""
+        stop_event = stop_event or threading.Event()
+        self.build()
+        watcher = self._open_watcher()
+        try:
+            while not stop_event.is_set():
+                watcher.sync(self._listings)
+                changes = watcher.wait(self.poll_interval_seconds)
+                if changes and not stop_event.is_set():
+                    self.update(changes)
+        finally:
+            watcher.close()
+
+    def sync_watcher(self, watcher):
+        """InotifyWatcher / PollingWatcher の監視対象を、現在のディレクトリ一覧に合わせる。"""
+        watcher.sync(self._listings)
+
+    def remove_output(self):
+        """出力ファイルと書き込み途中の一時ファイルを削除する。"""
+        for path in (self.output_file, self._temporary_file):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _open_watcher(self):
+        if self.use_inotify:
+            try:
+                watcher = InotifyWatcher(self.summarizer.project_dir)
+                watcher.sync(self._listings)
+                return watcher
+            except (OSError, AttributeError):
+                pass
+        return PollingWatcher(self.poll_interval_seconds)
+
+    def _refresh_listings(self, changes):
+        """
+        変更のあったディレクトリと、無視パターンが変わったディレクトリだけを一覧し直す。
+
+        Returns:
+            tuple: (一覧し直したディレクトリの集合, ディレクトリ構造が変わったかどうか)
+        """
+        relisted = set()
+        visited = set()
+        structure_changed = False
+        root_task = self.summarizer.prepare_scan()
+        stack = [root_task] if root_task is not None else []
+
+        while stack:
+            task = stack.pop()
+            relative_path = task[1]
+            visited.add(relative_path)
+            previous = self._listings.get(relative_path)
+            if (
+                changes.full
+                or previous is None
+                or relative_path in changes.directories
+                or previous[0][4] != task[4]
+            ):
+                listing, _ = self.summarizer.list_directory(task)
+                relisted.add(relative_path)
+                if previous is None or self._shape(previous[1]) != self._shape(listing):
+                    structure_changed = True
+                self._listings[relative_path] = (task, listing)
+            else:
+                listing = previous[1]
+            stack.extend(entry[4] for entry in reversed(listing) if entry[0] == "subdir")
+
+        for relative_path in set(self._listings) - visited:
+            del self._listings[relative_path]
+            structure_changed = True
+        return relisted, structure_changed
+
+    def _assemble_entries(self):
+        entries = []
+        if "" not in self._listings:
+            return entries
+        pending = [iter(self._listings[""][1])]
+        while pending:
+            entry = next(pending[-1], None)
+            if entry is None:
+                pending.pop()
+            elif entry[0] == "subdir":
+                pending.append(iter(self._listings[entry[3]][1]))
+            else:
+                entries.append(entry)
+        return entries
+
+    def _refresh_files(self, entries, relisted, changes):
+        """内容が変わった可能性のあるファイルだけを読み直し、読み直した件数を返す。"""
+        files = {}
+        targets = []
+        for kind, level, name, relative_path, entry in entries:
+            if kind != "file":
+                continue
+            rendered = self._files.get(relative_path)
+            parent = relative_path.rpartition(os.sep)[0]
+            if (
+                rendered is None
+                or relative_path in changes.files
+                or (parent in relisted and rendered.stat_key != self._stat_key(entry))
+            ):
+                targets.append((level, name, relative_path, entry))
+            else:
+                files[relative_path] = rendered
+
+        rendered_files = self.summarizer.render_files(targets)
+        for (_, _, relative_path, entry), (structure_line, contents_parts, skip_reasons) in zip(
+            targets, rendered_files
+        ):
+            files[relative_path] = _RenderedFile(self._stat_key(entry), structure_line, contents_parts, skip_reasons)
+
+        self._files = files
+        return len(targets)
+
+    def _write_output(self, entries):
+        summarizer = self.summarizer
+        skipped_items = []
+        previous_output = open(self.output_file, "rb") if self._written_size is not None else None
+        try:
+            with open(self._temporary_file, "wb") as f:
+                f.write(_encode_output(f"# {summarizer.project_name}\n\n## Directory Structure\n\n"))
+                for kind, level, name, relative_path, payload in entries:
+                    if kind == "dir":
+                        f.write(_encode_output(f"{'  ' * level}- {name}/\n"))
+                    elif kind == "skip":
+                        skipped_items.append(summarizer.format_skip(relative_path, payload))
+                    else:
+                        rendered = self._files[relative_path]
+                        f.write(_encode_output(rendered.structure_line))
+                        for reason in rendered.skip_reasons:
+                            skipped_items.append(summarizer.format_skip(relative_path, reason))
+
+                if not summarizer.name_type_only:
+                    f.write(_encode_output("\n## File Contents\n\n"))
+                    for kind, _, _, relative_path, _ in entries:
+                        if kind == "file":
+                            self._write_contents(f, self._files[relative_path], previous_output)
+
+                summarizer.skipped_items = skipped_items
+                if skipped_items:
+                    skipped_lines = "\n".join(f"- {item}" for item in skipped_items)
+                    f.write(_encode_output(f"\n## Skipped Items\n\n{skipped_lines}\n"))
+                self._written_size = f.tell()
+        finally:
+            if previous_output is not None:
+                previous_output.close()
+        os.replace(self._temporary_file, self.output_file)
+
+    def _write_contents(self, f, rendered, previous_output):
+        offset = f.tell()
+        if rendered.contents_parts is not None:
+            for part in rendered.contents_parts:
+                if isinstance(part, str):
+                    f.write(_encode_output(part))
+                else:
+                    with part:
+                        f.write(part)
+            rendered.contents_parts = None
+        elif rendered.contents_range is not None:
+            previous_offset, length = rendered.contents_range
+            previous_output.seek(previous_offset)
+            while length:
+                chunk = previous_output.read(min(length, 1024 * 1024))
+                if not chunk:
+                    raise OSError("previous summary output was truncated")
+                f.write(chunk)
+                length -= len(chunk)
+        rendered.contents_range = (offset, f.tell() - offset)
+
+    def _output_is_current(self):
+        if self._written_size is None:
+            return not self._files
+        try:
+            return self.output_file.stat().st_size == self._written_size
+        except OSError:
+            return False
+
+    @staticmethod
+    def _shape(listing):
+        return [(entry[0], entry[3], entry[4] if entry[0] == "skip" else None) for entry in listing]
+
+    @staticmethod
+    def _stat_key(entry):
+        try:
+            file_stat = entry.stat()
+        except OSError:
+            return None
+        return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
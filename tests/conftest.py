@@ -1,4 +1,7 @@
 # tests/conftest.py
+import builtins
+import os
+
 import pytest
 from pathlib import Path
 
@@ -28,4 +31,23 @@ def setup_project(tmp_path):
     (project_dir / ".gitignore").write_text("*.log\n.venv/\ndocs/guide.md")
 
     # 作成したプロジェクトディレクトリのパスをテストに渡す
-    return project_dir
\ No newline at end of file
+    return project_dir
+
+@pytest.fixture
+def record_opens(monkeypatch):
+    """
+    builtins.open で開いたファイルの名前（basename）を記録するフィクスチャ。
+    返された関数を呼んだ時点から記録を始め、記録先のリストを返す。
+    """
+    def start():
+        opened = []
+        original_open = builtins.open
+
+        def recording_open(file, *args, **kwargs):
+            opened.append(os.path.basename(file))
+            return original_open(file, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, "open", recording_open)
+        return opened
+
+    return start
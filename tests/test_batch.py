@@ -0,0 +1,66 @@
+import pytest
+
+from generate_project_summary.batch import read_batch_manifest, summarize_projects
+from generate_project_summary.ignore_patterns import CompiledPatternCache
+
+
+@pytest.fixture
+def projects(tmp_path):
+    for group, name in (("team_a", "service"), ("team_b", "service"), ("team_a", "api")):
+        project_dir = tmp_path / group / name
+        project_dir.mkdir(parents=True)
+        (project_dir / ".gitignore").write_text("*.log\n", encoding="utf-8")
+        (project_dir / "main.py").write_text(f"print('{group}/{name}')", encoding="utf-8")
+        (project_dir / "debug.log").write_text("ignored", encoding="utf-8")
+    return tmp_path
+
+
+def test_read_batch_manifest(tmp_path):
+    manifest_path = tmp_path / "projects.txt"
+    manifest_path.write_text(
+        "# nightly\n\nteam_a/service\nteam_b/service\tout/b.txt\n", encoding="utf-8"
+    )
+
+    assert read_batch_manifest(manifest_path) == [
+        (tmp_path / "team_a" / "service", None),
+        (tmp_path / "team_b" / "service", tmp_path / "out" / "b.txt"),
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_summarize_projects_isolates_failures(projects, workers):
+    output_dir = projects / "summaries"
+    results = summarize_projects(
+        [
+            (projects / "team_a" / "service", None),
+            (projects / "missing", None),
+            (projects / "team_b" / "service", None),
+            (projects / "team_a" / "api", output_dir / "custom.txt"),
+        ],
+        output_dir=output_dir,
+        workers=workers,
+    )
+
+    assert [result.ok for result in results] == [True, False, True, True]
+    assert "NotADirectoryError" in results[1].error
+    assert results[0].output_file.name == "service_project_summary.txt"
+    assert results[2].output_file.name == "service-2_project_summary.txt"
+    assert "print('team_b/service')" in results[2].output_file.read_text(encoding="utf-8")
+    assert "debug.log" not in (output_dir / "custom.txt").read_text(encoding="utf-8")
+    assert results[3].total_files == 2
+
+
+def test_summarize_projects_shares_compiled_patterns(projects, monkeypatch):
+    from generate_project_summary import batch
+
+    shared_cache = CompiledPatternCache()
+    monkeypatch.setattr(batch, "_shared_pattern_cache", shared_cache)
+    summarize_projects(
+        [(projects / "team_a" / "service", None), (projects / "team_b" / "service", None)],
+        output_dir=projects / "summaries",
+        workers=1,
+    )
+
+    assert list(shared_cache) == [("*.log",)]
+    # ディレクトリの判定結果は次のプロジェクトに持ち越さない
+    assert not shared_cache.get(("*.log",))._directory_verdicts
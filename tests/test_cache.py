@@ -0,0 +1,63 @@
+import os
+
+from generate_project_summary.cache import FragmentCache
+
+
+def make_stat(tmp_path, name, mtime_ns=1_000_000_000):
+    path = tmp_path / name
+    path.write_text(name, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path.stat()
+
+
+def test_lookup_requires_matching_stat_key(tmp_path):
+    file_stat = make_stat(tmp_path, "a.txt")
+    cache = FragmentCache(tmp_path / "cache.sqlite", ["utf-8"])
+    cache.store("a.txt", file_stat, "content", b"a.txt")
+
+    assert cache.lookup("a.txt", file_stat) == ("content", b"a.txt")
+    assert cache.lookup("a.txt", make_stat(tmp_path, "a.txt", mtime_ns=2_000_000_000)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_recently_modified_files_are_not_stored(tmp_path):
+    path = tmp_path / "fresh.txt"
+    path.write_text("fresh", encoding="utf-8")
+    cache = FragmentCache(tmp_path / "cache.sqlite", ["utf-8"])
+    cache.store("fresh.txt", path.stat(), "content", b"fresh")
+
+    assert cache.lookup("fresh.txt", path.stat()) is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache_path = tmp_path / "cache.sqlite"
+    old_stat = make_stat(tmp_path, "old.txt")
+    new_stat = make_stat(tmp_path, "new.txt")
+
+    cache = FragmentCache(cache_path, ["utf-8"], max_bytes=10)
+    cache.store("old.txt", old_stat, "content", b"x" * 8)
+    cache.close()
+
+    cache = FragmentCache(cache_path, ["utf-8"], max_bytes=10)
+    cache.store("new.txt", new_stat, "content", b"y" * 8)
+    cache.close()
+
+    cache = FragmentCache(cache_path, ["utf-8"], max_bytes=10)
+    assert cache.lookup("old.txt", old_stat) is None
+    assert cache.lookup("new.txt", new_stat) == ("content", b"y" * 8)
+    cache.close()
+
+
+def test_settings_change_discards_entries(tmp_path):
+    cache_path = tmp_path / "cache.sqlite"
+    file_stat = make_stat(tmp_path, "a.txt")
+
+    cache = FragmentCache(cache_path, ["utf-8"])
+    cache.store("a.txt", file_stat, "binary")
+    cache.close()
+
+    cache = FragmentCache(cache_path, ["utf-8", "shift_jis"])
+    assert cache.lookup("a.txt", file_stat) is None
+    cache.close()
@@ -0,0 +1,36 @@
+from generate_project_summary.classifier import ExtensionClassifier
+
+
+def test_classify_uses_extension_and_well_known_names():
+    classifier = ExtensionClassifier()
+
+    assert classifier.classify("main.PY") == "text"
+    assert classifier.classify("Dockerfile") == "text"
+    assert classifier.classify(".gitignore") == "text"
+    assert classifier.classify("photo.JPG") == "binary"
+    assert classifier.classify("module.cpython-312.pyc") == "binary"
+    assert classifier.classify("data.custom") is None
+    assert classifier.classify("noextension") is None
+
+
+def test_classify_accepts_additional_extensions():
+    classifier = ExtensionClassifier(text_extensions=[".TMPL"], binary_extensions=[".blob", ".svg"])
+
+    assert classifier.classify("page.tmpl") == "text"
+    assert classifier.classify("raw.blob") == "binary"
+    assert classifier.classify("icon.svg") == "binary"
+
+
+def test_has_binary_signature():
+    assert ExtensionClassifier.has_binary_signature(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n1 0 obj\nstream\nx\x9c\xcbH\xcd\xc9\x01")
+    assert ExtensionClassifier.has_binary_signature(b"\x00\x00\x00\x18ftypmp42")
+    assert ExtensionClassifier.has_binary_signature(b"\x89PNG\r\n\x1a\n")
+    assert ExtensionClassifier.has_binary_signature(b"ID3\x04\x01\x7f\x01")
+    assert not ExtensionClassifier.has_binary_signature(b"plain text")
+
+
+def test_ascii_signatures_need_non_text_bytes():
+    assert not ExtensionClassifier.has_binary_signature(b"ID3 tags are described below.\n")
+    assert not ExtensionClassifier.has_binary_signature(b"%PDF-1.7 is the version we target\n")
+    assert not ExtensionClassifier.has_binary_signature("OggS の説明\n".encode("utf-8"))
+    assert not ExtensionClassifier.has_binary_signature(b"abcdftyp is not a box\n")
@@ -0,0 +1,149 @@
+import io
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from generate_project_summary.daemon import DaemonError, SummaryDaemon, request_summary, runtime_dir, stop_daemon
+from generate_project_summary.summarizer import ProjectSummarizer
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def daemon(request, tmp_path):
+    summary_daemon = SummaryDaemon(str(tmp_path / "daemon.sock"), max_projects=1, use_inotify=request.param)
+    thread = threading.Thread(target=summary_daemon.serve_forever)
+    thread.start()
+    assert summary_daemon.ready.wait(5)
+    yield summary_daemon
+    stop_daemon(summary_daemon.address, timeout=5)
+    thread.join(5)
+
+
+def fetch(daemon, project_dir, **options):
+    out = io.BytesIO()
+    header = request_summary(project_dir, out, address=daemon.address, timeout=5, **options)
+    return header, out.getvalue()
+
+
+def test_daemon_serves_warm_summaries(daemon, setup_project, tmp_path):
+    expected_file = tmp_path / "expected.txt"
+    ProjectSummarizer(setup_project).generate_project_summary(output_file=expected_file)
+
+    header, summary = fetch(daemon, setup_project)
+    assert summary == expected_file.read_bytes()
+    assert header["inspected"] > 0
+
+    header, summary = fetch(daemon, setup_project)
+    assert summary == expected_file.read_bytes()
+    assert header["inspected"] == 0
+
+    (setup_project / "main.py").write_text("print('changed')", encoding="utf-8")
+    header, summary = fetch(daemon, setup_project)
+    assert b"print('changed')" in summary
+    assert header["inspected"] == 1
+
+
+def test_daemon_evicts_least_recently_used_projects(daemon, tmp_path):
+    for name in ("first", "second"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "main.py").write_text(f"print('{name}')", encoding="utf-8")
+
+    fetch(daemon, tmp_path / "first")
+    fetch(daemon, tmp_path / "second")
+    header, summary = fetch(daemon, tmp_path / "first")
+
+    assert b"print('first')" in summary
+    # max_projects=1 のため、second を要求した時点で first の状態は破棄されている
+    assert header["inspected"] == 1
+
+
+def test_evicted_projects_release_directory_verdicts(daemon, tmp_path):
+    (tmp_path / "nested" / "src").mkdir(parents=True)
+    (tmp_path / "nested" / "src" / "main.py").write_text("print('nested')", encoding="utf-8")
+    (tmp_path / "flat").mkdir()
+    (tmp_path / "flat" / "main.py").write_text("print('flat')", encoding="utf-8")
+
+    fetch(daemon, tmp_path / "nested")
+    fetch(daemon, tmp_path / "flat")
+
+    # nested のディレクトリの判定結果は、nested の状態と一緒に破棄される
+    assert not any(daemon._compiled_pattern_cache.get(key)._directory_verdicts for key in daemon._compiled_pattern_cache)
+
+
+def test_daemon_rejects_unsupported_options(daemon, setup_project):
+    with pytest.raises(DaemonError, match="max_tokens"):
+        fetch(daemon, setup_project, max_tokens=100)
+    with pytest.raises(DaemonError, match="not a directory"):
+        fetch(daemon, setup_project / "main.py")
+
+
+def test_request_summary_without_daemon(tmp_path):
+    with pytest.raises(DaemonError, match="no summary daemon"):
+        request_summary(tmp_path, io.BytesIO(), address=str(tmp_path / "missing.sock"))
+
+
+def start_daemon(address, monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    (tmp_path / "run").mkdir(exist_ok=True)
+    summary_daemon = SummaryDaemon(address, use_inotify=False)
+    thread = threading.Thread(target=summary_daemon.serve_forever)
+    thread.start()
+    assert summary_daemon.ready.wait(5)
+    return summary_daemon, thread
+
+
+def unused_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def test_tcp_daemon_requires_the_owner_token(setup_project, monkeypatch, tmp_path):
+    port = unused_port()
+    summary_daemon, thread = start_daemon(f"tcp:{port}", monkeypatch, tmp_path)
+    try:
+        token_path = runtime_dir() / f"tcp-{port}.token"
+        assert stat.S_IMODE(os.stat(runtime_dir()).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(token_path).st_mode) == 0o600
+
+        header, summary = fetch(summary_daemon, setup_project)
+        assert header["ok"] and b"main.py" in summary
+
+        for token in (None, "0" * 64):
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+                request = {"command": "shutdown"} if token is None else {"command": "shutdown", "token": token}
+                connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+                response = json.loads(connection.makefile("rb").readline())
+            assert response == {"ok": False, "error": "DaemonError: authentication failed"}
+    finally:
+        stop_daemon(summary_daemon.address, timeout=5)
+        thread.join(5)
+    assert not token_path.exists()
+
+
+def test_default_socket_is_created_in_a_private_directory(monkeypatch, tmp_path):
+    summary_daemon, thread = start_daemon(None, monkeypatch, tmp_path)
+    try:
+        assert summary_daemon.address == str(runtime_dir() / "daemon.sock")
+        assert stat.S_IMODE(os.stat(runtime_dir()).st_mode) == 0o700
+    finally:
+        stop_daemon(timeout=5)
+        thread.join(5)
+
+
+def test_socket_directories_writable_by_others_are_refused(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    runtime_dir().mkdir(mode=0o755)
+    os.chmod(runtime_dir(), 0o755)
+    shared_dir = tmp_path / "shared"
+    shared_dir.mkdir()
+    os.chmod(shared_dir, 0o777)
+
+    for address in (None, str(shared_dir / "daemon.sock")):
+        with pytest.raises(DaemonError, match="accessible by other users"):
+            SummaryDaemon(address).serve_forever()
+        with pytest.raises(DaemonError, match="accessible by other users"):
+            stop_daemon(address, timeout=5)
@@ -0,0 +1,86 @@
+import shutil
+import subprocess
+
+import pytest
+
+from generate_project_summary.git_index import GitIndexEntry, GitIndexError, _parse_index, read_git_index
+from generate_project_summary.summarizer import ProjectSummarizer
+
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "src" / "pkg").mkdir(parents=True)
+    (repo / "src" / "pkg" / "mod.py").write_text("x = 1", encoding="utf-8")
+    (repo / "src" / "Main.py").write_text("print('main')", encoding="utf-8")
+    (repo / "README.md").write_text("# repo", encoding="utf-8")
+    git(repo, "init", "-q")
+    git(repo, "add", ".")
+    (repo / "node_modules" / "dep").mkdir(parents=True)
+    (repo / "node_modules" / "dep" / "index.js").write_text("untracked", encoding="utf-8")
+    (repo / "untracked.txt").write_text("untracked", encoding="utf-8")
+    return repo
+
+
+@pytest.mark.parametrize("index_version", ["2", "3", "4"])
+def test_read_git_index_lists_tracked_files(git_repo, index_version):
+    git(git_repo, "update-index", "--index-version", index_version)
+
+    entries = read_git_index(git_repo)
+
+    assert [entry.relative_path for entry in entries] == [
+        "README.md",
+        "src/Main.py",
+        "src/pkg/mod.py",
+    ]
+    assert entries[0].stat().st_size == len("# repo")
+
+
+def test_read_git_index_from_subdirectory(git_repo):
+    entries = read_git_index(git_repo / "src")
+
+    assert [entry.relative_path for entry in entries] == ["Main.py", "pkg/mod.py"]
+
+
+def test_parse_index_rejects_other_files():
+    with pytest.raises(GitIndexError):
+        _parse_index(b"not an index", 20, "", ".")
+
+
+def test_git_index_mode_skips_untracked_files(git_repo):
+    output_file = git_repo.parent / "summary.txt"
+    ProjectSummarizer(git_repo, use_git_index=True).generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "node_modules" not in summary
+    assert "untracked" not in summary
+    assert "- repo/\n  - README.md\n  - src/\n    - Main.py\n    - pkg/\n      - mod.py\n" in summary
+    assert "print('main')" in summary
+
+
+def test_git_index_mode_packs_by_index_size_without_stat(git_repo, monkeypatch):
+    (git_repo / "large.txt").write_text("word " * 2000, encoding="utf-8")
+    git(git_repo, "add", "large.txt")
+    stat_paths = []
+    original_stat = GitIndexEntry.stat
+
+    def recording_stat(self):
+        stat_paths.append(self.relative_path)
+        return original_stat(self)
+
+    monkeypatch.setattr(GitIndexEntry, "stat", recording_stat)
+    output_file = git_repo.parent / "summary.txt"
+    ProjectSummarizer(git_repo, use_git_index=True, max_tokens=300).generate_project_summary(
+        output_file=output_file
+    )
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "- large.txt (omitted: token budget)" in summary
+    assert "large.txt" not in stat_paths
@@ -0,0 +1,111 @@
+from pathlib import PurePosixPath
+import random
+
+import pytest
+
+from generate_project_summary.ignore_patterns import CompiledIgnorePatterns, CompiledPatternCache, IgnorePatterns
+
+
+def reference_matches(patterns, path, is_dir):
+    normalized_path = PurePosixPath(str(path).replace("\\", "/"))
+    return any(
+        IgnorePatterns._matches_pattern(pattern, normalized_path, is_dir)
+        for pattern in patterns
+    )
+
+
+@pytest.mark.parametrize(
+    "pattern, path, is_dir, expected",
+    [
+        ("node_modules", "frontend/node_modules", True, True),
+        ("*.log", "logs/app.log", False, True),
+        ("*.tar.gz", "dist/pkg.tar.gz", False, True),
+        ("*.py", "src/main.pyc", False, False),
+        ("build/", "build", False, False),
+        ("build/", "src/build", True, True),
+        ("/docs/guide.md", "docs/guide.md", False, True),
+        ("/docs/guide.md", "sub/docs/guide.md", False, False),
+        ("docs/guide.md", "sub/docs/guide.md", False, True),
+        ("/secret.txt", "nested/secret.txt", False, True),
+        ("a*b", "a/x/b", False, True),
+        ("*.py", ".", True, False),
+    ],
+)
+def test_compiled_patterns_follow_pattern_semantics(pattern, path, is_dir, expected):
+    compiled = CompiledIgnorePatterns([pattern])
+
+    assert compiled.matches(path, is_dir=is_dir) is expected
+    assert reference_matches([pattern], path, is_dir) is expected
+
+
+def test_compiled_patterns_agree_with_reference_on_random_inputs():
+    rnd = random.Random(0)
+    atoms = ["a", "b", ".py", "*", "?", "[ab]", "[!a]", "/", "x.y", "**", "."]
+    names = ["a", "b", "ab", "x.py", "a.b.py", ".hidden", "x.y", "node_modules"]
+
+    for _ in range(500):
+        patterns = IgnorePatterns(
+            patterns=[
+                "".join(rnd.choice(atoms) for _ in range(rnd.randint(1, 4)))
+                for _ in range(rnd.randint(1, 6))
+            ]
+        ).patterns
+        compiled = CompiledIgnorePatterns(patterns)
+        for _ in range(20):
+            path = "/".join(rnd.choice(names) for _ in range(rnd.randint(0, 4)))
+            is_dir = rnd.random() < 0.5
+            assert compiled.matches(path, is_dir=is_dir) == reference_matches(
+                patterns, path, is_dir
+            ), (patterns, path, is_dir)
+
+
+def test_ignore_patterns_recompile_after_add_pattern():
+    ignore_patterns = IgnorePatterns(patterns=["*.log"])
+    assert not ignore_patterns.matches("notes.tmp")
+
+    ignore_patterns.add_pattern("*.tmp")
+
+    assert ignore_patterns.matches("notes.tmp")
+
+
+def test_negation_uses_the_last_matching_pattern():
+    compiled = CompiledIgnorePatterns(["*.log", "!important.log", "logs/"])
+
+    assert compiled.matches("debug.log")
+    assert not compiled.matches("important.log")
+    assert compiled.verdict("important.log") is False
+    assert compiled.verdict("main.py") is None
+    assert compiled.matches("important.log/logs", is_dir=True)
+
+
+def test_repeated_pattern_moves_after_negation():
+    ignore_patterns = IgnorePatterns(patterns=["*.log", "!keep.log", "*.log"])
+
+    assert ignore_patterns.patterns == ["!keep.log", "*.log"]
+    assert ignore_patterns.matches("keep.log")
+
+
+def test_directory_verdict_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(CompiledIgnorePatterns, "MAX_CACHED_DIRECTORIES", 4)
+    compiled = CompiledIgnorePatterns(["build/"])
+
+    for index in range(10):
+        compiled.verdict(f"src/dir{index}", is_dir=True)
+
+    assert len(compiled._directory_verdicts) <= 4
+    assert compiled.matches("src/build", is_dir=True)
+
+    compiled.clear_caches()
+    assert not compiled._directory_verdicts
+
+
+def test_compiled_pattern_cache_evicts_least_recently_used():
+    cache = CompiledPatternCache(max_entries=2)
+    for patterns in (("a",), ("b",)):
+        cache[patterns] = CompiledIgnorePatterns(patterns)
+    assert cache.get(("a",)) is not None
+
+    cache[("c",)] = CompiledIgnorePatterns(("c",))
+
+    assert list(cache) == [("a",), ("c",)]
+    assert cache.get(("b",)) is None
@@ -1,8 +1,11 @@
+import json
 import sys
+import threading
 from pathlib import Path
 
 import pytest
 
+from generate_project_summary.daemon import SummaryDaemon, stop_daemon
 from generate_project_summary.main import main
 
 
@@ -64,3 +67,242 @@ def test_main_name_type_only_short_option(monkeypatch, tmp_path):
     summary = output_file.read_text(encoding="utf-8")
     assert "main.py (text file)" in summary
     assert "## File Contents" not in summary
+
+
+
+def test_main_jobs_option(monkeypatch, tmp_path):
+    (tmp_path / "main.py").write_text("print('hello')", encoding="utf-8")
+    output_file = tmp_path / "summary_jobs.txt"
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["generate-project-summary", "-d", str(tmp_path), "-j", "4", "-o", str(output_file)],
+    )
+
+    main()
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "### main.py" in summary
+    assert "print('hello')" in summary
+
+
+
+def test_main_cache_option(monkeypatch, tmp_path):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "main.py").write_text("print('hello')", encoding="utf-8")
+    cache_path = tmp_path / "cache.sqlite"
+    output_file = tmp_path / "summary_cache.txt"
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "generate-project-summary",
+            "-d",
+            str(project_dir),
+            "--cache",
+            str(cache_path),
+            "-o",
+            str(output_file),
+        ],
+    )
+
+    main()
+
+    assert cache_path.exists()
+    assert "print('hello')" in output_file.read_text(encoding="utf-8")
+
+
+
+def test_main_git_index_option_requires_repository(monkeypatch, tmp_path):
+    (tmp_path / "main.py").write_text("print('hello')", encoding="utf-8")
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["generate-project-summary", "-d", str(tmp_path), "--git-index", "-o", str(tmp_path / "out.txt")],
+    )
+
+    with pytest.raises(FileNotFoundError):
+        main()
+
+
+
+def test_main_profile_option_writes_json_report(monkeypatch, tmp_path):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "main.py").write_text("print('hello')", encoding="utf-8")
+    profile_path = tmp_path / "profile.json"
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "generate-project-summary",
+            "-d",
+            str(project_dir),
+            "--profile",
+            str(profile_path),
+            "-o",
+            str(tmp_path / "out.txt"),
+        ],
+    )
+
+    main()
+
+    report = json.loads(profile_path.read_text(encoding="utf-8"))
+    assert report["counters"]["files_inspected"] == 1
+    assert report["slowest_files"][0]["path"] == "main.py"
+
+
+
+def test_main_writes_summary_to_stdout(monkeypatch, tmp_path, capsysbinary):
+    (tmp_path / "main.py").write_text("print('hello')", encoding="utf-8")
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["generate-project-summary", "-d", str(tmp_path), "-o", "-", "--progress", "none"],
+    )
+
+    main()
+
+    captured = capsysbinary.readouterr()
+    assert captured.out.startswith(f"# {tmp_path.name}".encode("utf-8"))
+    assert b"print('hello')" in captured.out
+    assert not (tmp_path / "-").exists()
+
+
+def test_main_batch_option_reports_failures(monkeypatch, tmp_path, capsys):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "main.py").write_text("print('app')", encoding="utf-8")
+    manifest_path = tmp_path / "projects.txt"
+    manifest_path.write_text("app\nmissing\n", encoding="utf-8")
+    output_dir = tmp_path / "out"
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "generate-project-summary",
+            "--batch",
+            str(manifest_path),
+            "--output-dir",
+            str(output_dir),
+            "--batch-workers",
+            "1",
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 1
+    assert "print('app')" in (output_dir / "app_project_summary.txt").read_text(encoding="utf-8")
+    stderr = capsys.readouterr().err
+    assert "FAILED" in stderr
+    assert "1 of 2 projects summarized" in stderr
+
+
+def test_main_rejects_jsonl_format_with_watch(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["generate-project-summary", "-d", str(tmp_path), "--watch", "--format", "jsonl"],
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 2
+
+
+def test_main_rejects_compressed_output_with_watch(monkeypatch, tmp_path, capsys):
+    output_file = tmp_path / "summary.txt.gz"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["generate-project-summary", "-d", str(tmp_path), "--watch", "-o", str(output_file)],
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 2
+    assert "--watch cannot write a compressed output file" in capsys.readouterr().err
+    assert not output_file.exists()
+
+
+@pytest.mark.parametrize(
+    "arguments, message",
+    [
+        (["--daemon", "--walk-jobs", "4"], "--daemon cannot be combined with --walk-jobs"),
+        (["--daemon", "--progress", "jsonl"], "--daemon cannot be combined with --progress"),
+        (["--serve", "-o", "summary.txt"], "--serve cannot be combined with -d, -o"),
+        (["--serve", "--format", "jsonl"], "--serve cannot be combined with -d, --format jsonl"),
+    ],
+)
+def test_main_rejects_options_ignored_by_the_daemon(monkeypatch, tmp_path, capsys, arguments, message):
+    monkeypatch.setattr(sys, "argv", ["generate-project-summary", "-d", str(tmp_path)] + arguments)
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_main_rejects_budget_with_snapshot(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "generate-project-summary",
+            "-d",
+            str(tmp_path),
+            "--max-seconds",
+            "10",
+            "--snapshot",
+            str(tmp_path / "index"),
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 2
+
+
+def test_main_daemon_output_is_replaced_only_after_a_complete_summary(monkeypatch, tmp_path, capsys):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "main.py").write_text("print('hello')", encoding="utf-8")
+    output_file = project_dir / "my_out.txt"
+    address = str(tmp_path / "daemon.sock")
+    argv = ["generate-project-summary", "-d", str(project_dir), "--daemon", address, "-o", str(output_file)]
+
+    summary_daemon = SummaryDaemon(address, use_inotify=False)
+    thread = threading.Thread(target=summary_daemon.serve_forever)
+    thread.start()
+    assert summary_daemon.ready.wait(5)
+    try:
+        monkeypatch.setattr(sys, "argv", argv)
+        main()
+    finally:
+        stop_daemon(address, timeout=5)
+        thread.join(5)
+
+    summary = output_file.read_text(encoding="utf-8")
+    # ローカルで作成した場合と同じく、出力先自体は要約に含めない
+    assert "- main.py" in summary
+    assert "my_out.txt" not in summary
+
+    # デーモンに接続できない場合は、既存の要約を消さない
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    assert "no summary daemon" in capsys.readouterr().err
+    assert output_file.read_text(encoding="utf-8") == summary
+    assert sorted(path.name for path in project_dir.iterdir()) == ["main.py", "my_out.txt"]
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from generate_project_summary.model import DirectoryNode, FileNode, SkippedNode
+
+
+def test_nodes_use_slots():
+    for node in (
+        DirectoryNode(0, "src", Path("src")),
+        SkippedNode(1, "link", Path("src/link"), "symbolic links and junctions are skipped"),
+        FileNode(1, "main.py", Path("src/main.py"), "content"),
+    ):
+        assert not hasattr(node, "__dict__")
+
+
+def test_file_node_record_omits_missing_values():
+    node = FileNode(
+        1, "main.py", Path("src") / "main.py", "content", size=6, encoding="shift_jis", content="a = 1\n"
+    )
+    assert node.to_record() == {
+        "type": "file",
+        "path": "src/main.py",
+        "kind": "text",
+        "status": "content",
+        "size": 6,
+        "encoding": "shift_jis",
+        "content": "a = 1\n",
+    }
+
+    assert FileNode(0, "data.bin", Path("data.bin"), "binary", size=4).to_record() == {
+        "type": "file",
+        "path": "data.bin",
+        "kind": "binary",
+        "status": "binary",
+        "size": 4,
+    }
+    assert FileNode(0, "gone.py", "gone.py", "removed").kind is None
+    assert DirectoryNode(0, "project", Path("")).to_record() == {"type": "directory", "path": "."}
@@ -0,0 +1,33 @@
+import io
+
+import pytest
+
+from generate_project_summary.output import BackgroundWriter, compressed_opener
+
+
+def test_compressed_opener_selects_codec_by_suffix():
+    assert compressed_opener("summary.txt") is None
+    assert compressed_opener("summary.txt.gz") is not None
+    assert compressed_opener("SUMMARY.XZ") is not None
+    assert compressed_opener("summary.bz2") is not None
+
+
+def test_background_writer_writes_chunks_in_order():
+    buffer = io.BytesIO()
+    with BackgroundWriter(buffer, max_pending=2) as writer:
+        for index in range(100):
+            writer.write(f"{index},".encode("ascii"))
+
+    assert buffer.getvalue() == "".join(f"{index}," for index in range(100)).encode("ascii")
+
+
+def test_background_writer_reraises_write_errors():
+    class FailingFile:
+        def write(self, chunk):
+            raise OSError("disk full")
+
+    writer = BackgroundWriter(FailingFile(), max_pending=1)
+    with pytest.raises(OSError, match="disk full"):
+        for _ in range(100):
+            writer.write(b"data")
+        writer.close()
@@ -1,7 +1,8 @@
 from io import StringIO
+import json
 from pathlib import Path
 
-from generate_project_summary.progress import StderrProgressReporter
+from generate_project_summary.progress import JsonLinesProgressReporter, StderrProgressReporter
 
 
 class FakeClock:
@@ -64,3 +65,57 @@ def test_progress_reporter_writes_to_stderr_after_threshold():
     assert "Preparing summary... 1/4 files (src/main.py)" in output
     assert "Writing output... summary.txt" in output
     assert "Done. Processed 4/4 files: summary.txt" in output
+
+
+def test_progress_reporter_limits_per_file_render_rate():
+    stderr = StringIO()
+    clock = FakeClock(5.0)
+    reporter = StderrProgressReporter(
+        stderr=stderr, clock=clock, threshold_seconds=0.0, min_interval_seconds=1.0
+    )
+
+    reporter({"event": "count_start"})
+    reporter({"event": "process_start", "total_files": 3})
+    for processed, when in ((1, 5.0), (2, 5.5), (3, 6.0)):
+        clock.value = when
+        reporter(
+            {
+                "event": "file_processed",
+                "processed_files": processed,
+                "total_files": 3,
+                "path": Path(f"file_{processed}.py"),
+            }
+        )
+
+    output = stderr.getvalue()
+    assert "1/3 files" in output
+    assert "2/3 files" not in output
+    assert "3/3 files" in output
+
+
+def test_json_lines_reporter_writes_one_event_per_line():
+    stream = StringIO()
+    clock = FakeClock(10.0)
+    reporter = JsonLinesProgressReporter(stream=stream, clock=clock, min_interval_seconds=1.0)
+
+    reporter({"event": "count_start"})
+    clock.value = 10.2
+    reporter({"event": "count_progress", "counted_files": 1})
+    reporter({"event": "count_progress", "counted_files": 2})
+    reporter({"event": "process_start", "total_files": 2})
+    reporter(
+        {"event": "file_processed", "processed_files": 1, "total_files": 2, "path": Path("src/a.py")}
+    )
+    clock.value = 11.0
+    reporter({"event": "done", "processed_files": 2, "total_files": 2, "output_file": "out.txt"})
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["event"] for record in records] == [
+        "count_start",
+        "count_progress",
+        "process_start",
+        "file_processed",
+        "done",
+    ]
+    assert records[3]["path"] == "src/a.py"
+    assert records[-1]["elapsed"] == 1.0
@@ -0,0 +1,46 @@
+import pytest
+
+from generate_project_summary.snapshot import (
+    Snapshot,
+    SnapshotEntry,
+    SnapshotError,
+    file_digest,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+def test_snapshot_round_trip(tmp_path):
+    data_file = tmp_path / "data.txt"
+    data_file.write_bytes(b"hello\n")
+    snapshot = Snapshot(
+        {
+            "src/main.py": SnapshotEntry(12, 1_000_000_000, b"\x01" * 16),
+            "データ.txt": SnapshotEntry(6, 2_000_000_000, file_digest(data_file)),
+        },
+        created_ns=5_000_000_000,
+    )
+    snapshot_path = tmp_path / "summary.idx"
+
+    write_snapshot(snapshot_path, snapshot)
+    loaded = read_snapshot(snapshot_path)
+
+    assert loaded.created_ns == 5_000_000_000
+    assert set(loaded.entries) == {"src/main.py", "データ.txt"}
+    entry = loaded.entries["データ.txt"]
+    assert (entry.size, entry.mtime_ns, entry.digest) == (6, 2_000_000_000, file_digest(data_file))
+    assert loaded.is_racy(loaded.entries["データ.txt"]) is False
+    assert not (tmp_path / "summary.idx.tmp").exists()
+
+
+def test_read_snapshot_rejects_other_files(tmp_path):
+    other_file = tmp_path / "summary.txt"
+    other_file.write_text("# project\n", encoding="utf-8")
+    with pytest.raises(SnapshotError):
+        read_snapshot(other_file)
+
+    snapshot_path = tmp_path / "summary.idx"
+    write_snapshot(snapshot_path, Snapshot({"a.py": SnapshotEntry(1, 1, b"\0" * 16)}))
+    snapshot_path.write_bytes(snapshot_path.read_bytes()[:-1])
+    with pytest.raises(SnapshotError):
+        read_snapshot(snapshot_path)
@@ -1,6 +1,11 @@
+import json
+import os
+
 import pytest
 
-from generate_project_summary.summarizer import ProjectSummarizer
+from generate_project_summary.snapshot import file_digest, read_snapshot
+from generate_project_summary.summarizer import BINARY_CHECK_BYTES, ProjectSummarizer
+from generate_project_summary.tokens import estimate_tokens
 
 
 def test_gitignore_handling(setup_project):
@@ -158,3 +163,692 @@ def test_summarizer_reports_progress_events(tmp_path):
     assert len(file_events) == 2
     assert file_events[-1]["processed_files"] == 2
     assert events[-1]["event"] == "done"
+
+
+def test_each_directory_is_listed_only_once(tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "pkg").mkdir()
+    (tmp_path / "src" / "pkg" / "mod.py").write_text("x = 1", encoding="utf-8")
+    (tmp_path / "README.md").write_text("# demo", encoding="utf-8")
+
+    listed = []
+    original_scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(os.fspath(path))
+        return original_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+
+    events = []
+    summarizer = ProjectSummarizer(tmp_path, progress_callback=events.append)
+    summarizer.generate_project_summary(output_file=tmp_path.parent / "summary.txt")
+
+    assert len(listed) == len(set(listed)) == 3
+    assert any(
+        event["event"] == "process_start" and event["total_files"] == 2
+        for event in events
+    )
+
+
+def test_nested_gitignore_prunes_subtrees(tmp_path, monkeypatch):
+    frontend = tmp_path / "frontend"
+    (frontend / "node_modules" / "react").mkdir(parents=True)
+    (frontend / "node_modules" / "react" / "index.js").write_text("x", encoding="utf-8")
+    (frontend / "dist").mkdir()
+    (frontend / "dist" / "bundle.js").write_text("x", encoding="utf-8")
+    (frontend / "src").mkdir()
+    (frontend / "src" / "app.js").write_text("app", encoding="utf-8")
+    (frontend / ".gitignore").write_text("node_modules/\n/dist/\n", encoding="utf-8")
+    (tmp_path / "dist").mkdir()
+    (tmp_path / "dist" / "keep.txt").write_text("keep", encoding="utf-8")
+
+    listed = []
+    original_scandir = os.scandir
+
+    def recording_scandir(path):
+        listed.append(os.path.relpath(path, tmp_path))
+        return original_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(tmp_path).generate_project_summary(output_file=output_file)
+
+    structure_part = output_file.read_text(encoding="utf-8").split("\n## File Contents\n\n", 1)[0]
+    assert "node_modules" not in structure_part
+    assert "bundle.js" not in structure_part
+    assert "app.js" in structure_part
+    assert "keep.txt" in structure_part
+    assert "\n  - dist/" in structure_part
+    assert not any("node_modules" in path for path in listed)
+    assert os.path.join("frontend", "dist") not in listed
+
+
+def test_negation_patterns_reinclude_files(tmp_path):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "app.log").write_text("app", encoding="utf-8")
+    (tmp_path / "logs" / "keep.log").write_text("keep", encoding="utf-8")
+    (tmp_path / "logs" / ".gitignore").write_text("!keep.log\n", encoding="utf-8")
+    (tmp_path / "debug.log").write_text("debug", encoding="utf-8")
+    (tmp_path / ".gitignore").write_text("*.log\n", encoding="utf-8")
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(tmp_path).generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "keep.log" in summary
+    assert "app.log" not in summary
+    assert "debug.log" not in summary
+
+
+def test_contents_are_spliced_after_structure_in_order(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "second.txt").write_text("second", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("first", encoding="utf-8")
+    (tmp_path / "c.txt").write_text("a" * (ProjectSummarizer.DEFAULT_MAX_TEXT_FILE_BYTES + 1))
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(tmp_path).generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    structure_part, rest = summary.split("\n## File Contents\n\n", 1)
+    contents_part, skipped_part = rest.split("\n## Skipped Items\n\n", 1)
+    assert structure_part.endswith("  - c.txt (text file omitted: exceeds 1000000 bytes)\n")
+    assert contents_part.index("### a.txt") < contents_part.index("second") < contents_part.index("### c.txt")
+    assert skipped_part == "- c.txt: file contents omitted because the file is too large\n"
+
+
+def test_parallel_jobs_produce_identical_output(setup_project):
+    (setup_project / "pkg").mkdir()
+    for index in range(30):
+        (setup_project / "pkg" / f"module_{index:02}.py").write_text(
+            f"value = {index}\n" * (index + 1), encoding="utf-8"
+        )
+    (setup_project / "pkg" / "data.bin").write_bytes(b"\x00\x01")
+    (setup_project / "pkg" / "sjis.txt").write_text("日本語", encoding="shift_jis")
+
+    serial_output = setup_project.parent / "serial.txt"
+    ProjectSummarizer(setup_project).generate_project_summary(output_file=serial_output)
+
+    events = []
+    parallel_output = setup_project.parent / "parallel.txt"
+    ProjectSummarizer(
+        setup_project, jobs=4, progress_callback=events.append
+    ).generate_project_summary(output_file=parallel_output)
+
+    assert parallel_output.read_bytes() == serial_output.read_bytes()
+    processed = [event["processed_files"] for event in events if event["event"] == "file_processed"]
+    assert processed == list(range(1, len(processed) + 1))
+
+
+def test_parallel_walk_matches_serial_walk(tmp_path, monkeypatch):
+    project_dir = tmp_path / "project"
+    for top in range(4):
+        for sub in range(5):
+            directory = project_dir / f"dir_{top}" / f"Sub_{sub}"
+            directory.mkdir(parents=True)
+            (directory / "a.txt").write_text(f"{top}-{sub}", encoding="utf-8")
+            (directory / "B.txt").write_text("b", encoding="utf-8")
+    (project_dir / "dir_1" / ".gitignore").write_text("Sub_2/\n", encoding="utf-8")
+    (project_dir / "locked").mkdir()
+
+    original_scandir = os.scandir
+
+    def failing_scandir(path):
+        if os.path.basename(path) == "locked":
+            raise PermissionError("denied")
+        return original_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+
+    serial_output = tmp_path / "serial.txt"
+    ProjectSummarizer(project_dir).generate_project_summary(output_file=serial_output)
+
+    events = []
+    parallel_output = tmp_path / "parallel.txt"
+    ProjectSummarizer(
+        project_dir, walk_jobs=4, progress_callback=events.append
+    ).generate_project_summary(output_file=parallel_output)
+
+    summary = parallel_output.read_text(encoding="utf-8")
+    assert parallel_output.read_bytes() == serial_output.read_bytes()
+    assert "- locked: directory could not be read: denied" in summary
+    assert any(
+        event["event"] == "process_start" and event["total_files"] == 39
+        for event in events
+    )
+
+
+def test_text_file_is_opened_once_and_newlines_are_normalized(tmp_path, record_opens):
+    (tmp_path / "sjis.txt").write_bytes("一行目\r\n二行目\r三行目".encode("shift_jis"))
+    (tmp_path / "ascii.txt").write_bytes(b"line one\r\nline two\n")
+
+    opened = record_opens()
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(tmp_path).generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert sorted(name for name in opened if name.endswith(".txt") and "summary" not in name) == [
+        "ascii.txt",
+        "sjis.txt",
+    ]
+    assert "一行目\n二行目\n三行目" in summary
+    assert "line one\nline two\n" in summary
+
+
+@pytest.mark.skipif(os.linesep != "\n", reason="mapped output is only used without newline translation")
+def test_large_utf8_files_are_written_from_mmap(tmp_path):
+    (tmp_path / "fixture.sql").write_text("INSERT INTO t VALUES ('日本語');\n" * 200, encoding="utf-8")
+    (tmp_path / "crlf.json").write_bytes(b'{"a": 1}\r\n' * 200)
+    (tmp_path / "sjis.txt").write_bytes(("テキスト\n" * 200).encode("shift_jis"))
+
+    regular_output = tmp_path.parent / "regular.txt"
+    ProjectSummarizer(tmp_path).generate_project_summary(output_file=regular_output)
+
+    summarizer = ProjectSummarizer(tmp_path)
+    summarizer.mmap_min_bytes = 1024
+    with os.scandir(tmp_path) as entries:
+        statuses = {entry.name: summarizer._inspect_file(entry)[0] for entry in entries}
+    mapped_output = tmp_path.parent / "mapped.txt"
+    summarizer.generate_project_summary(output_file=mapped_output)
+
+    assert statuses == {"fixture.sql": "mapped", "crlf.json": "content", "sjis.txt": "content"}
+    assert mapped_output.read_bytes() == regular_output.read_bytes()
+
+
+def test_warm_cache_run_does_not_read_files(tmp_path, monkeypatch):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "main.py").write_text("print('hi')", encoding="utf-8")
+    (project_dir / "data.bin").write_bytes(b"\x00\x01")
+    (project_dir / "notes.txt").write_text("メモ", encoding="shift_jis")
+    for path in project_dir.iterdir():
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    cache_path = tmp_path / "cache.sqlite"
+
+    cold_output = tmp_path / "cold.txt"
+    ProjectSummarizer(project_dir, cache_path=cache_path).generate_project_summary(output_file=cold_output)
+
+    def fail_inspect(self, entry):
+        raise AssertionError(f"{entry.name} should have been served from the cache")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ProjectSummarizer, "_inspect_file", fail_inspect)
+        warm_output = tmp_path / "warm.txt"
+        ProjectSummarizer(project_dir, cache_path=cache_path).generate_project_summary(output_file=warm_output)
+        name_only_output = tmp_path / "name_only.txt"
+        ProjectSummarizer(
+            project_dir, cache_path=cache_path, name_type_only=True
+        ).generate_project_summary(output_file=name_only_output)
+
+    assert warm_output.read_bytes() == cold_output.read_bytes()
+    assert "- notes.txt (text file)" in name_only_output.read_text(encoding="utf-8")
+
+    (project_dir / "main.py").write_text("print('changed')", encoding="utf-8")
+    os.utime(project_dir / "main.py", ns=(2_000_000_000, 2_000_000_000))
+    changed_output = tmp_path / "changed.txt"
+    ProjectSummarizer(project_dir, cache_path=cache_path).generate_project_summary(output_file=changed_output)
+    assert "print('changed')" in changed_output.read_text(encoding="utf-8")
+
+
+def test_cache_is_invalidated_when_settings_change(tmp_path):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "main.py").write_text("print('hi')", encoding="utf-8")
+    os.utime(project_dir / "main.py", ns=(1_000_000_000, 1_000_000_000))
+    cache_path = tmp_path / "cache.sqlite"
+    output_file = tmp_path / "summary.txt"
+
+    ProjectSummarizer(project_dir, cache_path=cache_path).generate_project_summary(output_file=output_file)
+
+    summarizer = ProjectSummarizer(project_dir, cache_path=cache_path)
+    summarizer.max_text_file_bytes = 5
+    summarizer.generate_project_summary(output_file=output_file)
+
+    assert "main.py (text file omitted: exceeds 5 bytes)" in output_file.read_text(encoding="utf-8")
+
+
+def test_cache_does_not_share_magic_number_results_with_plain_runs(tmp_path):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    # NUL を含まないため、classifier が無い場合はテキストとして読まれる
+    (project_dir / "tags").write_bytes(b"ID3\x04\x01\x7f\x01 tag data\n")
+    os.utime(project_dir / "tags", ns=(1_000_000_000, 1_000_000_000))
+    cache_path = tmp_path / "cache.sqlite"
+    output_file = tmp_path / "summary.txt"
+
+    ProjectSummarizer(project_dir, cache_path=cache_path, fast_classify=True).generate_project_summary(
+        output_file=output_file
+    )
+    assert "- tags (binary file)" in output_file.read_text(encoding="utf-8")
+
+    ProjectSummarizer(project_dir, cache_path=cache_path).generate_project_summary(output_file=output_file)
+    assert "### tags" in output_file.read_text(encoding="utf-8")
+
+
+def test_max_tokens_packs_small_files_and_skips_the_rest(tmp_path, record_opens):
+    (tmp_path / "small.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "medium.md").write_text("word " * 200, encoding="utf-8")
+    (tmp_path / "large.txt").write_text("data " * 20000, encoding="utf-8")
+    (tmp_path / "japanese.txt").write_text("日本語の文章です。" * 200, encoding="utf-8")
+
+    opened = record_opens()
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(tmp_path, max_tokens=600).generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    structure_part = summary.split("\n## File Contents\n\n", 1)[0]
+    assert "- large.txt (omitted: token budget)" in structure_part
+    assert "- japanese.txt (omitted: token budget)" in structure_part
+    assert "### small.py" in summary
+    assert "### medium.md" in summary
+    assert "- large.txt: file contents omitted to fit the token budget" in summary
+    assert "large.txt" not in opened
+    assert estimate_tokens(summary) <= 600
+
+
+def test_collect_stats_reports_counters_and_final_stats_event(setup_project):
+    (setup_project / "sjis.txt").write_bytes("日本語".encode("shift_jis"))
+    events = []
+    summarizer = ProjectSummarizer(
+        setup_project, collect_stats=True, progress_callback=events.append
+    )
+    summarizer.generate_project_summary(output_file=setup_project.parent / "summary.txt")
+
+    assert events[-1]["event"] == "stats"
+    stats = events[-1]
+    assert set(stats["phases"]) == {"scan", "process", "write"}
+    assert stats["counters"]["files_inspected"] == summarizer.total_files
+    assert stats["counters"]["open_calls"] == summarizer.total_files
+    assert stats["counters"]["scandir_calls"] == 2
+    assert stats["counters"]["ignore_evaluations"] > 0
+    assert stats["decode_attempts"]["shift_jis"] == 1
+    assert {item["path"] for item in stats["slowest_files"]} >= {"main.py", "sjis.txt"}
+    assert stats["slowest_directories"][0]["path"] == "."
+
+
+def test_stats_are_not_collected_by_default(setup_project):
+    events = []
+    summarizer = ProjectSummarizer(setup_project, progress_callback=events.append)
+    summarizer.generate_project_summary(output_file=setup_project.parent / "summary.txt")
+
+    assert summarizer.stats is None
+    assert all(event["event"] != "stats" for event in events)
+
+
+def test_progress_interval_thins_out_per_file_events(tmp_path):
+    for index in range(20):
+        (tmp_path / f"file_{index:02d}.txt").write_text(str(index), encoding="utf-8")
+
+    events = []
+    summarizer = ProjectSummarizer(tmp_path, progress_callback=events.append, progress_interval=60)
+    summarizer.generate_project_summary(output_file=tmp_path.parent / "summary.txt")
+
+    counted = [event for event in events if event["event"] == "count_progress"]
+    processed = [event["processed_files"] for event in events if event["event"] == "file_processed"]
+    assert len(counted) == 1
+    assert processed == [1, 20]
+    assert events[-1]["event"] == "done"
+
+
+def test_iter_summary_streams_the_same_bytes_as_the_output_file(setup_project, monkeypatch):
+    monkeypatch.setattr("generate_project_summary.summarizer.STRUCTURE_CHUNK_CHARS", 16)
+    for index in range(10):
+        (setup_project / f"module_{index}.py").write_text(f"value = {index}\n", encoding="utf-8")
+
+    output_file = setup_project.parent / "summary.txt"
+    ProjectSummarizer(setup_project).generate_project_summary(output_file=output_file)
+    chunks = list(ProjectSummarizer(setup_project).iter_summary())
+
+    assert all(isinstance(chunk, bytes) for chunk in chunks)
+    assert len(chunks) > 10
+    assert b"".join(chunks) == output_file.read_bytes()
+
+
+@pytest.mark.parametrize("suffix, module_name", [(".gz", "gzip"), (".xz", "lzma"), (".bz2", "bz2")])
+def test_compressed_output_matches_plain_output(setup_project, suffix, module_name):
+    module = __import__(module_name)
+    plain_output = setup_project.parent / "summary.txt"
+    compressed_output = setup_project.parent / f"summary.txt{suffix}"
+
+    ProjectSummarizer(setup_project).generate_project_summary(output_file=plain_output)
+    ProjectSummarizer(setup_project).generate_project_summary(output_file=compressed_output)
+
+    with module.open(compressed_output, "rb") as f:
+        assert f.read() == plain_output.read_bytes()
+
+
+def test_deduplicate_embeds_identical_contents_once(tmp_path):
+    license_text = "Permission is hereby granted, free of charge...\n"
+    for package in ("a", "b", "c"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "LICENSE").write_text(license_text, encoding="utf-8")
+    (tmp_path / "c" / "main.py").write_text("print('c')", encoding="utf-8")
+    (tmp_path / "empty_1.txt").write_text("", encoding="utf-8")
+    (tmp_path / "empty_2.txt").write_text("", encoding="utf-8")
+    manifest_path = tmp_path.parent / "manifest.b2"
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(
+        tmp_path, deduplicate=True, manifest_path=manifest_path
+    ).generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8").replace("\\", "/")
+    assert summary.count(license_text) == 1
+    assert "### b/LICENSE\n\n(identical to a/LICENSE)" in summary
+    assert "### c/LICENSE\n\n(identical to a/LICENSE)" in summary
+    assert "identical to empty" not in summary
+
+    manifest = manifest_path.read_text(encoding="utf-8").splitlines()
+    digests = dict(reversed(line.split("  ", 1)) for line in manifest)
+    assert digests["a/LICENSE"] == digests["b/LICENSE"] == digests["c/LICENSE"]
+    assert digests["a/LICENSE"] != digests["c/main.py"]
+    assert len(digests["c/main.py"]) == 32
+
+
+def test_max_tokens_counts_the_jsonl_records_that_are_written(tmp_path):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    # 改行とタブは JSON では 2 文字にエスケープされるため、Markdown より多くのトークンを使う
+    for index in range(20):
+        (project_dir / f"file{index:02}.txt").write_text("\n\t" * (40 + index), encoding="utf-8")
+
+    max_tokens = 1200
+    summarizer = ProjectSummarizer(project_dir, output_format="jsonl", max_tokens=max_tokens)
+    output_file = tmp_path / "summary.jsonl"
+    summarizer.generate_project_summary(output_file=output_file)
+
+    output = output_file.read_bytes()
+    statuses = [json.loads(line).get("status") for line in output.splitlines()]
+    assert 0 < statuses.count("content") < 20
+    assert estimate_tokens(output) <= max_tokens
+
+
+@pytest.mark.parametrize("output_format", ["markdown", "jsonl"])
+def test_max_tokens_reserves_the_changes_since_header(tmp_path, output_format):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    snapshot_path = tmp_path / ("long_snapshot_name_" * 10 + ".idx")
+    ProjectSummarizer(project_dir, snapshot_path=snapshot_path).generate_project_summary(
+        output_file=tmp_path / "summary.txt"
+    )
+    for index in range(10):
+        (project_dir / f"file{index}.txt").write_text("x" * (40 + 8 * index), encoding="utf-8")
+
+    output_file = tmp_path / "since.txt"
+
+    def summarize(max_tokens):
+        ProjectSummarizer(
+            project_dir, since_snapshot=snapshot_path, max_tokens=max_tokens, output_format=output_format
+        ).generate_project_summary(output_file=output_file)
+        return output_file.read_bytes()
+
+    # ファイル内容を含めない場合のトークン数より大きい予算で確かめる
+    floor = estimate_tokens(summarize(0))
+    for max_tokens in range(floor, floor + 300, 3):
+        output = summarize(max_tokens)
+        assert b"long_snapshot_name_" in output.splitlines()[0 if output_format == "jsonl" else 2]
+        assert estimate_tokens(output) <= max_tokens
+
+
+def test_fast_classify_name_type_only_opens_only_unknown_extensions(tmp_path, record_opens):
+    (tmp_path / "main.py").write_text("print('hello')", encoding="utf-8")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    (tmp_path / "Makefile").write_text("all:\n", encoding="utf-8")
+    (tmp_path / "notes.unknown").write_text("ID3 tags are listed below\n", encoding="utf-8")
+    (tmp_path / "document.data").write_bytes(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n1 0 obj\nstream\nx\x9c\xcbH\xcd\xc9\x01")
+
+    opened = record_opens()
+
+    summarizer = ProjectSummarizer(tmp_path, name_type_only=True, fast_classify=True, collect_stats=True)
+    output_file = tmp_path.parent / "summary.txt"
+    summarizer.generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "- main.py (text file)" in summary
+    assert "- logo.png (binary file)" in summary
+    assert "- Makefile (text file)" in summary
+    assert "- notes.unknown (text file)" in summary
+    assert "- document.data (binary file)" in summary
+    assert {"main.py", "logo.png", "Makefile"}.isdisjoint(opened)
+    assert {"notes.unknown", "document.data"} <= set(opened)
+    assert summarizer.stats.counters["classified_by_name"] == 3
+    assert summarizer.stats.counters["open_calls"] == 2
+    assert summarizer.stats.counters["stat_calls"] == 0
+
+
+def test_fast_classify_skips_reading_known_binary_extensions(tmp_path):
+    (tmp_path / "archive.zip").write_text("not really a zip", encoding="utf-8")
+    (tmp_path / "main.py").write_text("print('hello')", encoding="utf-8")
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(tmp_path, fast_classify=True).generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "- archive.zip (binary file)" in summary
+    assert "not really a zip" not in summary
+    assert "print('hello')" in summary
+
+
+def test_excerpt_includes_head_and_tail_of_oversize_files(tmp_path):
+    lines = [f"行 {index:04d} の内容です。\r\n" for index in range(2000)]
+    (tmp_path / "big.log").write_bytes("".join(lines).encode("shift_jis"))
+
+    summarizer = ProjectSummarizer(tmp_path, max_file_bytes=1000, excerpt_bytes=100, collect_stats=True)
+    output_file = tmp_path.parent / "summary.txt"
+    summarizer.generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "- big.log (text file excerpt: exceeds 1000 bytes)" in summary
+    assert "```\n行 0000 の内容です。\n" in summary
+    assert "行 1999 の内容です。\n\n```" in summary
+    assert "行 1000 の内容です。" not in summary
+    assert "bytes omitted) ...\n" in summary
+    assert "- big.log: file is too large; only the first and last lines are included" in summary
+    assert summarizer.stats.counters["bytes_read"] <= BINARY_CHECK_BYTES + 200
+
+
+def test_excerpt_without_newlines_does_not_split_multibyte_characters(tmp_path):
+    (tmp_path / "one_line.txt").write_text("あ" * 1000, encoding="utf-8")
+
+    output_file = tmp_path.parent / "summary.txt"
+    ProjectSummarizer(tmp_path, max_file_bytes=100, excerpt_bytes=50).generate_project_summary(
+        output_file=output_file
+    )
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "```\n" + "あ" * 16 + "\n... (2904 bytes omitted) ...\n" + "あ" * 16 + "\n```" in summary
+
+
+@pytest.mark.parametrize("encoding", ["shift_jis", "euc_jp"])
+@pytest.mark.parametrize("excerpt_bytes", [1003, 1004, 1005])
+def test_excerpt_tail_without_newlines_resyncs_legacy_multibyte_encodings(
+    tmp_path, monkeypatch, encoding, excerpt_bytes
+):
+    # 2 バイト目だけでも半角カナなどとしてデコードできるため、末尾は文字の境界から始める必要がある
+    monkeypatch.setattr(ProjectSummarizer, "TEXT_ENCODINGS", ("utf-8", encoding))
+    text = "あいう" * 4096
+    (tmp_path / "legacy.txt").write_bytes(text.encode(encoding))
+
+    output_file = tmp_path.parent / f"summary_{encoding}_{excerpt_bytes}.txt"
+    ProjectSummarizer(tmp_path, max_file_bytes=1000, excerpt_bytes=excerpt_bytes).generate_project_summary(
+        output_file=output_file
+    )
+
+    summary = output_file.read_text(encoding="utf-8")
+    excerpt = summary.split("### legacy.txt\n\n```\n", 1)[1].split("\n```", 1)[0]
+    head, tail = excerpt.split(" bytes omitted) ...\n")
+    assert text.startswith(head.rsplit("\n... (", 1)[0])
+    assert len(tail) == excerpt_bytes // 2
+    assert text.endswith(tail)
+
+
+def test_since_snapshot_summarizes_only_changed_files(tmp_path, record_opens):
+    project_dir = tmp_path / "project"
+    (project_dir / "src").mkdir(parents=True)
+    for name, text in (("src/a.py", "a = 1\n"), ("src/b.py", "b = 1\n"), ("c.txt", "c\n")):
+        (project_dir / name).write_text(text, encoding="utf-8")
+        os.utime(project_dir / name, ns=(1_000_000_000, 1_000_000_000))
+    snapshot_path = project_dir / ".summary.idx"
+    output_file = tmp_path / "summary.txt"
+    ProjectSummarizer(project_dir, snapshot_path=snapshot_path).generate_project_summary(output_file=output_file)
+
+    (project_dir / "src" / "a.py").write_text("a = 2\n", encoding="utf-8")
+    os.utime(project_dir / "src" / "b.py", ns=(2_000_000_000, 2_000_000_000))
+    (project_dir / "c.txt").unlink()
+    (project_dir / "new.md").write_text("# new\n", encoding="utf-8")
+
+    opened = record_opens()
+    ProjectSummarizer(project_dir, since_snapshot=snapshot_path).generate_project_summary(
+        output_file=output_file
+    )
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "## Changes Since .summary.idx\n\n- removed: c.txt\n- added: new.md\n- modified: src/a.py\n" in summary
+    assert "a = 2" in summary
+    assert "src/b.py" not in summary
+    assert ".summary.idx\n\n```" not in summary
+    # 内容を読むのは、サイズは同じで mtime だけが変わった b.py の比較と、変わったファイルだけ
+    assert sorted(name for name in opened if name not in (".summary.idx", "summary.txt")) == ["a.py", "a.py", "b.py", "new.md"]
+
+
+def test_snapshot_digests_reuse_the_content_read_for_the_summary(tmp_path, record_opens):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (project_dir / "image.bin").write_bytes(b"\x00\x01\x02")
+    snapshot_path = tmp_path / "summary.idx"
+    output_file = tmp_path / "summary.txt"
+
+    opened = record_opens()
+    ProjectSummarizer(project_dir, snapshot_path=snapshot_path).generate_project_summary(output_file=output_file)
+
+    # テキストは出力のために読んだ内容からダイジェストを求め、内容を出力しないバイナリだけを読み直す
+    assert sorted(name for name in opened if not name.startswith("summary.")) == ["a.py", "image.bin", "image.bin"]
+    entries = read_snapshot(snapshot_path).entries
+    assert entries["a.py"].digest == file_digest(project_dir / "a.py")
+    assert entries["image.bin"].digest == file_digest(project_dir / "image.bin")
+
+
+def test_jsonl_format_writes_one_record_per_entry(tmp_path):
+    project_dir = tmp_path / "project"
+    (project_dir / "src").mkdir(parents=True)
+    (project_dir / "src" / "main.py").write_text("print('hello')\n", encoding="utf-8")
+    (project_dir / "src" / "legacy.txt").write_bytes("テスト\n".encode("shift_jis"))
+    (project_dir / "image.bin").write_bytes(b"\x00\x01\x02")
+    (project_dir / "large.txt").write_text("x" * 100, encoding="utf-8")
+
+    summarizer = ProjectSummarizer(project_dir, output_format="jsonl", max_file_bytes=50)
+    output_file = project_dir / summarizer.default_output_file()
+    summarizer.generate_project_summary(output_file=output_file)
+    # 前回の出力ファイルは要約の対象に含めない
+    summarizer.generate_project_summary(output_file=output_file)
+
+    records = [json.loads(line) for line in output_file.read_text(encoding="utf-8").splitlines()]
+    assert output_file.name == "project_project_summary.jsonl"
+    assert records[0] == {"type": "project", "name": "project"}
+    files = {record["path"]: record for record in records if record["type"] == "file"}
+    assert sorted(files) == ["image.bin", "large.txt", "src/legacy.txt", "src/main.py"]
+    assert files["src/main.py"]["content"] == "print('hello')\n"
+    assert files["src/main.py"]["encoding"] == "utf-8"
+    assert files["src/legacy.txt"] == {
+        "type": "file",
+        "path": "src/legacy.txt",
+        "kind": "text",
+        "status": "content",
+        "size": 7,
+        "encoding": "shift_jis",
+        "content": "テスト\n",
+    }
+    assert files["image.bin"]["kind"] == "binary"
+    assert files["large.txt"]["status"] == "too_large"
+    assert files["large.txt"]["skip_reason"] == "file contents omitted because the file is too large"
+    assert [record["path"] for record in records if record["type"] == "directory"] == [".", "src"]
+
+
+def test_byte_budget_lists_remaining_files_without_reading_them(tmp_path, record_opens):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt", "d.txt"):
+        (project_dir / name).write_text(name * 25, encoding="utf-8")
+    output_file = tmp_path / "summary.txt"
+
+    opened = record_opens()
+    summarizer = ProjectSummarizer(project_dir, max_total_bytes=250)
+    summarizer.generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    assert "  - b.txt\n  - c.txt (not read: budget exhausted)\n  - d.txt (not read: budget exhausted)\n" in summary
+    assert "### b.txt" in summary
+    assert "### c.txt" not in summary
+    assert [name for name in opened if name != "summary.txt"] == ["a.txt", "b.txt"]
+    assert summarizer.partial_reason == (
+        "summary is partial: the byte budget of 250 bytes ran out; 2 files are listed without contents"
+    )
+    assert f"## Skipped Items\n\n- .: {summarizer.partial_reason}\n" in summary
+
+
+def test_byte_budget_is_not_charged_for_cached_files(tmp_path, record_opens):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (project_dir / name).write_text(name * 25, encoding="utf-8")
+        os.utime(project_dir / name, ns=(1_000_000_000, 1_000_000_000))
+    cache_path = tmp_path / "cache.sqlite"
+    output_file = tmp_path / "summary.txt"
+    ProjectSummarizer(project_dir, cache_path=cache_path).generate_project_summary(output_file=output_file)
+    (project_dir / "d.txt").write_text("d.txt" * 25, encoding="utf-8")
+    os.utime(project_dir / "d.txt", ns=(1_000_000_000, 1_000_000_000))
+
+    opened = record_opens()
+    summarizer = ProjectSummarizer(project_dir, cache_path=cache_path, max_total_bytes=150)
+    summarizer.generate_project_summary(output_file=output_file)
+
+    summary = output_file.read_text(encoding="utf-8")
+    # キャッシュにある a〜c は予算を消費せず、読む必要がある d.txt だけが予算に数えられる
+    assert [name for name in opened if name.endswith(".txt") and name != "summary.txt"] == ["d.txt"]
+    assert all(f"### {name}" in summary for name in ("a.txt", "b.txt", "c.txt", "d.txt"))
+    assert summarizer.partial_reason is None
+
+
+def test_time_budget_stops_scanning_and_marks_output_as_partial(tmp_path):
+    project_dir = tmp_path / "project"
+    (project_dir / "src" / "pkg").mkdir(parents=True)
+    (project_dir / "src" / "pkg" / "module.py").write_text("x = 1\n", encoding="utf-8")
+    (project_dir / "main.py").write_text("print('hello')\n", encoding="utf-8")
+
+    summarizer = ProjectSummarizer(project_dir, max_seconds=0, output_format="jsonl")
+    output_file = tmp_path / "summary.jsonl"
+    summarizer.generate_project_summary(output_file=output_file)
+
+    records = [json.loads(line) for line in output_file.read_text(encoding="utf-8").splitlines()]
+    assert [(record["type"], record.get("path"), record.get("status")) for record in records[1:-1]] == [
+        ("directory", ".", None),
+        ("file", "main.py", "cutoff"),
+        ("directory", "src", None),
+    ]
+    assert records[-1] == {
+        "type": "partial",
+        "reason": (
+            "summary is partial: the time budget of 0 seconds ran out; "
+            "1 directory was not listed, 1 file is listed without contents"
+        ),
+    }
+
+
+def test_incremental_api_lists_and_renders_selected_files(tmp_path):
+    (tmp_path / "main.py").write_text("print('hello')\n", encoding="utf-8")
+    (tmp_path / "data.bin").write_bytes(b"\x00\x01")
+    summarizer = ProjectSummarizer(tmp_path)
+
+    listing, _ = summarizer.list_directory(summarizer.prepare_scan())
+    files = [(level, name, relative_path, entry) for kind, level, name, relative_path, entry in listing if kind == "file"]
+    rendered = list(summarizer.render_files(files))
+
+    assert [name for _, name, _, _ in files] == ["data.bin", "main.py"]
+    assert rendered[0] == ("  - data.bin (binary file)\n", [], [])
+    assert rendered[1][0] == "  - main.py\n"
+    assert "".join(rendered[1][1]) == "### main.py\n\n```\nprint('hello')\n\n```\n\n"
@@ -0,0 +1,15 @@
+from generate_project_summary.tokens import estimate_tokens, minimum_tokens_for_size
+
+
+def test_estimate_tokens_uses_character_class():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    # "日本" は UTF-8 で 6 バイトのため、ASCII の 4 バイトより多く見積もる
+    assert estimate_tokens("日本") == 3
+    assert estimate_tokens("日本".encode("utf-8")) == estimate_tokens("日本")
+
+
+def test_minimum_tokens_for_size_is_a_lower_bound():
+    for text in ("plain ascii text", "混在した text です", "é" * 7):
+        data = text.encode("utf-8")
+        assert minimum_tokens_for_size(len(data)) <= estimate_tokens(data)
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+
+from generate_project_summary.summarizer import ProjectSummarizer
+from generate_project_summary.watch import ChangeSet, InotifyWatcher, SummaryWatcher
+
+
+def _full_summary(project_dir, output_file, **options):
+    ProjectSummarizer(project_dir, **options).generate_project_summary(output_file=output_file)
+    return output_file.read_bytes()
+
+
+def _changes(*directories, files=()):
+    changes = ChangeSet()
+    changes.directories.update(directories)
+    changes.files.update(files)
+    return changes
+
+
+def test_watch_build_matches_full_summary(setup_project, tmp_path):
+    watcher = SummaryWatcher(ProjectSummarizer(setup_project), tmp_path / "watched.txt")
+    watcher.build()
+
+    expected = _full_summary(setup_project, tmp_path / "full.txt")
+    assert (tmp_path / "watched.txt").read_bytes() == expected
+
+
+def test_watch_update_reads_only_changed_files(setup_project, tmp_path):
+    (setup_project / "src").mkdir()
+    (setup_project / "src" / "app.py").write_text("print('old')", encoding="utf-8")
+    watcher = SummaryWatcher(ProjectSummarizer(setup_project), tmp_path / "watched.txt")
+    watcher.build()
+
+    (setup_project / "src" / "app.py").write_text("print('new contents')", encoding="utf-8")
+    (setup_project / "src" / "added.md").write_text("# Added", encoding="utf-8")
+    assert watcher.update(_changes("src", files=["src" + os.sep + "app.py"])) == 2
+
+    expected = _full_summary(setup_project, tmp_path / "full.txt")
+    assert (tmp_path / "watched.txt").read_bytes() == expected
+    assert watcher.update(_changes("src")) is None
+
+
+def test_watch_update_applies_nested_ignore_and_removals(setup_project, tmp_path):
+    (setup_project / "pkg" / "build").mkdir(parents=True)
+    (setup_project / "pkg" / "build" / "out.txt").write_text("generated", encoding="utf-8")
+    (setup_project / "pkg" / "mod.py").write_text("x = 1", encoding="utf-8")
+    watcher = SummaryWatcher(
+        ProjectSummarizer(setup_project, name_type_only=True), tmp_path / "watched.txt"
+    )
+    watcher.build()
+
+    (setup_project / "pkg" / ".gitignore").write_text("build/\n", encoding="utf-8")
+    (setup_project / "main.py").unlink()
+    watcher.update(_changes("", "pkg"))
+
+    expected = _full_summary(setup_project, tmp_path / "full.txt", name_type_only=True)
+    assert (tmp_path / "watched.txt").read_bytes() == expected
+    assert b"out.txt" not in expected
+
+
+def test_watch_ignores_its_own_output_inside_project(setup_project):
+    watcher = SummaryWatcher(ProjectSummarizer(setup_project), setup_project / "summary.txt")
+    watcher.build()
+    assert watcher.update(_changes("")) is None
+
+    content = (setup_project / "summary.txt").read_text(encoding="utf-8")
+    assert "summary.txt" not in content
+
+
+def test_watch_run_detects_changes(setup_project, tmp_path):
+    try:
+        InotifyWatcher(setup_project).close()
+        use_inotify = True
+    except OSError:
+        use_inotify = False
+
+    updated = threading.Event()
+    watcher = SummaryWatcher(
+        ProjectSummarizer(setup_project),
+        tmp_path / "watched.txt",
+        use_inotify=use_inotify,
+        poll_interval_seconds=0.1,
+        on_update=lambda inspected: updated.set(),
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop,))
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not (tmp_path / "watched.txt").exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        updated.clear()
+        # 初回の書き出し後に監視が始まるまで少し待つ
+        time.sleep(0.3)
+        (setup_project / "new_file.py").write_text("value = 42", encoding="utf-8")
+        assert updated.wait(5)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert "value = 42" in (tmp_path / "watched.txt").read_text(encoding="utf-8")